@@ -1,14 +1,15 @@
-import os
-import requests
+from functools import partial
 from django.contrib import admin, messages
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, path
 from django.utils.html import format_html
-from decouple import config
 
-from accounts.utils import get_specific_bank_code, resolve_account_number
-from .models import Department
+from .approval import start_approval
+from .models import ApprovalJob, Department
 from .forms import DepartmentAdminForm
-from pay.utils import send_approval_email, send_rejection_email
+from pay.utils import send_rejection_email
+from utils.images import upload_variants
 from utils.supabase_util import upload_to_supabase
 
 
@@ -80,108 +81,49 @@ class DepartmentAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.reject_department_view),
                 name="reject_department",
             ),
+            path(
+                "approvals/<uuid:id>/",
+                self.admin_site.admin_view(self.approval_job_view),
+                name="approval_job_progress",
+            ),
         ]
         return custom_urls + urls
 
-    # === Shared approval logic (single dept) ===
-    def _approve_department(self, request, dept: Department):
-        if dept.is_verified:
-            return
-
-        # === Step 1: Resolve account details ===
-        try:
-            bank_code = get_specific_bank_code(dept.bank_name)
-
-            dept.bank_code = bank_code
-        except requests.HTTPError as e:
-            messages.warning(
-                request,
-                f"⚠️ Account verification failed for {dept.dept_name}: {str(e)}. "
-                "Department approved but requires manual bank verification.",
-            )
-
-        # === Step 2: Create Paystack subaccount ===
-        try:
-            url = "https://api.paystack.co/subaccount"
-            headers = {
-                "Authorization": f"Bearer {config('PAYSTACK_SECRET_KEY')}",
-                "content_type": "application/json",
-            }
-            data = {
-                "business_name": dept.dept_name,
-                "settlement_bank": bank_code,
-                "account_number": dept.account_number,
-                "percentage_charge": 0,
-            }
-            response = requests.post(url=url, headers=headers, data=data)
-            response.raise_for_status()
-
-            sub_account_code = response.json()["data"]["subaccount_code"]
-            account_name = response.json()["data"]["account_name"]
-            dept.account_name = account_name
-            dept.sub_account_code = sub_account_code
-        except requests.HTTPError as e:
-            if response.status_code == 400:
-                raise Exception(
-                    f"Paystack subaccount creation failed for {dept.dept_name}: {response.json().get('message', 'Unknown error')}"
-                )
-
-        # === Step 3: Upload files to Supabase ===
-        if dept.logo:
-            dept.logo_url = upload_to_supabase("logo", dept.logo.name, dept.logo.read())
-            if dept.logo.path and os.path.exists(dept.logo.path):
-                os.remove(dept.logo.path)
-
-        if dept.president_signature:
-            dept.president_signature_url = upload_to_supabase(
-                "signatures",
-                dept.president_signature.name,
-                dept.president_signature.read(),
-            )
-            if dept.president_signature.path and os.path.exists(
-                dept.president_signature.path
-            ):
-                os.remove(dept.president_signature.path)
-
-        if dept.secretary_signature:
-            dept.secretary_signature_url = upload_to_supabase(
-                "signatures",
-                dept.secretary_signature.name,
-                dept.secretary_signature.read(),
-            )
-            if dept.secretary_signature.path and os.path.exists(
-                dept.secretary_signature.path
-            ):
-                os.remove(dept.secretary_signature.path)
-
-        # === Step 4: Mark verified ===
-        dept.is_verified = True
-        dept.save()
-
-        email_context = {
-            "dept_name": dept.dept_name,
-            "approval_date": dept.updated_at,
-            "dept_id": dept.id,
-            "account_number": dept.account_number,
-            "bank_name": dept.bank_name,
-        }
-        send_approval_email(dept.email, email_context)
-        messages.success(
-            request, f"✅ Department {dept.dept_name} approved successfully."
-        )
-
-    # === Per-row button views ===
+    # === Approval runs as a background job (see accounts/approval.py) ===
     def approve_department_view(self, request, id):
         try:
             dept = Department.objects.get(pk=id)
-            self._approve_department(request, dept)
-            messages.success(
-                request, f"✅ Department {dept.dept_name} approved successfully."
-            )
-
+            if dept.is_verified:
+                messages.info(
+                    request, f"Department {dept.dept_name} is already approved."
+                )
+                return self._redirect_back(request)
+            job = start_approval([dept], created_by=request.user)
         except Exception as e:
             messages.error(request, f"❌ Failed to approve department: {str(e)}")
-        return self._redirect_back(request)
+            return self._redirect_back(request)
+        return redirect("admin:approval_job_progress", id=job.pk)
+
+    def approval_job_view(self, request, id):
+        job = get_object_or_404(ApprovalJob, pk=id)
+        if request.GET.get("format") == "json":
+            return JsonResponse(
+                {
+                    "status": job.status,
+                    "total": job.total,
+                    "processed": job.processed,
+                    "approved": job.approved,
+                    "failed": job.failed,
+                    "results": job.results,
+                }
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Department approval",
+            "job": job,
+            "opts": self.model._meta,
+        }
+        return render(request, "admin/accounts/approval_job.html", context)
 
     def reject_department_view(self, request, id):
         try:
@@ -201,22 +143,17 @@ class DepartmentAdmin(admin.ModelAdmin):
         return self._redirect_back(request)
 
     def _redirect_back(self, request):
-        from django.shortcuts import redirect
-
         return redirect(request.META.get("HTTP_REFERER", "admin:index"))
 
     # === Bulk actions ===
     def approve_departments(self, request, queryset):
-        for dept in queryset:
-            try:
-                self._approve_department(request, dept)
-                messages.success(
-                    request, f"✅ Department {dept.dept_name} approved successfully."
-                )
-            except Exception as e:
-                messages.error(
-                    request, f"❌ Failed to approve {dept.dept_name}: {str(e)}"
-                )
+        job = start_approval(
+            queryset.filter(is_verified=False), created_by=request.user
+        )
+        if not job.total:
+            messages.info(request, "The selected departments are already approved.")
+            return None
+        return redirect("admin:approval_job_progress", id=job.pk)
 
     approve_departments.short_description = "Approve selected departments"
 
@@ -245,15 +182,49 @@ class DepartmentAdmin(admin.ModelAdmin):
                 # Only process if a new file is uploaded
                 if new_file and old_file != new_file:
                     # upload new file
-                    supabase_url = upload_to_supabase(
-                        "signatures" if field != "logo" else "logo",
-                        new_file.name,
-                        new_file.read(),
-                    )
+                    bucket = "signatures" if field != "logo" else "logo"
+                    data = new_file.read()
+                    supabase_url = upload_to_supabase(bucket, new_file.name, data)
                     setattr(obj, f"{field}_url", supabase_url)
+                    obj.asset_variants = {
+                        **(obj.asset_variants or {}),
+                        field: upload_variants(
+                            field,
+                            new_file.name,
+                            data,
+                            partial(upload_to_supabase, bucket),
+                        ),
+                    }
 
                     # delete old file from Supabase if it existed
                     # if old_file:
                     #     delete_from_supabase(old_file)
 
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ApprovalJob)
+class ApprovalJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at",
+        "created_by",
+        "status",
+        "total",
+        "approved",
+        "failed",
+        "progress_link",
+    ]
+    list_filter = ["status"]
+    readonly_fields = [field.name for field in ApprovalJob._meta.fields]
+
+    def progress_link(self, obj):
+        return format_html(
+            '<a href="{}">{}%</a>',
+            reverse("admin:approval_job_progress", args=[obj.pk]),
+            obj.percent,
+        )
+
+    progress_link.short_description = "Progress"
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,298 @@
+"""
+Department approval, run as a background job from the admin.
+
+Approving a department takes a bank code lookup, a Paystack subaccount, up to three Supabase
+uploads and an email, all network calls. The uploads run alongside the subaccount creation, and
+departments are provisioned `APPROVAL_WORKERS` at a time; every database write stays on the job's
+own thread, which records progress on the `ApprovalJob` after each department.
+
+Jobs run on the web process's background threads, so a deploy or a crash can cut one short. The
+`resume_background_jobs` command, run from cron, finishes such jobs from where they stopped.
+"""
+
+import logging
+import os
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+import requests
+from django.conf import settings
+from django.utils import timezone
+from pay.utils import send_approval_email
+from utils.background import run_in_background
+from utils.images import upload_variants
+from utils.metrics import outbound
+from utils.supabase_util import upload_to_supabase
+from .models import ApprovalJob, Department
+from .utils import get_specific_bank_code
+
+
+logger = logging.getLogger(__name__)
+
+# Uploaded file field -> Supabase bucket
+ASSET_BUCKETS = {
+    "logo": "logo",
+    "president_signature": "signatures",
+    "secretary_signature": "signatures",
+}
+UNSET_SUB_ACCOUNT_CODE = Department._meta.get_field("sub_account_code").default
+
+
+class ApprovalError(Exception):
+    pass
+
+
+def create_subaccount(department):
+    """
+    The function `create_subaccount` resolves the department's bank code and creates its Paystack
+    subaccount, unless an earlier attempt already did.
+
+    :return: A `(updates, warnings)` tuple: the department fields to set and the problems that did
+    not prevent approval.
+    :raises ApprovalError: When Paystack rejects the account details.
+    """
+    if department.sub_account_code not in (None, "", UNSET_SUB_ACCOUNT_CODE):
+        return {}, []
+    try:
+        bank_code = get_specific_bank_code(department.bank_name)
+    except (requests.RequestException, KeyError) as e:
+        return {}, [
+            f"Account verification failed: {e}. Department approved but requires manual bank "
+            "verification."
+        ]
+
+    with outbound("paystack.create_subaccount"):
+        response = requests.post(
+            url=f"{settings.PAYSTACK_BASE_URL}/subaccount",
+            headers={"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"},
+            data={
+                "business_name": department.dept_name,
+                "settlement_bank": bank_code,
+                "account_number": department.account_number,
+                "percentage_charge": 0,
+            },
+            timeout=15,
+        )
+    if response.status_code == 400:
+        raise ApprovalError(
+            f"Paystack subaccount creation failed: {response.json().get('message', 'Unknown error')}"
+        )
+    updates = {"bank_code": bank_code}
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        return updates, [f"Paystack subaccount creation failed: {e}"]
+    data = response.json()["data"]
+    updates["account_name"] = data["account_name"]
+    updates["sub_account_code"] = data["subaccount_code"]
+    return updates, []
+
+
+def upload_asset(department, field):
+    """
+    The function `upload_asset` uploads one of the department's files to Supabase along with its
+    normalized variants. The local copy is kept until the whole approval succeeds, see
+    `remove_local_assets`.
+
+    :return: A `(url, variants)` tuple: the original's URL and the variant URLs by name.
+    """
+    file = getattr(department, field)
+    with file.open("rb"):
+        data = file.read()
+    bucket = ASSET_BUCKETS[field]
+    url = upload_to_supabase(bucket, file.name, data)
+    variants = upload_variants(
+        field, file.name, data, partial(upload_to_supabase, bucket)
+    )
+    return url, variants
+
+
+def pending_assets(department):
+    """
+    The function `pending_assets` lists the department's file fields that still have to be
+    uploaded: those with a local file but no URL or variants from an earlier attempt.
+    """
+    variants = department.asset_variants or {}
+    return [
+        field
+        for field in ASSET_BUCKETS
+        if getattr(department, field)
+        and not getattr(department, f"{field}_url")
+        and field not in variants
+    ]
+
+
+def remove_local_assets(department):
+    for field in ASSET_BUCKETS:
+        file = getattr(department, field)
+        if file and os.path.exists(file.path):
+            os.remove(file.path)
+
+
+def provision(department):
+    """
+    The function `provision` runs the network steps of approving one department, uploading its
+    files while the subaccount is created. It touches no database rows, so it can run on any
+    thread.
+
+    :return: A `(updates, warnings, error)` tuple. When a step fails, `error` is set and `updates`
+    still holds what the other steps achieved, so a retry does not create a second subaccount.
+    """
+    fields = pending_assets(department)
+    updates, warnings, error = {}, [], None
+    variants = dict(department.asset_variants or {})
+    with ThreadPoolExecutor(max_workers=1 + len(fields)) as steps:
+        subaccount = steps.submit(create_subaccount, department)
+        uploads = {
+            field: steps.submit(upload_asset, department, field) for field in fields
+        }
+        for field, upload in uploads.items():
+            try:
+                updates[f"{field}_url"], variants[field] = upload.result()
+            except Exception as e:
+                error = error or str(e)
+        if uploads:
+            updates["asset_variants"] = variants
+        try:
+            subaccount_updates, warnings = subaccount.result()
+            updates.update(subaccount_updates)
+        except Exception as e:
+            error = error or str(e)
+    return updates, warnings, error
+
+
+def start_approval(departments, created_by=None):
+    """
+    The function `start_approval` records an `ApprovalJob` for the unverified `departments` and runs
+    it in the background once the current transaction commits.
+
+    :return: The `ApprovalJob`, whose progress the admin shows.
+    """
+    job = ApprovalJob.objects.create(
+        created_by=created_by,
+        department_ids=[str(d.pk) for d in departments if not d.is_verified],
+    )
+    job.total = len(job.department_ids)
+    job.save(update_fields=["total", "updated_at"])
+    run_in_background(run_approval_job, job.pk)
+    return job
+
+
+def approval_email_context(department):
+    return {
+        "dept_name": department.dept_name,
+        "approval_date": department.updated_at,
+        "dept_id": department.id,
+        "account_number": department.account_number,
+        "bank_name": department.bank_name,
+    }
+
+
+def run_approval_job(job_id):
+    """
+    The function `run_approval_job` approves the departments of a job, provisioning up to
+    `APPROVAL_WORKERS` of them at once and saving each as soon as it is ready. Departments already
+    recorded in `results` are skipped, so a job interrupted by a deploy or a crash is finished by
+    `resume_stale_jobs` without provisioning anyone twice.
+    """
+    job = ApprovalJob.objects.get(pk=job_id)
+    if job.status == ApprovalJob.Status.DONE:
+        return job
+    job.status = ApprovalJob.Status.RUNNING
+    job.save(update_fields=["status", "updated_at"])
+
+    finished = {result["department"] for result in job.results}
+    departments = {
+        str(department.pk): department
+        for department in Department.objects.filter(pk__in=job.department_ids)
+    }
+
+    def record(department_id, dept_name, status, messages=()):
+        job.results.append(
+            {
+                "department": department_id,
+                "dept_name": dept_name,
+                "status": status,
+                "messages": list(messages),
+            }
+        )
+        if status == "failed":
+            job.failed += 1
+        elif status == "approved":
+            job.approved += 1
+        job.save(update_fields=["results", "approved", "failed", "updated_at"])
+        return job.results[-1]
+
+    with ThreadPoolExecutor(max_workers=settings.APPROVAL_WORKERS) as pool:
+        futures = {}
+        for department_id in job.department_ids:
+            department = departments.get(department_id)
+            if department_id in finished:
+                continue
+            if department is None or department.is_verified:
+                record(department_id, getattr(department, "dept_name", None), "skipped")
+                continue
+            futures[pool.submit(provision, department)] = department
+
+        emails = {}
+        for future in as_completed(futures):
+            department = futures[future]
+            updates, warnings, error = future.result()
+            for field, value in updates.items():
+                setattr(department, field, value)
+            department.is_verified = error is None
+            # only what this job provisioned: the row was loaded when the job started, and the
+            # admin or the payment counters may have changed the rest since
+            department.save(update_fields=[*updates, "is_verified", "updated_at"])
+            if error is not None:
+                logger.error(f"Approving {department.pk} failed: {error}")
+                record(str(department.pk), department.dept_name, "failed", [error])
+                continue
+            remove_local_assets(department)
+            result = record(
+                str(department.pk), department.dept_name, "approved", warnings
+            )
+            email = pool.submit(
+                send_approval_email,
+                department.email,
+                approval_email_context(department),
+            )
+            emails[email] = result
+
+        for email in as_completed(emails):
+            try:
+                email.result()
+            except Exception as e:
+                emails[email]["messages"].append(f"Approval email not sent: {e}")
+                job.save(update_fields=["results", "updated_at"])
+
+    job.status = ApprovalJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at"])
+    return job
+
+
+def resume_stale_jobs():
+    """
+    The function `resume_stale_jobs` finishes approval jobs left pending or running by a process
+    that went away, i.e. not saved for `BACKGROUND_JOB_STALE_AFTER` seconds. Each job is claimed by
+    bumping its `updated_at` first, so two resumers never run the same job, and is then run in the
+    calling process.
+
+    :return: The resumed jobs.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.BACKGROUND_JOB_STALE_AFTER)
+    stale = ApprovalJob.objects.filter(
+        status__in=[ApprovalJob.Status.PENDING, ApprovalJob.Status.RUNNING],
+        updated_at__lt=cutoff,
+    ).order_by("created_at")
+    resumed = []
+    for job in stale:
+        claimed = ApprovalJob.objects.filter(
+            pk=job.pk, updated_at=job.updated_at
+        ).update(updated_at=timezone.now())
+        if not claimed:
+            continue
+        logger.warning(f"Resuming approval job {job.pk} after {len(job.results)} result(s)")
+        resumed.append(run_approval_job(job.pk))
+    return resumed
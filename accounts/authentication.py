@@ -0,0 +1,82 @@
+"""
+JWT authentication resolving the department from a short-lived shared cache.
+
+simplejwt's `JWTAuthentication` loads the full `Department` row on every authenticated request.
+`CachedJWTAuthentication` loads only `PRINCIPAL_FIELDS` once, caches the instance for
+`PRINCIPAL_CACHE_TIMEOUT` seconds under the department id, and reuses it for every request made
+with tokens of the cached token version; a token of any other version is checked against the
+database. Saving a department (approval, profile edits, password changes) drops its cached
+principal, see `accounts/signals.py`.
+
+Views needing anything beyond these fields (running totals, bank details) must query for them
+rather than read them off `request.user`.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import Department
+from .tokens import TOKEN_VERSION_CLAIM
+
+
+PRINCIPAL_FIELDS = (
+    "id",
+    "email",
+    "dept_name",
+    "is_verified",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "token_version",
+)
+
+
+def principal_key(department_id):
+    return f"principal:{department_id}"
+
+
+def invalidate_principal(department):
+    cache.delete(principal_key(department.pk))
+
+
+def load_principal(department_id, token_version):
+    """
+    The function `load_principal` returns the department a token of `token_version` authenticates,
+    from the cache when possible.
+
+    :return: A `Department` with only `PRINCIPAL_FIELDS` loaded, or `None` when the department does
+    not exist or the token version has been revoked.
+    """
+    key = principal_key(department_id)
+    department = cache.get(key)
+    if department is None or department.token_version != token_version:
+        try:
+            department = Department.objects.only(*PRINCIPAL_FIELDS).get(
+                pk=department_id
+            )
+        except Department.DoesNotExist:
+            return None
+        cache.set(key, department, timeout=settings.PRINCIPAL_CACHE_TIMEOUT)
+        if department.token_version != token_version:
+            return None
+    return department
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            department_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        department = load_principal(
+            department_id, validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        )
+        if department is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not department.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return department
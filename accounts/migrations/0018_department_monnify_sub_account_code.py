@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0017_rename_dept_id_department_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="monnify_sub_account_code",
+            field=models.CharField(
+                blank=True,
+                max_length=30,
+                null=True,
+                verbose_name="Monnify Sub Account Code",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0018_department_monnify_sub_account_code"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="last_payment_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Last Payment At"
+            ),
+        ),
+        migrations.AddField(
+            model_name="department",
+            name="payer_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Payer Count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="department",
+            name="total_collected",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=14,
+                verbose_name="Total Collected",
+            ),
+        ),
+    ]
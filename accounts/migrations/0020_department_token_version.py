@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_running_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Token Version"
+            ),
+        ),
+    ]
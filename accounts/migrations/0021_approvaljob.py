@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0020_department_token_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApprovalJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "department_ids",
+                    models.JSONField(default=list, verbose_name="Departments"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(default=0, verbose_name="Total")),
+                (
+                    "approved",
+                    models.PositiveIntegerField(default=0, verbose_name="Approved"),
+                ),
+                (
+                    "failed",
+                    models.PositiveIntegerField(default=0, verbose_name="Failed"),
+                ),
+                ("results", models.JSONField(default=list, verbose_name="Results")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Finished at"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="approval_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0021_approvaljob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="asset_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Asset Variants"
+            ),
+        ),
+    ]
@@ -50,6 +50,9 @@ class Department(AbstractUser):
     sub_account_code = models.CharField(
         _("Sub Account Code"), max_length=20, default="XXXXXXXXXXXX"
     )
+    monnify_sub_account_code = models.CharField(
+        _("Monnify Sub Account Code"), max_length=30, null=True, blank=True
+    )
     logo = models.ImageField(upload_to="temp_uploads/", null=True, blank=True)
     president_signature = models.ImageField(
         upload_to="temp_uploads/", null=True, blank=True
@@ -69,7 +72,26 @@ class Department(AbstractUser):
         null=True,
         blank=True,
     )
+    # Normalized copies of the uploads next to the originals, by field and variant, e.g.
+    # {"logo": {"receipt": url, "preview": url}}; see utils/images.py
+    asset_variants = models.JSONField(
+        _("Asset Variants"), default=dict, blank=True, editable=False
+    )
     is_verified = models.BooleanField(_("Verification Status"), default=False)
+    # Running totals over successful transactions, maintained by pay/counters.py
+    total_collected = models.DecimalField(
+        _("Total Collected"), decimal_places=2, max_digits=14, default=0, editable=False
+    )
+    payer_count = models.PositiveIntegerField(
+        _("Payer Count"), default=0, editable=False
+    )
+    last_payment_at = models.DateTimeField(
+        _("Last Payment At"), null=True, blank=True, editable=False
+    )
+    # Part of every token issued; bumping it revokes all of the department's tokens at once
+    token_version = models.PositiveIntegerField(
+        _("Token Version"), default=0, editable=False
+    )
     created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Last updated"), auto_now=True)
 
@@ -79,6 +101,14 @@ class Department(AbstractUser):
     def __str__(self):
         return self.dept_name
 
+    def asset_url(self, field, variant="receipt"):
+        """
+        Returns the URL of a normalized variant of an uploaded logo or signature, falling back to
+        the original upload when the variant does not exist.
+        """
+        variants = (self.asset_variants or {}).get(field) or {}
+        return variants.get(variant) or getattr(self, f"{field}_url")
+
     objects = CustomUserManager()
 
     class Meta:
@@ -87,3 +117,51 @@ class Department(AbstractUser):
         ordering = ["-updated_at", "-created_at"]
         
 
+
+
+class ApprovalJob(models.Model):
+    """
+    A batch of departments being approved in the background from the admin, see
+    `accounts/approval.py`. `results` holds one entry per finished department.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(
+        Department,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="approval_jobs",
+    )
+    department_ids = models.JSONField(_("Departments"), default=list)
+    status = models.CharField(
+        _("Status"), max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    total = models.PositiveIntegerField(_("Total"), default=0)
+    approved = models.PositiveIntegerField(_("Approved"), default=0)
+    failed = models.PositiveIntegerField(_("Failed"), default=0)
+    results = models.JSONField(_("Results"), default=list)
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    # saved with every recorded result; a pending or running job that stops moving was lost
+    # with its process and is picked up again by `resume_stale_jobs`
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+    finished_at = models.DateTimeField(_("Finished at"), null=True, blank=True)
+
+    def __str__(self):
+        return f"Approval of {self.total} department(s)"
+
+    @property
+    def processed(self):
+        return len(self.results)
+
+    @property
+    def percent(self):
+        return int(self.processed * 100 / self.total) if self.total else 100
+
+    class Meta:
+        ordering = ["-created_at"]
@@ -4,8 +4,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
-from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Department
+from .tokens import revoke_all_tokens
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +25,8 @@ class ChangePasswordView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        user = request.user
+        # `request.user` is the cached principal, which does not carry the password hash
+        user = Department.objects.get(pk=request.user.pk)
 
         if not user.check_password(old_password):
             return Response(
@@ -45,23 +46,8 @@ class ChangePasswordView(APIView):
 
         if logout_all:
             logger.error("Logging out from all devices")
-            blacklist_all_user_tokens(user)
+            revoke_all_tokens(user)
 
         return Response(
             {"message": "Password updated successfully"}, status=status.HTTP_200_OK
         )
-        
-        
-def blacklist_all_user_tokens(user):
-        """
-        Blacklists all outstanding refresh tokens for a given user.
-        """
-        outstanding_tokens = OutstandingToken.objects.filter(user=user)
-        for token_obj in outstanding_tokens:
-            try:
-                # Reconstruct RefreshToken object from the raw token
-                refresh_token = RefreshToken(token_obj.token)
-                refresh_token.blacklist()
-            except Exception as e:
-                print(f"Error blacklisting token {token_obj.token}: {e}")
-        print(f"All tokens for user {user.username} have been blacklisted.")
@@ -5,7 +5,12 @@ from rest_framework.serializers import (
     CharField,
     ImageField,
 )
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import load_principal
 from .models import Department
+from .tokens import TOKEN_VERSION_CLAIM, DepartmentRefreshToken
 
 
 class RegisterDepartmentSerializer(ModelSerializer):
@@ -53,8 +58,12 @@ class DepartmentSerializer(ModelSerializer):
             "president_signature",
             "secretary_signature_url",
             "secretary_signature",
+            "asset_variants",
             "account_name",
-            "is_verified"
+            "is_verified",
+            "total_collected",
+            "payer_count",
+            "last_payment_at",
         ]
         read_only_fields = [
             "id",
@@ -62,6 +71,33 @@ class DepartmentSerializer(ModelSerializer):
             "logo_url",
             "president_signature_url",
             "secretary_signature_url",
+            "asset_variants",
             "account_name",
-            "is_verified"
+            "is_verified",
+            "total_collected",
+            "payer_count",
+            "last_payment_at",
         ]
+
+
+class DepartmentTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refreshes access tokens against the cached principal instead of loading the department, and
+    checks revocation by token version (see `accounts/tokens.py`).
+    """
+
+    token_class = DepartmentRefreshToken
+
+    def validate(self, attrs):
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            return super().validate(attrs)
+        refresh = self.token_class(attrs["refresh"])
+        principal = load_principal(
+            refresh.payload.get(api_settings.USER_ID_CLAIM),
+            refresh.payload.get(TOKEN_VERSION_CLAIM, 0),
+        )
+        if principal is None or not api_settings.USER_AUTHENTICATION_RULE(principal):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+        return {"access": str(refresh.access_token)}
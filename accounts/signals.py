@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from pay.catalog import PUBLIC_DEPARTMENT_FIELDS, invalidate_catalog
 from pay.utils import send_welcome_mail
+from .authentication import invalidate_principal
 from .models import Department
 import logging
 
@@ -15,4 +17,23 @@ def send_welcome_email_signal(sender, instance, created, **kwargs):
             logger.info("Email sent!")
         except Exception as e:
             logger.error(f"An error occured, Detail: {str(e)}")
-        
\ No newline at end of file
+        
+
+
+@receiver(post_save, sender=Department)
+def invalidate_catalog_on_department_change(sender, instance, update_fields=None, **kwargs):
+    # logins only touch `last_login`; approvals and profile edits change what students see
+    if update_fields is not None and not PUBLIC_DEPARTMENT_FIELDS & set(update_fields):
+        return
+    invalidate_catalog()
+
+
+@receiver(post_delete, sender=Department)
+def invalidate_catalog_on_department_delete(sender, instance, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_principal_on_department_change(sender, instance, **kwargs):
+    invalidate_principal(instance)
@@ -0,0 +1,239 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import as_completed
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from accounts import approval
+from accounts.approval import (
+    ApprovalError,
+    run_approval_job,
+    start_approval,
+)
+from accounts.models import ApprovalJob, Department
+from utils.factories import DepartmentFactory
+from utils.stub_services import use_stub_services
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "navy").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class DepartmentApprovalTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.storage_dir = tempfile.mkdtemp()
+        cls.stub = cls.enterClassContext(use_stub_services())
+        cls.enterClassContext(
+            override_settings(
+                STORAGES={
+                    "default": {
+                        "BACKEND": "django.core.files.storage.FileSystemStorage",
+                        "OPTIONS": {"location": cls.storage_dir},
+                    },
+                    "staticfiles": {
+                        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                    },
+                },
+                APPROVAL_WORKERS=3,
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.storage_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.departments = DepartmentFactory.create_batch(3, bank_name="Access Bank")
+        self.departments[0].logo = SimpleUploadedFile("logo.png", png(600, 600))
+        self.departments[0].president_signature = SimpleUploadedFile(
+            "sign.png", b"\x89PNG not really"
+        )
+        self.departments[0].save()
+        # uploads left by failed approvals would rename the next test's files
+        self.addCleanup(
+            shutil.rmtree, os.path.join(self.storage_dir, "temp_uploads"), True
+        )
+        # forget the welcome emails
+        self.stub.state.reset()
+
+    def start(self, departments):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = start_approval(departments)
+        self.assertEqual(len(callbacks), 1)
+        return job
+
+    def test_approves_departments_in_the_background(self):
+        job = self.start(Department.objects.all())
+        self.assertEqual(job.total, 3)
+        self.assertEqual(job.status, ApprovalJob.Status.PENDING)
+
+        logo_path = self.departments[0].logo.path
+        job = run_approval_job(job.pk)
+        self.assertEqual(job.status, ApprovalJob.Status.DONE)
+        self.assertEqual((job.approved, job.failed, job.processed), (3, 0, 3))
+        self.assertEqual(job.percent, 100)
+
+        for department in Department.objects.all():
+            self.assertTrue(department.is_verified)
+            self.assertTrue(department.sub_account_code.startswith("ACCT_"))
+            self.assertEqual(department.bank_code, "044")
+        department = Department.objects.get(pk=self.departments[0].pk)
+        self.assertIn("/storage/v1/object/public/logo/", department.logo_url)
+        self.assertIn("/signatures/", department.president_signature_url)
+        self.assertFalse(os.path.exists(logo_path))
+        # normalized receipt and preview variants of the logo; the unreadable signature has none
+        self.assertIn("logo.receipt.jpg", department.asset_url("logo"))
+        self.assertIn("logo.preview.jpg", department.asset_url("logo", "preview"))
+        self.assertEqual(department.asset_variants["president_signature"], {})
+        self.assertEqual(
+            department.asset_url("president_signature"),
+            department.president_signature_url,
+        )
+        self.assertEqual(len(self.stub.state.objects), 4)
+        self.assertEqual(len(self.stub.state.emails), 3)
+
+        # running it again does nothing
+        run_approval_job(job.pk)
+        self.assertEqual(len(self.stub.state.emails), 3)
+
+    def test_failed_step_keeps_what_succeeded(self):
+        job = self.start(Department.objects.filter(pk=self.departments[0].pk))
+        with mock.patch(
+            "accounts.approval.upload_to_supabase", side_effect=OSError("storage down")
+        ):
+            job = run_approval_job(job.pk)
+        self.assertEqual((job.approved, job.failed), (0, 1))
+        self.assertEqual(job.results[0]["messages"], ["storage down"])
+
+        department = Department.objects.get(pk=self.departments[0].pk)
+        self.assertFalse(department.is_verified)
+        # a retry reuses the subaccount instead of creating another one
+        self.assertTrue(department.sub_account_code.startswith("ACCT_"))
+
+    def test_retry_after_a_failed_subaccount_reuses_the_uploads(self):
+        department = self.departments[0]
+        logo_path = department.logo.path
+        with mock.patch(
+            "accounts.approval.create_subaccount",
+            side_effect=ApprovalError("Paystack down"),
+        ):
+            job = run_approval_job(self.start([department]).pk)
+        self.assertEqual(job.failed, 1)
+        department.refresh_from_db()
+        self.assertFalse(department.is_verified)
+        self.assertIn("/storage/v1/object/public/logo/", department.logo_url)
+        # the local files stay until the approval succeeds
+        self.assertTrue(os.path.exists(logo_path))
+
+        with mock.patch(
+            "accounts.approval.upload_to_supabase",
+            side_effect=OSError("uploaded twice"),
+        ):
+            job = run_approval_job(self.start([department]).pk)
+        self.assertEqual((job.approved, job.failed), (1, 0))
+        department.refresh_from_db()
+        self.assertTrue(department.is_verified)
+        self.assertFalse(os.path.exists(logo_path))
+
+    @override_settings(APPROVAL_WORKERS=1)
+    def test_interrupted_job_is_resumed_without_redoing_finished_departments(self):
+        job = self.start(
+            Department.objects.filter(pk__in=[d.pk for d in self.departments[1:]])
+        )
+        first, second = job.department_ids
+        provision = approval.provision
+
+        def worker_recycled(department):
+            if str(department.pk) == second:
+                raise SystemExit("worker recycled")
+            return provision(department)
+
+        with mock.patch("accounts.approval.provision", side_effect=worker_recycled):
+            with self.assertRaises(SystemExit):
+                run_approval_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ApprovalJob.Status.RUNNING)
+        self.assertEqual([r["department"] for r in job.results], [first])
+
+        # not stale yet
+        call_command("resume_background_jobs", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ApprovalJob.Status.RUNNING)
+
+        ApprovalJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        with mock.patch("accounts.approval.provision", wraps=provision) as resumed:
+            call_command("resume_background_jobs", stdout=StringIO())
+        self.assertEqual([str(c.args[0].pk) for c in resumed.call_args_list], [second])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ApprovalJob.Status.DONE)
+        self.assertEqual((job.approved, job.failed, job.processed), (2, 0, 2))
+        self.assertEqual(len(self.stub.state.emails), 2)
+
+    def test_approval_keeps_concurrent_updates(self):
+        department = self.departments[1]
+
+        paid = []
+
+        def paid_meanwhile(futures):
+            # a payment lands after the job loaded the department, before it is saved
+            if not paid:
+                Department.objects.filter(pk=department.pk).update(payer_count=7)
+                paid.append(True)
+            return as_completed(futures)
+
+        with mock.patch("accounts.approval.as_completed", side_effect=paid_meanwhile):
+            run_approval_job(self.start([department]).pk)
+        department.refresh_from_db()
+        self.assertTrue(department.is_verified)
+        self.assertEqual(department.payer_count, 7)
+
+    def test_unknown_bank_is_approved_with_a_warning(self):
+        Department.objects.filter(pk=self.departments[1].pk).update(bank_name="Nope")
+        job = run_approval_job(self.start([self.departments[1]]).pk)
+        self.assertEqual(job.approved, 1)
+        self.assertIn("manual bank verification", job.results[0]["messages"][0])
+
+    def test_admin_bulk_action_redirects_to_progress(self):
+        admin = Department.objects.create_superuser("admin@x.com", "Testpass123")
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:accounts_department_changelist"),
+            {
+                "action": "approve_departments",
+                "_selected_action": [str(d.pk) for d in self.departments],
+            },
+        )
+        job = ApprovalJob.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("admin:approval_job_progress", args=[job.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(job.total, 3)
+
+        run_approval_job(job.pk)
+        response = self.client.get(
+            reverse("admin:approval_job_progress", args=[job.pk]), {"format": "json"}
+        )
+        self.assertEqual(response.json()["approved"], 3)
+        response = self.client.get(
+            reverse("admin:approval_job_progress", args=[job.pk])
+        )
+        self.assertContains(response, "3 of 3 department(s) processed")
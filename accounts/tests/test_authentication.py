@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from accounts.authentication import PRINCIPAL_FIELDS, load_principal
+from accounts.models import Department
+from accounts.tokens import TOKEN_VERSION_CLAIM, DepartmentRefreshToken
+from utils.factories import DepartmentFactory
+from .test_ini import BaseUserTestCase
+
+
+class CachedAuthenticationTests(BaseUserTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.department = DepartmentFactory.create(is_verified=True)
+        self.refresh = DepartmentRefreshToken.for_user(self.department)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}"
+        )
+
+    def test_tokens_carry_the_token_version(self):
+        self.assertEqual(self.refresh[TOKEN_VERSION_CLAIM], 0)
+        self.assertEqual(self.refresh.access_token[TOKEN_VERSION_CLAIM], 0)
+
+    def test_principal_is_loaded_once_with_only_the_needed_columns(self):
+        principal = load_principal(str(self.department.pk), 0)
+        self.assertEqual(principal, self.department)
+        self.assertIn("password", principal.get_deferred_fields())
+        self.assertIn("logo_url", principal.get_deferred_fields())
+        self.assertFalse(set(PRINCIPAL_FIELDS) & principal.get_deferred_fields())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(load_principal(str(self.department.pk), 0), principal)
+
+    def test_saving_the_department_refreshes_the_principal(self):
+        load_principal(str(self.department.pk), 0)
+        self.department.is_verified = False
+        self.department.save()
+        self.assertFalse(load_principal(str(self.department.pk), 0).is_verified)
+
+    def test_revoked_token_version_is_refused(self):
+        response = self.client.get(reverse("transaction-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.department.token_version = 1
+        self.department.save()
+        response = self.client.get(reverse("transaction-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_password_with_cached_principal(self):
+        self.client.get(reverse("transaction-list"))
+        response = self.client.post(
+            reverse("change_password"),
+            {"old_password": self.password, "new_password": "An0ther-Secret!"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        department = Department.objects.get(pk=self.department.pk)
+        self.assertTrue(department.check_password("An0ther-Secret!"))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from accounts.tokens import (
+    DepartmentRefreshToken,
+    prune_expired_tokens,
+    revoke_all_tokens,
+)
+from utils.factories import DepartmentFactory
+from .test_ini import BaseUserTestCase
+
+
+class TokenRevocationTests(BaseUserTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.department = DepartmentFactory.create(is_verified=True)
+        self.tokens = [
+            DepartmentRefreshToken.for_user(self.department) for _ in range(3)
+        ]
+        self.tokens[0].blacklist()
+        self.other = DepartmentRefreshToken.for_user(DepartmentFactory.create())
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": str(token)})
+
+    def test_refresh(self):
+        response = self.refresh(self.tokens[1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.json())
+
+    def test_revoke_all_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            # savepoint, version bump, the INSERT ... SELECT, release, reload of the version
+            with self.assertNumQueries(5):
+                revoked = revoke_all_tokens(self.department)
+        self.assertEqual(revoked, 2)
+        self.assertEqual(self.department.token_version, 1)
+        self.assertEqual(
+            BlacklistedToken.objects.filter(token__user=self.department).count(), 3
+        )
+        self.assertFalse(
+            BlacklistedToken.objects.filter(token__jti=self.other["jti"]).exists()
+        )
+
+        for token in self.tokens:
+            self.assertEqual(
+                self.refresh(token).status_code, status.HTTP_401_UNAUTHORIZED
+            )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens[1].access_token}"
+        )
+        response = self.client.get(reverse("transaction-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # tokens issued afterwards work
+        self.assertEqual(
+            self.refresh(DepartmentRefreshToken.for_user(self.department)).status_code,
+            status.HTTP_200_OK,
+        )
+        self.assertEqual(self.refresh(self.other).status_code, status.HTTP_200_OK)
+
+    def test_change_password_logs_out_everywhere(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens[1].access_token}"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("change_password"),
+                {
+                    "old_password": self.password,
+                    "new_password": "An0ther-Secret!",
+                    "logout_all": True,
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.refresh(self.tokens[2]).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_prune_expired_tokens(self):
+        OutstandingToken.objects.filter(
+            jti__in=[t["jti"] for t in self.tokens[:2]]
+        ).update(expires_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(prune_expired_tokens(batch_size=1), 2)
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
@@ -0,0 +1,122 @@
+"""
+Department tokens, bulk revocation and blacklist maintenance.
+
+Every token carries the department's `token_version`. Revoking all of a department's tokens bumps
+the version, so checking a token is a comparison with the (cached) principal instead of a blacklist
+lookup. The outstanding tokens are still blacklisted, in one statement, so the token tables stay an
+accurate audit trail; `prune_expired_tokens` keeps them from growing without bound.
+"""
+
+import logging
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Department
+
+
+logger = logging.getLogger(__name__)
+
+# Claim carrying the department's `token_version` at issue time; tokens issued before a
+# revocation carry an older version and are refused by `CachedJWTAuthentication`
+TOKEN_VERSION_CLAIM = "ver"
+PRUNE_BATCH_SIZE = 1000
+
+
+class DepartmentRefreshToken(RefreshToken):
+    """
+    A refresh token stamped with the department's token version. Access tokens minted from it,
+    including through `/api/token/refresh/`, inherit the claim.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    def check_blacklist(self):
+        if TOKEN_VERSION_CLAIM not in self.payload:
+            # issued before token versions existed; only the blacklist knows about these
+            return super().check_blacklist()
+        from .authentication import load_principal
+
+        principal = load_principal(
+            self.payload.get(api_settings.USER_ID_CLAIM),
+            self.payload[TOKEN_VERSION_CLAIM],
+        )
+        if principal is None:
+            raise TokenError(_("Token is blacklisted"))
+
+
+def revoke_all_tokens(department):
+    """
+    The function `revoke_all_tokens` logs a department out everywhere: it bumps the department's
+    token version, which invalidates every access and refresh token issued so far, and blacklists
+    all of its unexpired outstanding tokens with a single INSERT ... SELECT.
+
+    :param department: The department whose tokens are revoked.
+    :return: The number of tokens added to the blacklist.
+    """
+    from .authentication import invalidate_principal
+
+    now = timezone.now()
+    quote = connection.ops.quote_name
+    outstanding = quote(OutstandingToken._meta.db_table)
+    blacklisted = quote(BlacklistedToken._meta.db_table)
+    with transaction.atomic():
+        Department.objects.filter(pk=department.pk).update(
+            token_version=F("token_version") + 1
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {blacklisted} ({quote('token_id')}, {quote('blacklisted_at')}) "
+                f"SELECT o.{quote('id')}, %s FROM {outstanding} o "
+                f"WHERE o.{quote('user_id')} = %s AND o.{quote('expires_at')} > %s "
+                f"AND NOT EXISTS (SELECT 1 FROM {blacklisted} b "
+                f"WHERE b.{quote('token_id')} = o.{quote('id')})",
+                [
+                    connection.ops.adapt_datetimefield_value(now),
+                    Department._meta.pk.get_db_prep_value(department.pk, connection),
+                    connection.ops.adapt_datetimefield_value(now),
+                ],
+            )
+            revoked = cursor.rowcount
+        transaction.on_commit(lambda: invalidate_principal(department))
+    department.refresh_from_db(fields=["token_version"])
+    logger.info(f"Revoked {revoked} tokens for department {department.pk}")
+    return revoked
+
+
+def prune_expired_tokens(batch_size=PRUNE_BATCH_SIZE):
+    """
+    The function `prune_expired_tokens` deletes expired outstanding tokens and their blacklist
+    entries in batches of `batch_size`, each in its own short transaction, so pruning a large
+    backlog never holds long locks on the token tables. Expired tokens fail validation on their
+    own, so their rows serve no purpose.
+
+    :return: The number of outstanding tokens deleted.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by()
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    logger.info(f"Pruned {deleted} expired tokens")
+    return deleted
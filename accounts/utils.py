@@ -1,12 +1,27 @@
 from pprint import pprint
 import requests
-from decouple import config
+from django.conf import settings
+from django.core.cache import cache
+from utils.metrics import traced
+
+BANK_CODES_KEY = "paystack:bank_codes"
+BANK_CODES_TIMEOUT = 60 * 60 * 24
+
 
 def get_bank_codes():
+    # the bank list rarely changes; a bulk approval needs it once per department
+    bank_codes = cache.get(BANK_CODES_KEY)
+    if bank_codes is None:
+        bank_codes = fetch_bank_codes()
+        cache.set(BANK_CODES_KEY, bank_codes, timeout=BANK_CODES_TIMEOUT)
+    return bank_codes
+
+@traced("paystack.list_banks")
+def fetch_bank_codes():
     headers = {
-    "Authorization": f"Bearer {config("PAYSTACK_SECRET_KEY")}"
+    "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"
 }
-    response = requests.get(url="https://api.paystack.co/bank", headers=headers)
+    response = requests.get(url=f"{settings.PAYSTACK_BASE_URL}/bank", headers=headers)
     response.raise_for_status()
     bank_codes = dict()
     for k in response.json()['data']:
@@ -16,11 +31,12 @@ def get_bank_codes():
 def get_specific_bank_code(bank_name):
     return get_bank_codes()[bank_name]
 
+@traced("paystack.resolve_account")
 def resolve_account_number(account_number, bank_code):
     header = {
-        "Authorization": f"Bearer {config("PAYSTACK_SECRET_KEY")}"
+        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"
     }
-    response = requests.get(url=f"https://api.paystack.co/bank/resolve?account_number={account_number}&bank_code={bank_code}", headers=header)
+    response = requests.get(url=f"{settings.PAYSTACK_BASE_URL}/bank/resolve?account_number={account_number}&bank_code={bank_code}", headers=header)
     response.raise_for_status()
     return response.json()['data']['account_name']
 
@@ -1,15 +1,16 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from .models import Department
+from .tokens import DepartmentRefreshToken
 from .serializers import (
     RegisterDepartmentSerializer,
     LoginSerializer,
     DepartmentSerializer,
 )
 from utils.permissions import isVerifiedUser
+from utils.conditional import ConditionalGetMixin
 from django.contrib.auth import authenticate
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
@@ -32,7 +33,7 @@ class RegisterViewSet(ModelViewSet):
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
-            refresh = RefreshToken.for_user(serializer.instance)
+            refresh = DepartmentRefreshToken.for_user(serializer.instance)
             return Response(
                 {
                     "access_token": str(refresh.access_token),
@@ -66,7 +67,7 @@ class LoginViewSet(ModelViewSet):
                 {"error": "Email or Password is incorrect"},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
-        refresh = RefreshToken.for_user(user)
+        refresh = DepartmentRefreshToken.for_user(user)
         return Response(
             {
                 "access_token": str(refresh.access_token),
@@ -78,7 +79,7 @@ class LoginViewSet(ModelViewSet):
         )
 
 
-class DepartmentViewSet(ModelViewSet):
+class DepartmentViewSet(ConditionalGetMixin, ModelViewSet):
     """
     The `DepartmentViewSet` class defines CRUD operations for Department objects with authentication,
     data validation, and external API interactions for creating subaccounts.
@@ -88,6 +89,9 @@ class DepartmentViewSet(ModelViewSet):
     serializer_class = DepartmentSerializer
     permission_classes = [isVerifiedUser]
     http_method_names = ["get"]
+    # running totals change through `last_payment_at` without touching `updated_at`
+    conditional_fields = ("updated_at", "last_payment_at")
+    replica_actions = ("list", "retrieve")
 
     def get_permissions(self):
         if self.action in ["delete"]:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction, Payment
+from .models import Transaction, TransactionArchive, Payment, ReceiptBundle
 
 
 @admin.register(Payment)
@@ -11,3 +11,17 @@ class PaymentAdmin(admin.ModelAdmin):
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ["txn_id", "department", "payment", "amount_paid", "status"]
     list_filter = ["status", "department"]
+
+
+@admin.register(TransactionArchive)
+class TransactionArchiveAdmin(admin.ModelAdmin):
+    list_display = ["session", "department", "row_count", "total_amount", "created_at"]
+    list_filter = ["session"]
+    readonly_fields = [field.name for field in TransactionArchive._meta.fields]
+
+
+@admin.register(ReceiptBundle)
+class ReceiptBundleAdmin(admin.ModelAdmin):
+    list_display = ["department", "status", "total", "rendered", "created_at"]
+    list_filter = ["status"]
+    readonly_fields = [field.name for field in ReceiptBundle._meta.fields]
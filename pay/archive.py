@@ -0,0 +1,316 @@
+"""
+Archival of closed academic sessions: a department's transactions for a session are written to a
+zstd-compressed Parquet file in the private Supabase storage bucket `TRANSACTION_ARCHIVE_BUCKET`
+and removed from `pay_transaction`, keeping the hot table down to the sessions still in progress.
+The web containers' disks are wiped on every deploy and not shared between instances, so
+archives never go to local storage, and rows are only deleted once the uploaded file has been
+read back and checked. Receipt verification, single receipt
+downloads, stats and the CSV export keep working through `TransactionArchive` and
+`ArchivedReceipt`. Receipt bundles, like the transaction list they are filtered from, only cover
+the live table.
+"""
+
+import hashlib
+import io
+import logging
+import uuid
+from datetime import datetime
+import requests
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Min
+from django.utils import timezone
+from utils.lazy import lazy_module
+from utils.supabase_util import delete_object, get_object, put_object
+from utils.versioning import bump_version
+from .models import ArchivedReceipt, Transaction, TransactionArchive
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = [
+    "txn_id",
+    "department_id",
+    "payment_id",
+    "payment__payment_for",
+    "amount_paid",
+    "created_at",
+    "status",
+    "customer_code",
+    "first_name",
+    "last_name",
+    "customer_email",
+    "received_from",
+    "ip_address",
+    "txn_reference",
+    "receipt_url",
+    "receipt_hash",
+]
+
+BATCH_SIZE = 1000
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def session_for(moment):
+    """
+    The function `session_for` returns the academic session ("2023/2024") a datetime falls in.
+    """
+    start_month = settings.ACADEMIC_SESSION_START_MONTH
+    year = moment.year if moment.month >= start_month else moment.year - 1
+    return f"{year}/{year + 1}"
+
+
+def session_bounds(session):
+    """
+    The function `session_bounds` returns the `(start, end)` datetimes of an academic session; the
+    end is exclusive.
+    """
+    start_year = int(session.split("/")[0])
+    month = settings.ACADEMIC_SESSION_START_MONTH
+    tz = timezone.get_current_timezone()
+    return (
+        datetime(start_year, month, 1, tzinfo=tz),
+        datetime(start_year + 1, month, 1, tzinfo=tz),
+    )
+
+
+def closed_sessions(now=None):
+    """
+    The function `closed_sessions` lists the sessions before the current one that still have
+    transactions in the live table, oldest first.
+    """
+    current_start, _ = session_bounds(session_for(timezone.localtime(now)))
+    oldest = Transaction.objects.filter(created_at__lt=current_start).aggregate(
+        oldest=Min("created_at")
+    )["oldest"]
+    if oldest is None:
+        return []
+    first_year = int(session_for(timezone.localtime(oldest)).split("/")[0])
+    sessions = [f"{year}/{year + 1}" for year in range(first_year, current_start.year)]
+    return [
+        session
+        for session in sessions
+        if Transaction.objects.filter(
+            created_at__gte=session_bounds(session)[0],
+            created_at__lt=session_bounds(session)[1],
+        ).exists()
+    ]
+
+
+def archive_path(department_id, session):
+    # unique per write, so a merged archive never overwrites the one still referenced
+    return (
+        f"{settings.TRANSACTION_ARCHIVE_PREFIX}/session={session.replace('/', '-')}/"
+        f"department={department_id or 'none'}-{uuid.uuid4().hex[:12]}.parquet"
+    )
+
+
+def store_archive(path, content, row_count):
+    """
+    The function `store_archive` uploads an archive file and reads it back, so the rows it holds
+    are only deleted from the live table once storage is known to have all of them.
+
+    :raises ArchiveError: When the stored object differs from `content` or does not hold
+    `row_count` rows; the upload is removed again.
+    :raises requests.RequestException: When storage cannot be reached.
+    """
+    pd = lazy_module("pandas")
+    bucket = settings.TRANSACTION_ARCHIVE_BUCKET
+    put_object(bucket, path, content, PARQUET_CONTENT_TYPE)
+    try:
+        stored = get_object(bucket, path)
+    except requests.RequestException:
+        discard_archive(path)
+        raise
+    problem = None
+    if hashlib.sha256(stored).digest() != hashlib.sha256(content).digest():
+        problem = "its checksum does not match"
+    elif len(pd.read_parquet(io.BytesIO(stored), columns=["txn_id"])) != row_count:
+        problem = f"it does not hold {row_count} rows"
+    if problem:
+        discard_archive(path)
+        raise ArchiveError(f"The archive uploaded to {path} was not kept: {problem}")
+
+
+def discard_archive(path):
+    try:
+        delete_object(settings.TRANSACTION_ARCHIVE_BUCKET, path)
+    except requests.RequestException as e:
+        logger.warning(f"Could not delete the archive {path}: {e}")
+
+
+def read_archive(archive, columns=None, filters=None):
+    """
+    The function `read_archive` loads an archive file into a pandas DataFrame.
+
+    :param archive: A `TransactionArchive`.
+    :param columns: Optional list of columns to read; Parquet only decodes those.
+    :param filters: Optional pyarrow row filters, e.g. `[("receipt_hash", "==", value)]`.
+    """
+    pd = lazy_module("pandas")
+    content = get_object(settings.TRANSACTION_ARCHIVE_BUCKET, archive.file_path)
+    return pd.read_parquet(io.BytesIO(content), columns=columns, filters=filters)
+
+
+def archive_department_session(department_id, session, dry_run=False):
+    """
+    The function `archive_department_session` moves one department's transactions for a closed
+    session into its Parquet archive, merging with any archive already written for it.
+
+    :param department_id: The department's primary key, or None for orphaned transactions.
+    :param session: The session name, e.g. "2023/2024".
+    :param dry_run: Count the rows that would move without writing or deleting anything.
+    :return: The number of transactions archived.
+    """
+    pd = lazy_module("pandas")
+    start, end = session_bounds(session)
+    queryset = Transaction.objects.filter(
+        department_id=department_id, created_at__gte=start, created_at__lt=end
+    )
+    rows = list(queryset.order_by("created_at").values(*ARCHIVE_FIELDS))
+    if not rows or dry_run:
+        return len(rows)
+
+    frame = pd.DataFrame.from_records(rows, columns=ARCHIVE_FIELDS).rename(
+        columns={"payment__payment_for": "payment_for"}
+    )
+    frame["department_id"] = frame["department_id"].astype(str)
+    existing = TransactionArchive.objects.filter(
+        department_id=department_id, session=session
+    ).first()
+    if existing:
+        frame = pd.concat([read_archive(existing), frame], ignore_index=True)
+
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, compression="zstd", index=False)
+    saved_path = archive_path(department_id, session)
+
+    # an existing archive is only replaced once the merged file and its rows are committed
+    store_archive(saved_path, buffer.getvalue(), len(frame))
+    try:
+        with db_transaction.atomic():
+            archive, _ = TransactionArchive.objects.update_or_create(
+                department_id=department_id,
+                session=session,
+                defaults={
+                    "file_path": saved_path,
+                    "row_count": len(frame),
+                    "total_amount": sum(frame["amount_paid"]),
+                    "first_created_at": frame["created_at"].min(),
+                    "last_created_at": frame["created_at"].max(),
+                },
+            )
+            ArchivedReceipt.objects.bulk_create(
+                [
+                    ArchivedReceipt(
+                        receipt_hash=row["receipt_hash"],
+                        archive=archive,
+                        payment_id=row["payment_id"],
+                        status=row["status"],
+                        txn_id=row["txn_id"],
+                        txn_reference=row["txn_reference"],
+                        amount_paid=row["amount_paid"],
+                        created_at=row["created_at"],
+                    )
+                    for row in rows
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            ids = [row["txn_id"] for row in rows]
+            for i in range(0, len(ids), BATCH_SIZE):
+                Transaction.objects.filter(pk__in=ids[i : i + BATCH_SIZE]).delete()
+            if existing and existing.file_path != saved_path:
+                db_transaction.on_commit(lambda: discard_archive(existing.file_path))
+    except Exception:
+        discard_archive(saved_path)
+        raise
+
+    if department_id:
+        bump_version("department", department_id)
+    logger.info(f"Archived {len(rows)} transactions for {session} to {saved_path}")
+    return len(rows)
+
+
+def archive_session(session, dry_run=False):
+    """
+    The function `archive_session` archives every department's transactions for a session.
+
+    :return: A dictionary mapping department ids to the number of transactions archived.
+    """
+    start, end = session_bounds(session)
+    department_ids = (
+        Transaction.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values_list("department_id", flat=True)
+        .distinct()
+    )
+    return {
+        department_id: archive_department_session(department_id, session, dry_run)
+        for department_id in list(department_ids)
+    }
+
+
+def archived_transaction(receipt_hash):
+    """
+    The function `archived_transaction` rebuilds an archived transaction from its session's
+    archive, for serving its receipt. The instance is never saved.
+
+    :return: An unsaved `Transaction`, or None when no archived receipt has this hash.
+    """
+    pd = lazy_module("pandas")
+    receipt = (
+        ArchivedReceipt.objects.filter(receipt_hash=receipt_hash)
+        .select_related("archive__department", "payment")
+        .first()
+    )
+    if receipt is None:
+        return None
+    frame = read_archive(
+        receipt.archive,
+        columns=["received_from", "receipt_url"],
+        filters=[("receipt_hash", "==", receipt_hash)],
+    )
+    if frame.empty:
+        return None
+    row = frame.iloc[0]
+    return Transaction(
+        txn_id=receipt.txn_id,
+        department=receipt.archive.department,
+        payment=receipt.payment,
+        amount_paid=receipt.amount_paid,
+        created_at=receipt.created_at,
+        status=receipt.status,
+        txn_reference=receipt.txn_reference,
+        received_from=row["received_from"],
+        receipt_url=row["receipt_url"] if pd.notna(row["receipt_url"]) else None,
+        receipt_hash=receipt_hash,
+    )
+
+
+def archived_export_rows(department):
+    """
+    The function `archived_export_rows` yields a department's archived transactions in the shape
+    used by the CSV export, one session at a time.
+    """
+    archives = TransactionArchive.objects.filter(department=department).order_by(
+        "first_created_at"
+    )
+    for archive in archives:
+        frame = read_archive(archive)
+        for row in frame.itertuples(index=False):
+            yield {
+                "txn_id": row.txn_id,
+                "status": row.status,
+                "amount_paid": row.amount_paid,
+                "txn_reference": row.txn_reference,
+                "payment__payment_for": row.payment_for,
+                "department__dept_name": department.dept_name,
+                "received_from": row.received_from,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "customer_email": row.customer_email,
+                "created_at": row.created_at,
+            }
@@ -0,0 +1,355 @@
+"""
+Payment-day load simulation: seeds departments, payment items and past transactions, then runs
+students through checkout, verification, receipt lookup and the department dashboard against
+the offline stand-in in `utils/stub_services.py`.
+
+Used by `python manage.py benchmark_payments` and `pay/tests/test_benchmark.py`.
+"""
+
+import json
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.models import Transaction
+from receipt_utils.create_receipt import (
+    SCHOOL_LOGO_PATH,
+    generate_receipt,
+    generate_receipts,
+)
+from receipt_utils.upload_receipt import upload_receipt
+from utils.buffers import as_buffer
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+from utils.metrics import QueryCounter
+from .utils import send_receipt_email
+
+
+RESULTS_DIR = Path(settings.BASE_DIR) / "benchmarks" / "results"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class Recorder:
+    """
+    Collects latency and query counts per endpoint from every simulated client thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, endpoint, request, *args, **kwargs):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connections["default"].execute_wrapper(counter):
+            response = request(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples[endpoint].append((elapsed, counter.count))
+            if response.status_code >= 400 or _has_error(response):
+                self.errors[endpoint] += 1
+        return response
+
+    def summary(self, duration):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = [elapsed * 1000 for elapsed, _ in samples]
+            queries = [count for _, count in samples]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(samples) / duration, 2) if duration else 0,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "mean_queries": round(sum(queries) / len(queries), 2),
+                "max_queries": max(queries),
+            }
+        return endpoints
+
+
+def _has_error(response):
+    if response.get("Content-Type", "").startswith("application/json"):
+        try:
+            return isinstance(response.json(), dict) and "error" in response.json()
+        except ValueError:
+            return False
+    return False
+
+
+def seed(departments, payments_per_department, history_per_department):
+    """
+    The function `seed` creates verified departments with payment items and a history of
+    successful transactions.
+
+    :return: A list of `(department, payments, access_token)` tuples.
+    """
+    seeded = []
+    for index in range(departments):
+        department = DepartmentFactory.create(
+            is_verified=True, sub_account_code=f"ACCT_bench{index:04d}"
+        )
+        payments = PaymentFactory.create_batch(
+            payments_per_department, department=department
+        )
+        for _ in range(history_per_department):
+            TransactionFactory.create(payment=random.choice(payments))
+        access_token = str(RefreshToken.for_user(department).access_token)
+        seeded.append((department, payments, access_token))
+    return seeded
+
+
+def simulate_student(recorder, department, payments, access_token, student):
+    """
+    Runs one student through checkout → verification → receipt lookup, followed by the dashboard
+    poll their department makes when the payment lands.
+    """
+    client = Client()
+    payment = random.choice(payments)
+    response = recorder.call(
+        "transaction.init",
+        client.post,
+        reverse("transaction-list"),
+        {
+            "department": department.id,
+            "payment": payment.id,
+            "first_name": f"Student{student}",
+            "last_name": "Bench",
+            "customer_email": f"student{student}@bench.test",
+        },
+    )
+    if response.status_code != 200:
+        return
+    reference = response.json()["authorization_url"].rsplit("/", 1)[-1]
+    recorder.call(
+        "transaction.verify",
+        client.get,
+        reverse("transaction-transaction-verify"),
+        {"trxref": reference},
+    )
+    receipt_hash = (
+        Transaction.objects.filter(txn_reference=reference)
+        .values_list("receipt_hash", flat=True)
+        .first()
+    )
+    if receipt_hash:
+        recorder.call(
+            "receipt.verify",
+            client.get,
+            reverse("verify-receipt"),
+            {"hash": receipt_hash},
+        )
+
+    dashboard = Client(headers={"Authorization": f"Bearer {access_token}"})
+    recorder.call("transaction.list", dashboard.get, reverse("transaction-list"))
+    recorder.call(
+        "transaction.stats", dashboard.get, reverse("transaction-transaction-stats")
+    )
+
+
+def run_benchmark(
+    departments=5,
+    payments_per_department=3,
+    history_per_department=50,
+    students=100,
+    concurrency=1,
+):
+    """
+    The function `run_benchmark` seeds the database and simulates `students` payments spread
+    across the departments, `concurrency` at a time. Third-party calls must already be pointed at
+    the stand-in (see `utils.stub_services.use_stub_services`).
+
+    :return: A dictionary with the scenario, overall throughput and per-endpoint p50/p95/p99
+    latency and query counts.
+    """
+    seeded = seed(departments, payments_per_department, history_per_department)
+    recorder = Recorder()
+
+    def worker(student):
+        try:
+            department, payments, access_token = seeded[student % len(seeded)]
+            simulate_student(recorder, department, payments, access_token, student)
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(students)))
+    else:
+        for student in range(students):
+            worker(student)
+    duration = time.perf_counter() - start
+
+    endpoints = recorder.summary(duration)
+    total_requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "scenario": {
+            "departments": departments,
+            "payments_per_department": payments_per_department,
+            "history_per_department": history_per_department,
+            "students": students,
+            "concurrency": concurrency,
+            "database": connections["default"].vendor,
+        },
+        "total": {
+            "duration_s": round(duration, 3),
+            "requests": total_requests,
+            "throughput_rps": round(total_requests / duration, 2) if duration else 0,
+            "students_per_s": round(students / duration, 2) if duration else 0,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _receipt_data(n):
+    return {
+        "header": "BENCHMARK DEPARTMENT",
+        "date": "2025-01-01",
+        "received_from": f"Student{n} Bench",
+        "payment_for": "Dues",
+        "amount_words": "one thousand naira, zero kobo",
+        "amount": 1000,
+        "department_logo": SCHOOL_LOGO_PATH,
+        "receipt_hash": f"{n:064d}",
+    }
+
+
+def _receipt_pipeline(n, stage):
+    data = _receipt_data(n)
+    pdf = as_buffer(generate_receipt(data))
+    stage("render")
+    upload_receipt(f"benchmark/{n}.pdf", pdf)
+    stage("upload")
+    send_receipt_email(f"student{n}@bench.test", data, pdf, "receipt.pdf")
+    stage("email")
+    return len(pdf)
+
+
+def measure_receipt_memory(receipts=20):
+    """
+    The function `measure_receipt_memory` renders, uploads and emails `receipts` receipts one after
+    another, as `transaction_verify` does, tracing Python allocations with `tracemalloc`. A first,
+    untraced receipt loads the fonts and builds the API clients. Third-party calls must already be
+    pointed at the stand-in.
+
+    :return: The mean PDF size and, per stage and for the whole pipeline, the largest peak
+    allocation of one receipt above what was allocated before it, in bytes.
+    """
+    _receipt_pipeline(0, lambda name: None)
+    peaks = defaultdict(int)
+    sizes = []
+    tracemalloc.start()
+    try:
+        for n in range(1, receipts + 1):
+            tracemalloc.reset_peak()
+            start = stage_start = tracemalloc.get_traced_memory()[0]
+
+            def stage(name):
+                nonlocal stage_start
+                current, peak = tracemalloc.get_traced_memory()
+                peaks[name] = max(peaks[name], peak - stage_start)
+                peaks["total"] = max(peaks["total"], peak - start)
+                tracemalloc.reset_peak()
+                stage_start = current
+
+            sizes.append(_receipt_pipeline(n, stage))
+    finally:
+        tracemalloc.stop()
+    return {
+        "receipts": receipts,
+        "pdf_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "peak_bytes": dict(peaks),
+    }
+
+
+def measure_receipt_size(bundle_receipts=10):
+    """
+    The function `measure_receipt_size` renders one receipt on its own and `bundle_receipts` of
+    them as one document, as a receipt bundle is, and reports their sizes and what they embed.
+
+    :return: The single receipt's size, the bundle's size per receipt, both in bytes, and the
+    number of fonts and images embedded in the single receipt.
+    """
+    single = generate_receipt(_receipt_data(0)).getvalue()
+    bundle = generate_receipts(
+        _receipt_data(n) for n in range(bundle_receipts)
+    ).getvalue()
+    return {
+        "receipt_bytes": len(single),
+        "bundle_receipts": bundle_receipts,
+        "bundle_bytes_per_receipt": round(len(bundle) / bundle_receipts),
+        "embedded_fonts": len(re.findall(rb"/FontFile[23]?\b", single)),
+        "embedded_images": single.count(b"/Subtype /Image"),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def save_results(results, name):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{name}.json"
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def load_results(name_or_path):
+    path = Path(name_or_path)
+    if not path.suffix:
+        path = RESULTS_DIR / f"{name_or_path}.json"
+    return json.loads(path.read_text())
+
+
+def compare_results(current, baseline, tolerance=0.2):
+    """
+    The function `compare_results` flags endpoints whose p95 latency grew by more than `tolerance`
+    (a fraction) or whose mean query count grew at all, relative to `baseline`.
+
+    :return: A list of human readable regression descriptions; empty when nothing regressed.
+    """
+    regressions = []
+    for endpoint, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms"
+            )
+        if now["mean_queries"] > before["mean_queries"]:
+            regressions.append(
+                f"{endpoint}: queries {before['mean_queries']} -> {now['mean_queries']}"
+            )
+    return regressions
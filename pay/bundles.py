@@ -0,0 +1,253 @@
+"""
+Downloading many of a department's receipts at once.
+
+A department picks receipts with the same filters as its transaction list. It can either stream a
+ZIP of the stored receipt PDFs, which is built while it is being sent and never held in memory,
+or have a single printable PDF rendered in the background. The PDF draws one receipt per page in
+one canvas pass, so the font, the logos and the signatures are embedded once for the whole
+document rather than once per receipt.
+
+Like the transaction list, bundles only cover sessions that have not been archived (see
+`pay.archive`); an archived receipt is still downloaded on its own from `download_receipt`.
+
+Bundles render on the web process's background threads. One cut short by a deploy or a crash is
+rendered again by the `resume_background_jobs` command, and one still unfinished
+`RECEIPT_BUNDLE_MAX_AGE` seconds after it was requested is marked failed, so clients polling it
+stop waiting.
+"""
+
+import io
+import logging
+import re
+import zipfile
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.utils import timezone
+from receipt_utils.create_receipt import generate_receipts
+from receipt_utils.renderer import render_receipt
+from receipt_utils.upload_receipt import upload_receipt
+from utils.background import run_in_background
+from utils.metrics import outbound
+from .counters import SUCCESS
+from .filters import TransactionFilter
+from .models import ReceiptBundle, Transaction
+from .receipt_text import receipt_amount_words
+
+
+logger = logging.getLogger(__name__)
+
+# Rendered pages between two progress updates of a bundle
+PROGRESS_INTERVAL = 50
+
+
+class BundleError(Exception):
+    pass
+
+
+def receipt_data(transaction):
+    """
+    The function `receipt_data` builds the receipt fields of a stored transaction, the way
+    `getReceiptData` does for one being verified.
+    """
+    department = transaction.department
+    return {
+        "header": department.dept_name.upper(),
+        "date": transaction.created_at.strftime("%Y-%m-%d"),
+        "received_from": transaction.received_from,
+        "payment_for": transaction.payment.payment_for,
+        "amount_words": receipt_amount_words(
+            transaction.payment, transaction.amount_paid
+        ),
+        "amount": transaction.amount_paid,
+        "department_logo": department.asset_url("logo"),
+        "president_signature": department.asset_url("president_signature"),
+        "financial_signature": department.asset_url("secretary_signature"),
+        "receipt_hash": transaction.receipt_hash,
+    }
+
+
+def bundle_queryset(department, filters):
+    """
+    The function `bundle_queryset` selects the department's successful transactions matching
+    `filters`, oldest first.
+
+    :param filters: `TransactionFilter` parameters, e.g. `{"payment": 3}`.
+    :raises BundleError: When the filters are invalid, nothing matches, or more than
+    `RECEIPT_BUNDLE_MAX_RECEIPTS` receipts match.
+    """
+    queryset = Transaction.objects.filter(department=department, status=SUCCESS)
+    filterset = TransactionFilter(filters, queryset=queryset)
+    if not filterset.is_valid():
+        raise BundleError(filterset.errors.as_text())
+    queryset = filterset.qs.select_related("department", "payment").order_by(
+        "created_at", "txn_id"
+    )
+    count = queryset.count()
+    if not count:
+        raise BundleError("No receipts found")
+    if count > settings.RECEIPT_BUNDLE_MAX_RECEIPTS:
+        raise BundleError(
+            f"{count} receipts match; narrow the filters to at most "
+            f"{settings.RECEIPT_BUNDLE_MAX_RECEIPTS}"
+        )
+    return queryset
+
+
+def start_bundle(department, filters):
+    """
+    The function `start_bundle` records a `ReceiptBundle` for the matching receipts and renders it
+    in the background once the current transaction commits.
+
+    :raises BundleError: See `bundle_queryset`.
+    """
+    total = bundle_queryset(department, filters).count()
+    bundle = ReceiptBundle.objects.create(
+        department=department, filters=filters, total=total
+    )
+    run_in_background(build_bundle, bundle.pk)
+    return bundle
+
+
+def build_bundle(bundle_id):
+    """
+    The function `build_bundle` renders a bundle's receipts into one PDF, uploads it to the
+    receipts bucket and records its URL, saving the progress every `PROGRESS_INTERVAL` pages.
+    """
+    bundle = ReceiptBundle.objects.select_related("department").get(pk=bundle_id)
+    if bundle.status in (ReceiptBundle.Status.DONE, ReceiptBundle.Status.FAILED):
+        return bundle
+    bundle.status = ReceiptBundle.Status.RUNNING
+    bundle.rendered = 0
+    bundle.save(update_fields=["status", "rendered", "updated_at"])
+
+    def pages(transactions):
+        for transaction in transactions:
+            yield receipt_data(transaction)
+            bundle.rendered += 1
+            if bundle.rendered % PROGRESS_INTERVAL == 0:
+                bundle.save(update_fields=["rendered", "updated_at"])
+
+    try:
+        transactions = bundle_queryset(bundle.department, bundle.filters)
+        bundle.total = transactions.count()
+        pdf_stream = generate_receipts(pages(transactions.iterator(chunk_size=200)))
+        url = upload_receipt(f"bundles/{bundle.pk}.pdf", pdf_stream)
+        if isinstance(url, dict):
+            raise BundleError(url["detail"])
+    except Exception as e:
+        logger.error(f"Receipt bundle {bundle.pk} failed: {e}")
+        bundle.status = ReceiptBundle.Status.FAILED
+        bundle.error = str(e)
+    else:
+        bundle.status = ReceiptBundle.Status.DONE
+        bundle.url = url
+    bundle.finished_at = timezone.now()
+    bundle.save()
+    return bundle
+
+
+UNFINISHED = [ReceiptBundle.Status.PENDING, ReceiptBundle.Status.RUNNING]
+ABANDONED = "The bundle was not finished in time; request it again"
+
+
+def expire_abandoned_bundles(queryset=None):
+    """
+    The function `expire_abandoned_bundles` marks bundles still unfinished `RECEIPT_BUNDLE_MAX_AGE`
+    seconds after they were requested as failed.
+
+    :param queryset: The bundles to look at, all of them when not given.
+    :return: The number of bundles marked failed.
+    """
+    now = timezone.now()
+    queryset = ReceiptBundle.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        status__in=UNFINISHED,
+        created_at__lt=now - timedelta(seconds=settings.RECEIPT_BUNDLE_MAX_AGE),
+    ).update(
+        status=ReceiptBundle.Status.FAILED,
+        error=ABANDONED,
+        finished_at=now,
+        updated_at=now,
+    )
+
+
+def resume_stale_bundles():
+    """
+    The function `resume_stale_bundles` fails abandoned bundles, then renders again the unfinished
+    ones that have not saved progress for `BACKGROUND_JOB_STALE_AFTER` seconds, whose process went
+    away. Each bundle is claimed by bumping its `updated_at` first, so two resumers never render
+    the same bundle.
+
+    :return: `(expired, resumed)`, the number of bundles failed and the bundles rendered again.
+    """
+    expired = expire_abandoned_bundles()
+    cutoff = timezone.now() - timedelta(seconds=settings.BACKGROUND_JOB_STALE_AFTER)
+    stale = ReceiptBundle.objects.filter(
+        status__in=UNFINISHED, updated_at__lt=cutoff
+    ).order_by("created_at")
+    resumed = []
+    for bundle in stale:
+        claimed = ReceiptBundle.objects.filter(
+            pk=bundle.pk, updated_at=bundle.updated_at
+        ).update(updated_at=timezone.now())
+        if not claimed:
+            continue
+        logger.warning(f"Rendering receipt bundle {bundle.pk} again")
+        resumed.append(build_bundle(bundle.pk))
+    return expired, resumed
+
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    An unseekable file that keeps what `ZipFile` writes until it is drained into the response.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def receipt_filename(transaction):
+    name = re.sub(r"[^\w.-]+", "_", transaction.received_from).strip("_")
+    return f"{name or 'receipt'}_{transaction.txn_reference}.pdf"
+
+
+def stored_receipt(transaction):
+    """
+    The function `stored_receipt` downloads a transaction's uploaded receipt, rendering it again
+    when it was never uploaded or cannot be fetched.
+    """
+    if transaction.receipt_url:
+        try:
+            with outbound("receipt.download"):
+                response = requests.get(transaction.receipt_url, timeout=15)
+            response.raise_for_status()
+            return response.content
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch {transaction.receipt_url}: {e}")
+    return render_receipt(receipt_data(transaction)).getvalue()
+
+
+def stream_zip(transactions):
+    """
+    The function `stream_zip` yields a ZIP of the receipts of `transactions` piece by piece, one
+    receipt at a time, so a bundle of any size is sent without being held in memory.
+    """
+    output = _ChunkWriter()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for transaction in transactions.iterator(chunk_size=200):
+            archive.writestr(receipt_filename(transaction), stored_receipt(transaction))
+            yield output.drain()
+    yield output.drain()
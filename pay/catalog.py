@@ -0,0 +1,89 @@
+"""
+The public payment catalog: every verified department with its logo and payment items, served to
+the student checkout page as one precomputed JSON document.
+
+The document is rendered once per catalog version and cached as bytes together with its ETag.
+Approving or editing a department and changing a payment item bump the version (see the signals
+in `pay/signals.py` and `accounts/signals.py`), so the next request renders a fresh copy.
+"""
+
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from accounts.models import Department
+from utils.versioning import bump_version, get_version
+from .models import Payment
+
+
+CATALOG_TIMEOUT = 60 * 60 * 24
+# Department fields shown on the checkout page; edits to anything else keep the catalog as is
+PUBLIC_DEPARTMENT_FIELDS = {"dept_name", "logo_url", "is_verified"}
+
+
+def catalog_version():
+    return get_version("catalog", "public")
+
+
+def invalidate_catalog():
+    bump_version("catalog", "public")
+
+
+def build_catalog():
+    """
+    The function `build_catalog` renders the catalog in two queries.
+
+    :return: A dictionary with the verified departments and their payment items.
+    """
+    departments = (
+        Department.objects.filter(is_verified=True)
+        .only("id", "dept_name", "logo_url")
+        .order_by("dept_name")
+        .prefetch_related(
+            Prefetch(
+                "dept_payment",
+                queryset=Payment.objects.only(
+                    "id", "department_id", "payment_for", "amount_due"
+                ).order_by("payment_for"),
+            )
+        )
+    )
+    return {
+        "departments": [
+            {
+                "id": department.id,
+                "dept_name": department.dept_name,
+                "logo_url": department.logo_url,
+                "payments": [
+                    {
+                        "id": payment.id,
+                        "payment_for": payment.payment_for,
+                        "amount_due": payment.amount_due,
+                    }
+                    for payment in department.dept_payment.all()
+                ],
+            }
+            for department in departments
+        ],
+    }
+
+
+def get_catalog():
+    """
+    The function `get_catalog` returns the rendered catalog for the current version, building it
+    on a miss.
+
+    :return: A `(body, etag)` tuple; `body` is the encoded JSON document and `etag` a strong
+    validator derived from it.
+    """
+    key = f"catalog:{catalog_version()}"
+    cached = cache.get(key)
+    if cached is None:
+        body = json.dumps(
+            build_catalog(), cls=DjangoJSONEncoder, separators=(",", ":")
+        ).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = (body, etag)
+        cache.set(key, cached, timeout=CATALOG_TIMEOUT)
+    return cached
@@ -0,0 +1,107 @@
+"""
+Running totals (`total_collected`, `payer_count`, `last_payment_at`) kept on `Payment` and
+`Department` so dashboards can show collection progress without scanning `Transaction`.
+
+Successful transactions bump the counters with single `UPDATE ... SET x = x + n` statements, so
+concurrent verifications never lose an increment. Archiving a session leaves them untouched;
+`manage.py repair_counters` rebuilds them from the live table and the archive index.
+"""
+
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    Max,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+from accounts.models import Department
+from .models import ArchivedReceipt, Payment, Transaction
+
+
+SUCCESS = "success"
+
+
+def _increments(amount, paid_at):
+    return {
+        "total_collected": F("total_collected") + amount,
+        "payer_count": F("payer_count") + 1,
+        # GREATEST() is NULL on SQLite and MySQL when any argument is NULL
+        "last_payment_at": Coalesce(
+            Greatest(F("last_payment_at"), Value(paid_at)), Value(paid_at)
+        ),
+    }
+
+
+def record_successful_transaction(transaction):
+    """
+    The function `record_successful_transaction` adds a successful transaction to the running
+    totals of its payment item and department.
+
+    :param transaction: A saved `Transaction` whose status just became "success".
+    """
+    increments = _increments(transaction.amount_paid, transaction.created_at)
+    if transaction.payment_id:
+        Payment.objects.filter(pk=transaction.payment_id).update(**increments)
+    if transaction.department_id:
+        Department.objects.filter(pk=transaction.department_id).update(**increments)
+
+
+def _aggregate(model, field, outer, aggregate):
+    """
+    A correlated subquery computing `aggregate` over successful rows of `model` whose `field`
+    matches the outer row.
+    """
+    return Subquery(
+        model.objects.filter(**{field: OuterRef(outer), "status": SUCCESS})
+        .order_by()
+        .values(field)
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def _recomputed(live_key, archived_key):
+    decimal = DecimalField(max_digits=14, decimal_places=2)
+    zero = Value(0, output_field=decimal)
+
+    def sum_of(model, key):
+        return Coalesce(_aggregate(model, key, "pk", Sum("amount_paid")), zero)
+
+    def count_of(model, key):
+        return Coalesce(_aggregate(model, key, "pk", Count("pk")), 0)
+
+    def latest_of(model, key):
+        return _aggregate(model, key, "pk", Max("created_at"))
+
+    return {
+        "total_collected": sum_of(Transaction, live_key)
+        + sum_of(ArchivedReceipt, archived_key),
+        "payer_count": count_of(Transaction, live_key)
+        + count_of(ArchivedReceipt, archived_key),
+        "last_payment_at": Coalesce(
+            latest_of(Transaction, live_key), latest_of(ArchivedReceipt, archived_key)
+        ),
+    }
+
+
+def repair_counters(departments=None):
+    """
+    The function `repair_counters` recomputes the running totals from scratch with one bulk
+    `UPDATE` per table.
+
+    :param departments: Optional queryset or list of departments to limit the repair to.
+    :return: A `(payments, departments)` tuple with the number of rows rewritten.
+    """
+    payments = Payment.objects.all()
+    department_rows = Department.objects.all()
+    if departments is not None:
+        payments = payments.filter(department__in=departments)
+        department_rows = department_rows.filter(pk__in=[d.pk for d in departments])
+    return (
+        payments.update(**_recomputed("payment", "payment")),
+        department_rows.update(**_recomputed("department", "archive__department")),
+    )
@@ -0,0 +1,94 @@
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from accounts.models import Department
+from utils.versioning import get_version
+from .counters import SUCCESS
+from .models import Payment, Transaction
+from .serializers import PaymentSerializer, TransactionSerializer
+
+
+RECENT_TRANSACTIONS = 10
+DEFAULT_DAYS = 30
+MAX_DAYS = 90
+SNAPSHOT_TIMEOUT = 60 * 60
+
+
+def daily_series(department, days):
+    """
+    The function `daily_series` returns the amount collected and the number of successful payments
+    for each of the last `days` days, oldest first, with zeros for days without payments.
+    """
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    rows = (
+        Transaction.objects.filter(
+            department=department,
+            status=SUCCESS,
+            created_at__gte=timezone.make_aware(datetime.combine(since, time.min)),
+        )
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(total=Sum("amount_paid"), count=Count("txn_id"))
+        .order_by("day")
+    )
+    by_day = {row["day"]: row for row in rows}
+    series = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        row = by_day.get(day)
+        series.append(
+            {
+                "date": day.isoformat(),
+                "total": row["total"] if row else 0,
+                "count": row["count"] if row else 0,
+            }
+        )
+    return series
+
+
+def build_dashboard(department, days=DEFAULT_DAYS):
+    """
+    The function `build_dashboard` assembles everything the department dashboard shows in four
+    queries: the payment items with their running totals, the most recent transactions and the
+    daily series, plus one for the department's own running totals.
+
+    :param department: The authenticated `Department`.
+    :param days: Length of the daily series.
+    :return: A JSON-serialisable dictionary.
+    """
+    payments = list(
+        Payment.objects.filter(department=department).order_by("-created_at")
+    )
+    recent = (
+        Transaction.objects.filter(department=department)
+        .select_related("payment")
+        .order_by("-created_at")[:RECENT_TRANSACTIONS]
+    )
+    # read fresh: `department` is the cached principal, without the counters
+    totals = Department.objects.values(
+        "total_collected", "payer_count", "last_payment_at"
+    ).get(pk=department.pk)
+    return {
+        "stats": {**totals, "total_payments": len(payments)},
+        "payments": PaymentSerializer(payments, many=True).data,
+        "recent_transactions": TransactionSerializer(recent, many=True).data,
+        "daily": daily_series(department, days),
+    }
+
+
+def get_dashboard(department, days=DEFAULT_DAYS):
+    """
+    The function `get_dashboard` returns the dashboard snapshot for the department's current data
+    version, building and caching it on a miss. Any change to the department's transactions or
+    payment items bumps the version, so a cached snapshot is never stale.
+    """
+    version = get_version("department", department.pk)
+    key = f"dashboard:{department.pk}:{version}:{days}:{timezone.localdate()}"
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard(department, days)
+        cache.set(key, snapshot, timeout=SNAPSHOT_TIMEOUT)
+    return snapshot
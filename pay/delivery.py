@@ -0,0 +1,217 @@
+"""
+Delivering receipts by link.
+
+Receipts are served by `receipt_hash` from the app's own download endpoint rather than by handing
+out the storage URL. Served PDFs are kept in a local disk cache of at most
+`RECEIPT_CACHE_MAX_BYTES`, evicting the least recently served first; a miss streams the stored
+object to disk in blocks, or renders it again when it was never uploaded. Range requests are
+answered from the cached file, so a browser or download manager can resume.
+
+A receipt can be rendered again under the same hash (a re-sent receipt, a cache miss on another
+machine), and the new PDF differs byte for byte. Validators therefore come from the served file's
+content rather than from the hash, so a resumed download never splices two versions together.
+
+When `RECEIPT_LINK_MAX_AGE` is set, links carry a signed timestamp and stop working after that
+many seconds. With `RECEIPT_DELIVERY = "link"`, receipt emails carry such a link instead of the
+PDF.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import urlencode
+import requests
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from receipt_utils.renderer import render_receipt
+from utils.buffers import as_buffer
+from utils.metrics import outbound
+from .bundles import receipt_data
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+LINK_SALT = "pay.delivery.receipt-link"
+
+
+class ReceiptLinkError(Exception):
+    pass
+
+
+def _signer():
+    return signing.TimestampSigner(salt=LINK_SALT)
+
+
+def receipt_link(receipt_hash):
+    """
+    The function `receipt_link` builds the absolute download URL of a receipt, signed when links
+    expire.
+    """
+    path = reverse("download_receipt", args=[receipt_hash])
+    if settings.RECEIPT_LINK_MAX_AGE:
+        # `sign` returns "<hash>:<timestamp>:<signature>"; the hash is already in the path
+        token = _signer().sign(receipt_hash).split(":", 1)[1]
+        path = f"{path}?{urlencode({'token': token})}"
+    return f"{settings.SITE_URL.rstrip('/')}{path}"
+
+
+def check_link(receipt_hash, token):
+    """
+    The function `check_link` validates the `token` of a download link.
+
+    :return: The seconds the link stays valid, or `None` when links do not expire.
+    :raises ReceiptLinkError: When the token is missing, forged or expired.
+    """
+    max_age = settings.RECEIPT_LINK_MAX_AGE
+    if not max_age:
+        return None
+    if not token:
+        raise ReceiptLinkError("This receipt link is not signed")
+    try:
+        _signer().unsign(f"{receipt_hash}:{token}", max_age=max_age)
+    except signing.SignatureExpired as e:
+        raise ReceiptLinkError("This receipt link has expired") from e
+    except signing.BadSignature as e:
+        raise ReceiptLinkError("This receipt link is invalid") from e
+    signed_at = signing.b62_decode(token.split(":", 1)[0])
+    return max(0, int(signed_at + max_age - time.time()))
+
+
+class ReceiptCache:
+    """
+    Receipt PDFs on local disk, one file per receipt, shared by every worker on the machine. Files
+    are written under a temporary name and renamed into place, so readers never see a partial
+    file. A file's modification time records when it was last served.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, receipt_hash):
+        name = hashlib.sha256(receipt_hash.encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.pdf")
+
+    def open(self, receipt_hash):
+        if not self.max_bytes:
+            return None
+        path = self.path(receipt_hash)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted since it was opened; the open file stays readable
+            pass
+        return file
+
+    def store(self, receipt_hash, chunks):
+        """
+        Writes `chunks` to the cache and returns the file opened for reading. With the cache
+        disabled the file is an anonymous temporary one, removed once closed.
+        """
+        if not self.max_bytes:
+            file = tempfile.TemporaryFile()
+            for chunk in chunks:
+                file.write(chunk)
+            file.seek(0)
+            return file
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            path = self.path(receipt_hash)
+            os.replace(partial, path)
+        except BaseException:
+            os.unlink(partial)
+            raise
+        file = open(path, "rb")
+        self.evict(keep=path)
+        return file
+
+    def evict(self, keep=None):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def receipt_cache():
+    return ReceiptCache(settings.RECEIPT_CACHE_DIR, settings.RECEIPT_CACHE_MAX_BYTES)
+
+
+def _stored_chunks(transaction):
+    if transaction.receipt_url:
+        try:
+            with outbound("receipt.download"):
+                response = requests.get(
+                    transaction.receipt_url, stream=True, timeout=15
+                )
+            response.raise_for_status()
+            return response.iter_content(CHUNK_SIZE)
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch {transaction.receipt_url}: {e}")
+    return [render_receipt(receipt_data(transaction)).getvalue()]
+
+
+def open_receipt(transaction):
+    """
+    The function `open_receipt` opens a transaction's receipt PDF from the disk cache, filling the
+    cache from storage on a miss.
+
+    :return: A binary file positioned at the start; the caller closes it.
+    :raises requests.RequestException: When the stored receipt breaks off while downloading.
+    """
+    cache = receipt_cache()
+    file = cache.open(transaction.receipt_hash)
+    if file is None:
+        file = cache.store(transaction.receipt_hash, _stored_chunks(transaction))
+    return file
+
+
+def receipt_etag(file):
+    """
+    The function `receipt_etag` returns a strong, quoted ETag for the content of an open receipt
+    file and rewinds it.
+    """
+    file.seek(0)
+    digest = hashlib.file_digest(file, "sha256").hexdigest()
+    file.seek(0)
+    return f'"{digest[:32]}"'
+
+
+def remember_receipt(receipt_hash, pdf):
+    """
+    The function `remember_receipt` puts a freshly rendered receipt in the disk cache, replacing
+    any older copy, since its link is about to be followed. Failures are only logged.
+    """
+    cache = receipt_cache()
+    if not cache.max_bytes:
+        return
+    try:
+        cache.store(receipt_hash, [as_buffer(pdf)]).close()
+    except OSError as e:
+        logger.warning(f"Could not cache receipt {receipt_hash}: {e}")
@@ -0,0 +1,191 @@
+"""
+The department change feed and the server-sent event stream built on it.
+
+Saving a successful transaction appends a `DepartmentEvent` row from the same `post_save` signal
+that updates the running totals. A dashboard keeps one `/pay/events/` connection open; while
+nothing changes it only checks the department's data version in the cache, and reads the feed (one
+indexed query) when the version moves. Connections are closed after `SSE_MAX_DURATION` seconds and
+the browser reconnects with `Last-Event-ID`, so no event is lost.
+
+An open stream holds one gunicorn thread for its whole duration, so each process serves at most
+`SSE_MAX_STREAMS` at once and answers 503 with `Retry-After` beyond that; the remaining threads
+stay free for checkout and verification. Serve more dashboards with more worker processes, not
+with a higher cap.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from accounts.models import Department
+from utils.versioning import get_version
+from .models import DepartmentEvent
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+KEEP_ALIVE_INTERVAL = 15
+
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+def publish_transaction(transaction):
+    """
+    The function `publish_transaction` appends a successful transaction to its department's feed.
+    """
+    if not transaction.department_id:
+        return
+    DepartmentEvent.objects.create(
+        department_id=transaction.department_id,
+        kind="transaction",
+        payload=json.loads(
+            json.dumps(
+                {
+                    "txn_id": transaction.txn_id,
+                    "received_from": transaction.received_from,
+                    "payment": transaction.payment_id,
+                    "payment_for": (
+                        transaction.payment.payment_for
+                        if transaction.payment_id
+                        else None
+                    ),
+                    "amount_paid": transaction.amount_paid,
+                    "created_at": transaction.created_at,
+                },
+                cls=DjangoJSONEncoder,
+            )
+        ),
+    )
+
+
+def latest_event_id(department_id):
+    return (
+        DepartmentEvent.objects.filter(department_id=department_id)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+        or 0
+    )
+
+
+def events_since(department_id, last_id):
+    return list(
+        DepartmentEvent.objects.filter(department_id=department_id, id__gt=last_id)
+        .order_by("id")
+        .only("id", "kind", "payload")[:BATCH_SIZE]
+    )
+
+
+def department_totals(department_id):
+    return (
+        Department.objects.filter(pk=department_id)
+        .values("total_collected", "payer_count", "last_payment_at")
+        .first()
+    )
+
+
+def format_event(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_events(department_id, last_id=None):
+    """
+    The function `stream_events` yields server-sent events for a department: each new feed entry,
+    followed by the updated totals, plus periodic keep-alive comments.
+
+    :param department_id: The department to follow.
+    :param last_id: The `Last-Event-ID` sent by a reconnecting client. A fresh connection starts
+    from the newest event, so only what happens from now on is pushed.
+    """
+    if last_id is None:
+        last_id = latest_event_id(department_id)
+    yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+    yield format_event(department_totals(department_id), event="totals")
+
+    deadline = time.monotonic() + settings.SSE_MAX_DURATION
+    last_sent = time.monotonic()
+    seen_version = None
+    while time.monotonic() < deadline:
+        version = get_version("department", department_id)
+        if version != seen_version:
+            seen_version = version
+            events = events_since(department_id, last_id)
+            for event in events:
+                last_id = event.id
+                yield format_event(event.payload, event=event.kind, event_id=event.id)
+            if events:
+                yield format_event(department_totals(department_id), event="totals")
+                last_sent = time.monotonic()
+                if len(events) == BATCH_SIZE:
+                    # more are waiting; read the next batch straight away
+                    seen_version = None
+                    continue
+        if time.monotonic() - last_sent >= KEEP_ALIVE_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        time.sleep(settings.SSE_POLL_INTERVAL)
+
+
+class _HeldStream:
+    """
+    Iterates over an event stream and gives its slot back when the response is closed, even if
+    the client went away before the stream started.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        global _open_streams
+        self.events.close()
+        with _open_streams_lock:
+            if not self.released:
+                self.released = True
+                _open_streams -= 1
+
+
+def open_stream(department_id, last_id=None):
+    """
+    The function `open_stream` starts a department's event stream when this process has a free
+    stream slot.
+
+    :return: An iterable of events for a `StreamingHttpResponse`, which closes it.
+    :raises StreamLimitReached: When `SSE_MAX_STREAMS` streams are already open in this process.
+    """
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= settings.SSE_MAX_STREAMS:
+            raise StreamLimitReached()
+        _open_streams += 1
+    return _HeldStream(stream_events(department_id, last_id))
+
+
+def prune_events():
+    """
+    The function `prune_events` deletes feed entries older than `DEPARTMENT_EVENT_RETENTION_HOURS`.
+    Reconnecting clients only ever need the last few seconds of the feed.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.DEPARTMENT_EVENT_RETENTION_HOURS)
+    deleted, _ = DepartmentEvent.objects.filter(created_at__lt=cutoff).delete()
+    logger.info(f"Pruned {deleted} department events")
+    return deleted
@@ -1,13 +1,19 @@
 from .models import Transaction
+from .search import search_transactions
 from django_filters.rest_framework import FilterSet, CharFilter
 
 
 class TransactionFilter(FilterSet):
     payment_for = CharFilter(field_name="payment__payment_for", lookup_expr="icontains")
+    search = CharFilter(method="filter_search")
 
     class Meta:
         model = Transaction
         fields = {
             "received_from": ["exact", "icontains"],
             "status": ["exact"],
+            "payment": ["exact"],
         }
+
+    def filter_search(self, queryset, name, value):
+        return search_transactions(queryset, value)
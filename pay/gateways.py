@@ -0,0 +1,321 @@
+from django.conf import settings
+from django.core.cache import cache
+from decouple import config
+from .paystack import Paystack
+from .monnify import Monnify
+from utils.metrics import outbound
+import logging
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """
+    Raised when a payment gateway cannot complete a request, so the caller can fail over to the next
+    provider.
+    """
+
+    def __init__(self, message="Payment gateway request failed", gateway=None):
+        self.message = message
+        self.gateway = gateway
+        super().__init__(self.message)
+
+
+def callback_url():
+    return (
+        "http://localhost:8000/pay/pay/verify/"
+        if settings.DEBUG
+        else "https://student-pay.sevalla.app/payment/pay/success/"
+    )
+
+
+class GatewayHealth:
+    """
+    Tracks call count, error count and a moving average of latency for one gateway in the shared
+    cache, over fixed windows of `GATEWAY_HEALTH_WINDOW` seconds, so every worker routes on the
+    same view of provider health.
+
+    Calls and errors are separate counters bumped with the cache's atomic `incr`, so concurrent
+    requests in any worker never lose a count. The latency average is read and written back as a
+    best effort; a lost update only skips one sample of an average.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.key = f"gateway_health:{name}"
+
+    def _keys(self):
+        window = int(time.time() // settings.GATEWAY_HEALTH_WINDOW)
+        prefix = f"{self.key}:{window}"
+        return (
+            window * settings.GATEWAY_HEALTH_WINDOW,
+            f"{prefix}:calls",
+            f"{prefix}:errors",
+            f"{prefix}:latency",
+        )
+
+    def _increment(self, key):
+        timeout = settings.GATEWAY_HEALTH_WINDOW * 2
+        cache.add(key, 0, timeout=timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # expired between `add` and `incr`
+            cache.add(key, 1, timeout=timeout)
+            return 1
+
+    def _window(self):
+        window_start, calls_key, errors_key, latency_key = self._keys()
+        values = cache.get_many([calls_key, errors_key, latency_key])
+        return {
+            "window_start": window_start,
+            "calls": values.get(calls_key, 0),
+            "errors": values.get(errors_key, 0),
+            "latency": values.get(latency_key, 0.0),
+        }
+
+    def record(self, success, latency):
+        _, calls_key, errors_key, latency_key = self._keys()
+        calls = self._increment(calls_key)
+        if not success:
+            self._increment(errors_key)
+        # exponentially weighted so a latency spike shows up within a few calls
+        previous = cache.get(latency_key)
+        if calls > 1 and previous is not None:
+            latency = 0.7 * previous + 0.3 * latency
+        cache.set(latency_key, latency, timeout=settings.GATEWAY_HEALTH_WINDOW * 2)
+
+    def snapshot(self):
+        return self._window()
+
+    def is_healthy(self):
+        stats = self._window()
+        if stats["calls"] < settings.GATEWAY_MIN_CALLS:
+            return True
+        error_rate = stats["errors"] / stats["calls"]
+        return (
+            error_rate <= settings.GATEWAY_MAX_ERROR_RATE
+            and stats["latency"] <= settings.GATEWAY_MAX_LATENCY
+        )
+
+
+class PaymentGateway:
+    """
+    Common interface for the payment providers used by `TransactionViewSet`.
+
+    `initialize_transaction` returns the checkout URL the student is redirected to, and
+    `verify_transaction` returns the normalized transaction details (see
+    `Paystack.verify_transaction`) or a dictionary with an `error` key.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.health = GatewayHealth(self.name)
+
+    def is_configured(self):
+        return True
+
+    def supports(self, department):
+        return True
+
+    def owns_reference(self, reference):
+        return False
+
+    def initialize_transaction(self, department, payment, customer_info):
+        raise NotImplementedError
+
+    def verify_transaction(self, reference):
+        raise NotImplementedError
+
+    def _call(self, func, *args, error_results=True):
+        """
+        Runs a provider call, recording its latency and outcome against this gateway's health.
+        Exceptions, and `{"error": ...}` results unless `error_results` is False, are raised as
+        `GatewayError`.
+        """
+        start = time.perf_counter()
+        try:
+            with outbound(f"{self.name}.{func.__name__}"):
+                result = func(*args)
+        except Exception as e:
+            self.health.record(False, time.perf_counter() - start)
+            raise GatewayError(str(e), gateway=self.name) from e
+        if error_results and isinstance(result, dict) and "error" in result:
+            self.health.record(False, time.perf_counter() - start)
+            raise GatewayError(str(result["error"]), gateway=self.name)
+        self.health.record(True, time.perf_counter() - start)
+        return result
+
+
+class PaystackGateway(PaymentGateway):
+    name = "paystack"
+
+    def __init__(self):
+        super().__init__()
+        self.client = Paystack()
+
+    def owns_reference(self, reference):
+        return not reference.startswith(MonnifyGateway.reference_prefix)
+
+    def initialize_transaction(self, department, payment, customer_info):
+        metadata = dict(customer_info)
+        metadata["customer_code"] = self._call(
+            self.client.create_customer, customer_info
+        )
+        metadata["payment_id"] = str(payment.id)
+        metadata["department_id"] = str(department.id)
+        txn_data = {
+            "email": customer_info["email"],
+            "amount": str(payment.amount_due * 100),
+            "subaccount": department.sub_account_code,
+            "bearer": "subaccount",
+            "metadata": metadata,
+            "callback_url": callback_url(),
+        }
+        return self._call(self.client.initiate_transaction, txn_data)
+
+    def verify_transaction(self, reference):
+        try:
+            # "not found" answers are the caller's problem, not an outage
+            return self._call(
+                self.client.verify_transaction, reference, error_results=False
+            )
+        except GatewayError as e:
+            return {"error": e.message}
+
+
+class MonnifyGateway(PaymentGateway):
+    name = "monnify"
+    # Our own payment references, so verification can be routed back to Monnify. Kept within the
+    # 15 characters allowed by `Transaction.txn_reference`.
+    reference_prefix = "MNF"
+
+    def __init__(self):
+        super().__init__()
+        self.client = Monnify()
+
+    def is_configured(self):
+        return bool(config("MONNIFY_API_KEY", default=""))
+
+    def supports(self, department):
+        return bool(department.monnify_sub_account_code)
+
+    def owns_reference(self, reference):
+        return reference.startswith(self.reference_prefix)
+
+    def new_reference(self):
+        return f"{self.reference_prefix}{uuid.uuid4().hex[:12].upper()}"
+
+    def initialize_transaction(self, department, payment, customer_info):
+        txn_data = {
+            "amount": float(payment.amount_due),
+            "customerName": f"{customer_info['first_name']} {customer_info['last_name']}",
+            "customerEmail": customer_info["email"],
+            "paymentReference": self.new_reference(),
+            "paymentDescription": payment.payment_for,
+            "redirectUrl": callback_url(),
+            "metaData": {
+                "first_name": customer_info["first_name"],
+                "last_name": customer_info["last_name"],
+                "email": customer_info["email"],
+                "payment_id": str(payment.id),
+                "department_id": str(department.id),
+            },
+            "incomeSplitConfig": [
+                {
+                    "subAccountCode": department.monnify_sub_account_code,
+                    "splitPercentage": 100,
+                    "feeBearer": True,
+                }
+            ],
+        }
+        return self._call(self.client.initializeTransaction, txn_data)
+
+    def verify_transaction(self, reference):
+        try:
+            body = self._call(self.client.verifyTransaction, reference)
+        except GatewayError as e:
+            return {"error": e.message}
+        if body.get("paymentStatus") != "PAID":
+            return {"error": "Unknown error from Monnify", "detail": body}
+        metadata = body.get("metaData") or {}
+        first_name = metadata.get("first_name", "")
+        last_name = metadata.get("last_name", "")
+        return {
+            # Monnify references are not numeric, so the row gets a local id
+            "txn_id": None,
+            "txn_status": "success",
+            "amount_paid": int(float(body["amountPaid"])),
+            "ip_address": None,
+            "txn_reference": body["paymentReference"],
+            "date_paid": body["paidOn"].split(" ")[0].split("T")[0],
+            "received_from": f"{first_name} {last_name}",
+            "customer_email": metadata.get("email")
+            or body.get("customer", {}).get("email"),
+            "customer_code": None,
+            "first_name": first_name,
+            "last_name": last_name,
+            "payment_id": metadata["payment_id"],
+            "department_id": metadata["department_id"],
+        }
+
+
+GATEWAY_CLASSES = {
+    PaystackGateway.name: PaystackGateway,
+    MonnifyGateway.name: MonnifyGateway,
+}
+
+
+def get_gateways():
+    """
+    Returns the configured gateways in the preference order given by `PAYMENT_GATEWAYS`.
+    """
+    gateways = []
+    for name in settings.PAYMENT_GATEWAYS:
+        gateway = GATEWAY_CLASSES[name]()
+        if gateway.is_configured():
+            gateways.append(gateway)
+    return gateways
+
+
+def select_gateways(department):
+    """
+    Orders the gateways that can settle to `department`: healthy ones first in preference order,
+    then unhealthy ones as a last resort.
+    """
+    candidates = [gw for gw in get_gateways() if gw.supports(department)]
+    healthy = [gw for gw in candidates if gw.health.is_healthy()]
+    return healthy + [gw for gw in candidates if gw not in healthy]
+
+
+def initialize_transaction(department, payment, customer_info):
+    """
+    The function `initialize_transaction` starts a checkout with the healthiest gateway that supports
+    the department, failing over to the next one when a provider errors.
+
+    :param department: The `Department` the payment settles to.
+    :param payment: The `Payment` item being paid for.
+    :param customer_info: A dictionary with the student's `email`, `first_name` and `last_name`.
+    :return: A tuple of the gateway name and the checkout URL.
+    """
+    errors = []
+    for gateway in select_gateways(department):
+        try:
+            return gateway.name, gateway.initialize_transaction(
+                department, payment, customer_info
+            )
+        except GatewayError as e:
+            logger.warning(f"{gateway.name} failed to initialize transaction: {e}")
+            errors.append(f"{gateway.name}: {e}")
+    raise GatewayError("; ".join(errors) or "No payment gateway available")
+
+
+def gateway_for_reference(reference):
+    for gateway in get_gateways():
+        if gateway.owns_reference(reference):
+            return gateway
+    return PaystackGateway()
@@ -0,0 +1,60 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pay.archive import (
+    ArchiveError,
+    archive_session,
+    closed_sessions,
+    session_bounds,
+    session_for,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves transactions from closed academic sessions into compressed Parquet archives and "
+        "removes them from the live transaction table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--session",
+            action="append",
+            help='Session to archive, e.g. "2023/2024". Defaults to every closed session.',
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be archived without changing anything.",
+        )
+
+    def handle(self, *args, **options):
+        current = session_for(timezone.localtime())
+        sessions = options["session"] or closed_sessions()
+        for session in sessions:
+            try:
+                session_bounds(session)
+            except (ValueError, IndexError):
+                raise CommandError(
+                    f'Invalid session "{session}", expected e.g. 2023/2024'
+                )
+            if session >= current:
+                raise CommandError(f"Session {session} is still open")
+
+        if not sessions:
+            self.stdout.write("No closed sessions left to archive")
+            return
+
+        for session in sessions:
+            try:
+                counts = archive_session(session, dry_run=options["dry_run"])
+            except (ArchiveError, requests.RequestException) as e:
+                # departments archived before the failure stay archived; rerun to continue
+                raise CommandError(f"Archiving {session} stopped: {e}")
+            verb = "Would archive" if options["dry_run"] else "Archived"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{verb} {sum(counts.values())} transactions from {session} "
+                    f"across {len(counts)} department(s)"
+                )
+            )
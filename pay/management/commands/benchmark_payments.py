@@ -0,0 +1,157 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from pay.benchmark import (
+    compare_results,
+    load_results,
+    measure_receipt_memory,
+    measure_receipt_size,
+    run_benchmark,
+    save_results,
+)
+from utils.stub_services import use_stub_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates payment-day traffic (checkout, verification, receipt lookup and the department "
+        "dashboard) against a throwaway test database and the offline service stand-in, then "
+        "reports throughput, p50/p95/p99 latency and query counts per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=5)
+        parser.add_argument(
+            "--payments", type=int, default=3, help="Payment items per department."
+        )
+        parser.add_argument(
+            "--history", type=int, default=200, help="Past transactions per department."
+        )
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=0,
+            help="Delay the stand-in adds to every third-party call.",
+        )
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--receipt-memory",
+            type=int,
+            default=0,
+            metavar="RECEIPTS",
+            help="Also trace the peak memory of rendering, uploading and emailing RECEIPTS receipts.",
+        )
+        parser.add_argument(
+            "--receipt-size",
+            action="store_true",
+            help="Also report the size of a receipt PDF and of a bundle's pages.",
+        )
+        parser.add_argument(
+            "--save",
+            metavar="NAME",
+            help="Save results as benchmarks/results/NAME.json.",
+        )
+        parser.add_argument(
+            "--compare",
+            metavar="NAME_OR_PATH",
+            help="Baseline results to compare against.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed p95 latency growth over the baseline, as a fraction.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the raw results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        baseline = load_results(options["compare"]) if options["compare"] else None
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # seeding hashes one password per department; the default hasher would dominate
+            with override_settings(
+                PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+            ), use_stub_services(
+                latency_ms=options["latency_ms"], error_rate=options["error_rate"]
+            ):
+                results = run_benchmark(
+                    departments=options["departments"],
+                    payments_per_department=options["payments"],
+                    history_per_department=options["history"],
+                    students=options["students"],
+                    concurrency=options["concurrency"],
+                )
+                if options["receipt_memory"]:
+                    results["receipt_memory"] = measure_receipt_memory(
+                        options["receipt_memory"]
+                    )
+                if options["receipt_size"]:
+                    results["receipt_size"] = measure_receipt_size()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+        if options["save"]:
+            path = save_results(results, options["save"])
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {path}"))
+
+        if baseline:
+            regressions = compare_results(results, baseline, options["tolerance"])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(
+                    f"{len(regressions)} regression(s) against the baseline"
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def write_report(self, results):
+        total = results["total"]
+        self.stdout.write(
+            f"{results['scenario']['students']} students, {total['requests']} requests in "
+            f"{total['duration_s']}s ({total['throughput_rps']} req/s)"
+        )
+        self.stdout.write(
+            f"{'endpoint':<20}{'reqs':>6}{'errs':>6}{'rps':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for endpoint, row in results["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<20}{row['requests']:>6}{row['errors']:>6}{row['throughput_rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['mean_queries']:>9}"
+            )
+        memory = results.get("receipt_memory")
+        if memory:
+            peaks = ", ".join(
+                f"{stage} {peak / 1024:.0f} KiB"
+                for stage, peak in memory["peak_bytes"].items()
+            )
+            self.stdout.write(
+                f"receipt memory over {memory['receipts']} receipts of "
+                f"{memory['pdf_bytes'] / 1024:.0f} KiB, peak per receipt: {peaks}"
+            )
+        size = results.get("receipt_size")
+        if size:
+            self.stdout.write(
+                f"receipt size {size['receipt_bytes'] / 1024:.1f} KiB "
+                f"({size['embedded_fonts']} fonts, {size['embedded_images']} images embedded), "
+                f"{size['bundle_bytes_per_receipt'] / 1024:.1f} KiB per receipt in a bundle of "
+                f"{size['bundle_receipts']}"
+            )
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from utils.lazy import registry
+
+
+# Libraries that should only be imported on first use (see utils/lazy.py)
+HEAVY_MODULES = ["reportlab", "qrcode", "supabase", "pandas", "mailjet_rest"]
+
+STARTUP_SCRIPT = (
+    "import {module}; "
+    "from django.urls import get_resolver; "
+    "get_resolver().url_patterns"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports where process start-up time goes by importing the WSGI application and URLconf "
+        "in a fresh interpreter with `-X importtime`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--module",
+            default="student_pay.wsgi",
+            help="Module to import as the application entry point.",
+        )
+        parser.add_argument(
+            "--top", type=int, default=25, help="Number of slowest imports to list."
+        )
+
+    def handle(self, *args, **options):
+        env = os.environ.copy()
+        env.setdefault("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                STARTUP_SCRIPT.format(module=options["module"]),
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        rows = parse_importtime(result.stderr)
+        if result.returncode != 0:
+            raise CommandError(
+                f"Importing {options['module']} failed:\n{result.stderr[-2000:]}"
+            )
+
+        top_level = [row for row in rows if row["depth"] == 0]
+        total_us = sum(row["cumulative_us"] for row in top_level)
+        self.stdout.write(
+            f"Start-up imports: {len(rows)} modules, {total_us / 1000:.1f}ms total\n"
+        )
+        self.stdout.write(f"{'cumulative':>12} {'self':>10}  module")
+        slowest = sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)
+        for row in slowest[: options["top"]]:
+            self.stdout.write(
+                f"{row['cumulative_us'] / 1000:>10.1f}ms {row['self_us'] / 1000:>8.1f}ms  {row['module']}"
+            )
+
+        imported = {row["module"].split(".")[0] for row in rows}
+        eager = [name for name in HEAVY_MODULES if name in imported]
+        if eager:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"\nHeavy modules imported at start-up: {', '.join(eager)}"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("\nNo heavy modules imported at start-up.")
+            )
+        self.stdout.write(f"Lazily loaded on first use: {', '.join(registry.names())}")
+
+
+def parse_importtime(output):
+    """
+    The function `parse_importtime` turns the stderr of `python -X importtime` into a list of rows.
+
+    :param output: The raw stderr text, one `import time: self | cumulative | name` line per module.
+    :return: A list of dictionaries with `module`, `depth`, `self_us` and `cumulative_us` keys.
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            rows.append(
+                {
+                    "module": name.strip(),
+                    "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                }
+            )
+        except ValueError:
+            continue
+    return rows
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from accounts.approval import ASSET_BUCKETS
+from accounts.models import Department
+from utils.images import normalize_department_assets
+from utils.supabase_util import upload_to_supabase
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the normalized receipt and preview variants of logos and signatures uploaded "
+        "before variants existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--department",
+            action="append",
+            help="Department email to limit the run to. Can be repeated.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Recreate variants that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        departments = Department.objects.order_by("created_at")
+        if options["department"]:
+            departments = departments.filter(email__in=options["department"])
+        count = 0
+        for department in departments.iterator():
+            try:
+                fields = normalize_department_assets(
+                    department,
+                    ASSET_BUCKETS,
+                    upload_to_supabase,
+                    force=options["force"],
+                )
+            except Exception as e:
+                self.stderr.write(f"{department.email}: {e}")
+                continue
+            if fields:
+                count += 1
+                self.stdout.write(f"{department.email}: {', '.join(fields)}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Normalized the assets of {count} department(s)")
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Department
+from pay.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the running totals (total collected, payer count, last payment) on every "
+        "payment item and department from the transaction table and the archive index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--department",
+            action="append",
+            help="Department email to limit the repair to. Can be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        departments = None
+        if options["department"]:
+            departments = list(
+                Department.objects.filter(email__in=options["department"])
+            )
+        payments, departments = repair_counters(departments)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed totals for {payments} payment(s) and {departments} department(s)"
+            )
+        )
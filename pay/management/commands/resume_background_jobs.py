@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from accounts.approval import resume_stale_jobs
+from pay.bundles import resume_stale_bundles
+
+
+class Command(BaseCommand):
+    help = (
+        "Finishes background jobs whose process went away, e.g. in a deploy: approval jobs and "
+        "receipt bundles left pending or running without progress for "
+        "BACKGROUND_JOB_STALE_AFTER seconds. Bundles older than RECEIPT_BUNDLE_MAX_AGE are "
+        "marked failed instead."
+    )
+
+    def handle(self, *args, **options):
+        jobs = resume_stale_jobs()
+        expired, bundles = resume_stale_bundles()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Resumed {len(jobs)} approval job(s) and {len(bundles)} receipt bundle(s); "
+                f"{expired} abandoned bundle(s) marked failed"
+            )
+        )
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from receipt_utils.renderer import RendererService, preload_assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the receipt rendering service: a pool of warm rendering processes reached by the "
+        "web workers through the local socket RECEIPT_RENDERER_ADDRESS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            default=settings.RECEIPT_RENDERER_ADDRESS,
+            help="Unix socket path to listen on.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.RECEIPT_RENDERER_WORKERS
+        )
+        parser.add_argument(
+            "--queue",
+            type=int,
+            default=settings.RECEIPT_RENDERER_QUEUE,
+            help="Receipts held at once before answering busy.",
+        )
+        parser.add_argument(
+            "--preload",
+            type=int,
+            default=settings.RECEIPT_RENDERER_PRELOAD,
+            help="Recently paid-to departments whose images the processes start with.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["address"]:
+            raise CommandError("Set RECEIPT_RENDERER_ADDRESS or pass --address")
+        preload = preload_assets(options["preload"])
+        # the service itself needs no database connection while it runs
+        connections.close_all()
+        service = RendererService(
+            options["address"], options["workers"], options["queue"], preload
+        )
+        self.stdout.write(
+            f"Rendering receipts on {options['address']} with {options['workers']} "
+            f"process(es), {len(preload)} image(s) preloaded"
+        )
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
@@ -0,0 +1,54 @@
+import json
+from django.core.management.base import BaseCommand
+from utils.stub_services import make_stub_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs an offline stand-in for the Paystack, Monnify, Supabase storage and Mailjet APIs. "
+        "Start the app with STUB_SERVICES_URL set to the printed URL to use it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8900)
+        parser.add_argument(
+            "--latency-ms", type=float, default=0, help="Delay added to every call."
+        )
+        parser.add_argument(
+            "--jitter-ms",
+            type=float,
+            default=0,
+            help="Random extra delay of up to this many milliseconds.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of calls (0-1) answered with a 500.",
+        )
+        parser.add_argument(
+            "--services",
+            default="{}",
+            help='Per-service overrides as JSON, e.g. \'{"paystack": {"error_rate": 0.3}}\'.',
+        )
+
+    def handle(self, *args, **options):
+        server = make_stub_server(
+            options["host"],
+            options["port"],
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            services=json.loads(options["services"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Stub services listening on {server.url}")
+        )
+        self.stdout.write(f"Run the app with STUB_SERVICES_URL={server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
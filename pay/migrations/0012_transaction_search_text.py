@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:54
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def backfill_search_text(apps, schema_editor):
+    Transaction = apps.get_model("pay", "Transaction")
+    batch = []
+    for txn in Transaction.objects.select_related("payment").iterator(chunk_size=1000):
+        parts = [
+            txn.first_name,
+            txn.last_name,
+            txn.received_from,
+            txn.customer_email,
+            txn.txn_reference,
+            txn.payment.payment_for if txn.payment_id else "",
+        ]
+        txn.search_text = " ".join(part.strip().lower() for part in parts if part)
+        batch.append(txn)
+        if len(batch) >= 1000:
+            Transaction.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Transaction.objects.bulk_update(batch, ["search_text"])
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram indexes only exist on PostgreSQL; SQLite and MySQL search with a plain scan
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS pay_txn_search_trgm "
+        "ON pay_transaction USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS pay_txn_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0011_transaction_receipt_hash"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="transaction",
+            name="search_text",
+            field=models.TextField(
+                default="", editable=False, verbose_name="Search Text"
+            ),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0012_transaction_search_text"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["department", "-created_at"], name="pay_txn_dept_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["department", "status", "-created_at"],
+                name="pay_txn_dept_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["status", "-txn_id"], name="pay_txn_status_idx"),
+        ),
+    ]
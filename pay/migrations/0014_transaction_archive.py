@@ -0,0 +1,112 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0013_transaction_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "session",
+                    models.CharField(max_length=9, verbose_name="Academic Session"),
+                ),
+                (
+                    "file_path",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="File Path"
+                    ),
+                ),
+                ("row_count", models.PositiveIntegerField(verbose_name="Transactions")),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Total Amount"
+                    ),
+                ),
+                (
+                    "first_created_at",
+                    models.DateTimeField(verbose_name="First Transaction"),
+                ),
+                (
+                    "last_created_at",
+                    models.DateTimeField(verbose_name="Last Transaction"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Archived At"),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="txn_archives",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("department", "session")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedReceipt",
+            fields=[
+                (
+                    "receipt_hash",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Receipt Hash",
+                    ),
+                ),
+                ("txn_id", models.BigIntegerField(verbose_name="Transaction ID")),
+                (
+                    "txn_reference",
+                    models.CharField(
+                        db_index=True,
+                        max_length=15,
+                        verbose_name="Transaction Reference",
+                    ),
+                ),
+                (
+                    "amount_paid",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=6, verbose_name="Amount Paid"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="Transaction Created Date"),
+                ),
+                (
+                    "archive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="receipts",
+                        to="pay.transactionarchive",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_running_totals(apps, schema_editor):
+    Transaction = apps.get_model("pay", "Transaction")
+    Payment = apps.get_model("pay", "Payment")
+    Department = apps.get_model("accounts", "Department")
+    successful = Transaction.objects.filter(status="success").order_by()
+    for model, key in ((Payment, "payment"), (Department, "department")):
+        totals = successful.values(key).annotate(
+            total=Sum("amount_paid"), count=Count("pk"), latest=Max("created_at")
+        )
+        for row in totals:
+            if row[key] is None:
+                continue
+            model.objects.filter(pk=row[key]).update(
+                total_collected=row["total"],
+                payer_count=row["count"],
+                last_payment_at=row["latest"],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_running_totals"),
+        ("pay", "0014_transaction_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedreceipt",
+            name="payment",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="archived_receipts",
+                to="pay.payment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedreceipt",
+            name="status",
+            field=models.CharField(
+                blank=True, max_length=20, null=True, verbose_name="Transaction Status"
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="last_payment_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Last Payment At"
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="payer_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Payer Count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="total_collected",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=14,
+                verbose_name="Total Collected",
+            ),
+        ),
+        migrations.RunPython(backfill_running_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0015_running_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Last Updated",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Last Updated",
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0016_payment_updated_at_transaction_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("kind", models.CharField(max_length=20, verbose_name="Kind")),
+                ("payload", models.JSONField(default=dict, verbose_name="Payload")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["department", "id"], name="pay_event_dept_id_idx"
+                    ),
+                    models.Index(fields=["created_at"], name="pay_event_created_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:42
+
+from django.db import migrations, models
+from num2words import num2words
+
+
+def backfill_amount_words(apps, schema_editor):
+    Payment = apps.get_model("pay", "Payment")
+    batch = []
+    for payment in Payment.objects.only("id", "amount_due").iterator(chunk_size=1000):
+        kobo = int(round(payment.amount_due * 100))
+        payment.amount_words = num2words(kobo, to="currency", lang="en_NG")
+        batch.append(payment)
+        if len(batch) >= 1000:
+            Payment.objects.bulk_update(batch, ["amount_words"])
+            batch = []
+    if batch:
+        Payment.objects.bulk_update(batch, ["amount_words"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0018_receipt_bundle"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="amount_words",
+            field=models.CharField(
+                default="",
+                editable=False,
+                max_length=255,
+                verbose_name="Amount In Words",
+            ),
+        ),
+        migrations.RunPython(backfill_amount_words, migrations.RunPython.noop),
+    ]
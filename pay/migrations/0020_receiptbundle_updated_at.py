@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pay", "0019_payment_amount_words"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="receiptbundle",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Updated at",
+            ),
+            preserve_default=False,
+        ),
+    ]
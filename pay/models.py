@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -11,10 +12,33 @@ class Payment(models.Model):
         _("Amount Expected"), decimal_places=2, max_digits=6
     )
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Last Updated"), auto_now=True)
+    # Running totals over successful transactions, maintained by pay/counters.py
+    total_collected = models.DecimalField(
+        _("Total Collected"), decimal_places=2, max_digits=14, default=0, editable=False
+    )
+    payer_count = models.PositiveIntegerField(
+        _("Payer Count"), default=0, editable=False
+    )
+    last_payment_at = models.DateTimeField(
+        _("Last Payment At"), null=True, blank=True, editable=False
+    )
+    # `amount_due` spelled out for receipts, kept up to date by a pre_save signal
+    # (see pay/receipt_text.py)
+    amount_words = models.CharField(
+        _("Amount In Words"), max_length=255, default="", editable=False
+    )
 
     def __str__(self):
         return self.payment_for
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # lets a save tell a renamed payment item from one saved with the same name
+        instance._loaded_payment_for = instance.__dict__.get("payment_for")
+        return instance
+
 
 class Transaction(models.Model):
     txn_id = models.BigAutoField(_("Transaction ID"), primary_key=True)
@@ -29,6 +53,7 @@ class Transaction(models.Model):
     )
     amount_paid = models.DecimalField(_("Amount Paid"), decimal_places=2, max_digits=6)
     created_at = models.DateTimeField(_("Transaction Created Date"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Last Updated"), auto_now=True)
     status = models.CharField(
         _("Transaction Status"), max_length=20, null=True, blank=True
     )
@@ -47,7 +72,148 @@ class Transaction(models.Model):
         _("Receipt URL"), max_length=200, null=True, blank=True
     )
     receipt_hash = models.CharField(_("Receipt Hash"), max_length=64, unique=True, editable=False)
+    # Lower-cased payer name, email, reference and payment item, kept up to date by a pre_save
+    # signal and indexed with pg_trgm on PostgreSQL (see pay/search.py)
+    search_text = models.TextField(_("Search Text"), default="", editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # lets the counters tell a transaction that just succeeded from one saved again
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
 
+    class Meta:
+        indexes = [
+            # department listings, stats and CSV export, newest first
+            models.Index(
+                fields=["department", "-created_at"], name="pay_txn_dept_created_idx"
+            ),
+            # `?status=` on the department listing and the admin's status + department filters
+            models.Index(
+                fields=["department", "status", "-created_at"],
+                name="pay_txn_dept_status_idx",
+            ),
+            # the admin's status filter on its own, ordered by primary key
+            models.Index(fields=["status", "-txn_id"], name="pay_txn_status_idx"),
+        ]
 
     def __str__(self):
         return self.received_from
+
+
+class TransactionArchive(models.Model):
+    """
+    One compressed Parquet file holding a department's transactions for a closed academic session.
+    """
+
+    department = models.ForeignKey(
+        "accounts.Department",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="txn_archives",
+    )
+    session = models.CharField(_("Academic Session"), max_length=9)
+    file_path = models.CharField(_("File Path"), max_length=255, unique=True)
+    row_count = models.PositiveIntegerField(_("Transactions"))
+    total_amount = models.DecimalField(
+        _("Total Amount"), decimal_places=2, max_digits=14
+    )
+    first_created_at = models.DateTimeField(_("First Transaction"))
+    last_created_at = models.DateTimeField(_("Last Transaction"))
+    created_at = models.DateTimeField(_("Archived At"), auto_now_add=True)
+
+    class Meta:
+        unique_together = ["department", "session"]
+
+    def __str__(self):
+        return self.file_path
+
+
+class ArchivedReceipt(models.Model):
+    """
+    The slice of an archived transaction needed to verify its receipt without opening the archive.
+    """
+
+    receipt_hash = models.CharField(_("Receipt Hash"), max_length=64, primary_key=True)
+    archive = models.ForeignKey(
+        TransactionArchive, on_delete=models.CASCADE, related_name="receipts"
+    )
+    payment = models.ForeignKey(
+        "pay.Payment",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="archived_receipts",
+    )
+    status = models.CharField(
+        _("Transaction Status"), max_length=20, null=True, blank=True
+    )
+    txn_id = models.BigIntegerField(_("Transaction ID"))
+    txn_reference = models.CharField(
+        _("Transaction Reference"), max_length=15, db_index=True
+    )
+    amount_paid = models.DecimalField(_("Amount Paid"), decimal_places=2, max_digits=6)
+    created_at = models.DateTimeField(_("Transaction Created Date"))
+
+    def __str__(self):
+        return self.txn_reference
+
+
+class DepartmentEvent(models.Model):
+    """
+    An append-only change feed of what happened in a department, read by the dashboard event
+    stream. Rows are short-lived and pruned by a cron job.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    department = models.ForeignKey(
+        "accounts.Department", on_delete=models.CASCADE, related_name="events"
+    )
+    kind = models.CharField(_("Kind"), max_length=20)
+    payload = models.JSONField(_("Payload"), default=dict)
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["department", "id"], name="pay_event_dept_id_idx"),
+            models.Index(fields=["created_at"], name="pay_event_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+
+class ReceiptBundle(models.Model):
+    """
+    A multi-page PDF of a department's receipts, rendered in the background, see
+    `pay/bundles.py`. `filters` holds the `TransactionFilter` query it was requested with.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    department = models.ForeignKey(
+        "accounts.Department", on_delete=models.CASCADE, related_name="receipt_bundles"
+    )
+    filters = models.JSONField(_("Filters"), default=dict)
+    status = models.CharField(
+        _("Status"), max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    total = models.PositiveIntegerField(_("Receipts"), default=0)
+    rendered = models.PositiveIntegerField(_("Rendered"), default=0)
+    url = models.CharField(_("URL"), max_length=255, null=True, blank=True)
+    error = models.TextField(_("Error"), blank=True, default="")
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    # saved with every progress update, see `pay.bundles.resume_stale_bundles`
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+    finished_at = models.DateTimeField(_("Finished at"), null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.total} receipt(s) for {self.department_id}"
@@ -3,18 +3,53 @@ from decouple import config
 from pprint import pprint
 from base64 import standard_b64encode
 from django.conf import settings
+from django.core.cache import cache
+import logging
 import uuid
 import json
 
 
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_CACHE_KEY = "monnify:access_token"
+# Refresh the cached token this many seconds before Monnify says it expires
+ACCESS_TOKEN_REFRESH_MARGIN = 60
+
+
 def generateAccessToken():
-    auth_url = f"{config('MONNIFY_BASE_URL')}/api/v1/auth/login"
+    """
+    The function `generateAccessToken` logs in to Monnify with the API and secret keys and returns a
+    fresh access token together with its lifetime.
+
+    :return: A tuple of the bearer token string and the number of seconds it stays valid.
+    """
+    auth_url = f"{settings.MONNIFY_BASE_URL}/api/v1/auth/login"
     token_str = config("MONNIFY_API_KEY") + ":" + config("MONNIFY_SECRET_KEY")
     token = standard_b64encode(token_str.encode("ascii")).decode("ascii")
     auth_headers = {"Authorization": f"Basic {token}"}
-    auth_res = requests.post(auth_url, headers=auth_headers).json()
-    pprint(auth_res["responseBody"]["accessToken"])
-    return auth_res["responseBody"]["accessToken"]
+    auth_res = requests.post(auth_url, headers=auth_headers, timeout=10).json()
+    if not auth_res.get("requestSuccessful"):
+        raise MonnifyException(message=auth_res.get("responseMessage", "Login failed"))
+    body = auth_res["responseBody"]
+    return body["accessToken"], int(body.get("expiresIn", 3600))
+
+
+def getAccessToken():
+    """
+    The function `getAccessToken` returns a Monnify access token from the shared cache, logging in
+    again only when the cached token is about to expire.
+
+    :return: A bearer token string that is valid for at least `ACCESS_TOKEN_REFRESH_MARGIN` seconds.
+    """
+    access_token = cache.get(ACCESS_TOKEN_CACHE_KEY)
+    if access_token:
+        return access_token
+    access_token, expires_in = generateAccessToken()
+    timeout = expires_in - ACCESS_TOKEN_REFRESH_MARGIN
+    if timeout > 0:
+        cache.set(ACCESS_TOKEN_CACHE_KEY, access_token, timeout=timeout)
+    logger.info("Fetched new Monnify access token")
+    return access_token
 
 
 def generateUniqueTransactionRef():
@@ -25,15 +60,6 @@ def generateUniqueTransactionRef():
     return str(uuid.uuid4())
 
 
-txn_data = {
-    "amount": 6000,
-    "customerName": "Stephen Ikooohane",
-    "customerEmail": "stephen@lopoikhane.com",
-    "paymentReference": "Food 9101000100911",
-    "paymentDescription": "Trial transactionizationaticalous",
-}
-
-
 class MonnifyException(Exception):
     """
     The class `MonnifyTransactionInitFailed` defines a custom exception for unexpected errors during
@@ -47,11 +73,14 @@ class MonnifyException(Exception):
 
 class Monnify:
     def __init__(self):
-        self.headers = {
-            "Authorization": f"Bearer {generateAccessToken()}",
+        self.currencyCode = "NGN"
+
+    @property
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {getAccessToken()}",
             "Content-Type": "application/json",
         }
-        self.currencyCode = "NGN"
 
     def getBanks(self):
         """
@@ -61,7 +90,7 @@ class Monnify:
         values.
         """
         response = requests.get(
-            f"{config('MONNIFY_BASE_URL')}/api/v1/banks", headers=self.headers
+            f"{settings.MONNIFY_BASE_URL}/api/v1/banks", headers=self.headers
         ).json()
         if not response["requestSuccessful"] or response["responseCode"] == "99":
             raise MonnifyException(message=response["responseMessage"])
@@ -72,9 +101,8 @@ class Monnify:
 
     def createSubAccount(self, data):
         data[0]["currencyCode"] = self.currencyCode
-        pprint(data)
         response = requests.post(
-            f"{config('MONNIFY_BASE_URL')}/api/v1/sub-accounts/",
+            f"{settings.MONNIFY_BASE_URL}/api/v1/sub-accounts/",
             headers=self.headers,
             json=data,
         ).json()
@@ -93,29 +121,46 @@ class Monnify:
         initialization request made to the Monnify API.
         """
         data["contractCode"] = config("CONTRACT_CODE")
-        data["redirectUrl"] = config("PROD_CALLBACK_URL")
+        data.setdefault("redirectUrl", config("PROD_CALLBACK_URL"))
         data["currencyCode"] = self.currencyCode
-        # data['redirectUrl'] = f'{config('DEV_CALLBACK_URL')}' if settings.DEBUG else f'{config('PROD_CALLBACK_URL')}'
-        pprint(f"data: {json.dumps(data)}")
-        txn_url = f"{config('MONNIFY_BASE_URL')}/api/v1/merchant/transactions/init-transaction"
+        txn_url = f"{settings.MONNIFY_BASE_URL}/api/v1/merchant/transactions/init-transaction"
         response = requests.post(
-            txn_url, data=json.dumps(data), headers=self.headers
+            txn_url, data=json.dumps(data), headers=self.headers, timeout=15
         ).json()
         if not response["requestSuccessful"] or response["responseCode"] == "99":
             raise MonnifyException(message=response["responseMessage"])
         return response["responseBody"]["checkoutUrl"]
 
+    def verifyTransaction(self, payment_reference):
+        """
+        The function `verifyTransaction` looks up a transaction by the payment reference we generated
+        when initializing it.
 
-p = Monnify()
-pprint("--------transaction init------")
-pprint(p.getBanks())
-
-subacc_dta = [
-	{
-		"bankCode": "090272",
-		"accountNumber": "1100020577",
-		"email": "test@gmail.com",
-		"defaultSplitPercentage": 94.7
-	}
-]
-pprint(p.initializeTransaction(txn_data))
+        :param payment_reference: The merchant `paymentReference` sent to `initializeTransaction`.
+        :return: The `responseBody` of the Monnify transaction query, including `paymentStatus`,
+        `amountPaid`, `paidOn`, `customer` and `metaData`.
+        """
+        response = requests.get(
+            f"{settings.MONNIFY_BASE_URL}/api/v2/merchant/transactions/query",
+            params={"paymentReference": payment_reference},
+            headers=self.headers,
+            timeout=15,
+        ).json()
+        if not response["requestSuccessful"] or response["responseCode"] == "99":
+            raise MonnifyException(message=response["responseMessage"])
+        return response["responseBody"]
+
+
+if __name__ == "__main__":
+    # Manual smoke test against the Monnify sandbox; never runs on import.
+    txn_data = {
+        "amount": 6000,
+        "customerName": "Stephen Ikooohane",
+        "customerEmail": "stephen@lopoikhane.com",
+        "paymentReference": "Food 9101000100911",
+        "paymentDescription": "Trial transactionizationaticalous",
+    }
+    p = Monnify()
+    pprint("--------transaction init------")
+    pprint(p.getBanks())
+    pprint(p.initializeTransaction(txn_data))
@@ -1,8 +1,12 @@
-from decouple import config
+from django.conf import settings
 import json
+import logging
 import requests
 
 
+logger = logging.getLogger(__name__)
+
+
 class Paystack:
     """
     A class to interact with the Paystack payment gateway API.
@@ -21,7 +25,7 @@ class Paystack:
 
     def __init__(self):
         self.headers = {
-            "Authorization": f"Bearer {config('PAYSTACK_SECRET_KEY')}",
+            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
             "Content-Type": "application/json",
         }
 
@@ -43,9 +47,10 @@ class Paystack:
             if data == None:
                 return {"error": "cannot create customer - no data provided"}
             response = requests.post(
-                url="https://api.paystack.co/customer",
+                url=f"{settings.PAYSTACK_BASE_URL}/customer",
                 headers=self.headers,
                 data=json.dumps(data),
+                timeout=15,
             ).json()
             customer_code = response["data"]["customer_code"]
             return customer_code
@@ -69,9 +74,10 @@ class Paystack:
             if data == None:
                 return {"error": "cannot create transaction - no data provided"}
             response = requests.post(
-                url="https://api.paystack.co/transaction/initialize",
+                url=f"{settings.PAYSTACK_BASE_URL}/transaction/initialize",
                 headers=self.headers,
                 data=json.dumps(data),
+                timeout=15,
             ).json()
             authorization_url = response["data"]["authorization_url"]
             return authorization_url
@@ -92,13 +98,16 @@ class Paystack:
         date paid, customer details, and metadata.
         """
         response = requests.get(
-            f"https://api.paystack.co/transaction/verify/{txn_ref}",
+            f"{settings.PAYSTACK_BASE_URL}/transaction/verify/{txn_ref}",
             headers=self.headers,
+            timeout=15,
         )
         try:
             response_data = response.json()
         except Exception as e:
-            print("Paystack verify_transaction non-JSON response:", response.text)
+            logger.warning(
+                f"Paystack verify_transaction non-JSON response: {response.text}"
+            )
             return {"error": f"Invalid response from Paystack: {str(e)}"}
         if response_data.get("status") and response_data["data"]["status"] == "success":
             metadata = response_data["data"]["metadata"]
@@ -0,0 +1,50 @@
+"""
+Amounts in words for receipts.
+
+`num2words` costs tens of microseconds per call and used to run for every receipt. A payment item's
+expected amount is spelled out once, when the `Payment` is saved, and kept in `amount_words`;
+amounts that differ from it go through a bounded LRU cache keyed by the amount in kobo.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from num2words import num2words
+
+
+# Distinct arbitrary amounts kept spelled out per process
+AMOUNT_WORDS_CACHE_SIZE = 4096
+
+
+def to_kobo(amount):
+    """
+    Converts an amount in naira (int, float, `Decimal` or string) to whole kobo.
+    """
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=AMOUNT_WORDS_CACHE_SIZE)
+def _kobo_in_words(kobo):
+    # an int is read as kobo: 150050 -> "one thousand, five hundred naira, fifty kobo"
+    return num2words(kobo, to="currency", lang="en_NG")
+
+
+def amount_in_words(amount):
+    """
+    The function `amount_in_words` spells out an amount in naira and kobo, e.g. `1500.50` ->
+    "one thousand, five hundred naira, fifty kobo".
+    """
+    return _kobo_in_words(to_kobo(amount))
+
+
+def receipt_amount_words(payment, amount):
+    """
+    The function `receipt_amount_words` returns the words printed on a receipt for `amount` paid
+    against `payment`, reusing the payment's stored words when the full amount was paid.
+    """
+    if (
+        payment is not None
+        and payment.amount_words
+        and to_kobo(payment.amount_due) == to_kobo(amount)
+    ):
+        return payment.amount_words
+    return amount_in_words(amount)
@@ -0,0 +1,103 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+
+# Below this many characters a trigram index cannot narrow the scan, so short terms only match
+# at the start of a word instead of anywhere in the search text.
+MIN_TRIGRAM_LENGTH = 3
+
+
+def build_search_text(transaction):
+    """
+    The function `build_search_text` flattens the fields support staff search on into a single
+    lower-cased string stored on the transaction.
+
+    :param transaction: A `Transaction` instance; its `payment` is read through the cached relation
+    when available.
+    :return: The payer name, email, reference and payment item separated by spaces.
+    """
+    payment_for = ""
+    if transaction.payment_id:
+        payment_for = transaction.payment.payment_for
+    parts = [
+        transaction.first_name,
+        transaction.last_name,
+        transaction.received_from,
+        transaction.customer_email,
+        transaction.txn_reference,
+        payment_for,
+    ]
+    return " ".join(part.strip().lower() for part in parts if part)
+
+
+def search_terms(query):
+    return [term for term in query.lower().split() if term][:5]
+
+
+def search_transactions(queryset, query):
+    """
+    The function `search_transactions` filters a transaction queryset to rows matching every term
+    in `query` and orders them best match first.
+
+    On PostgreSQL the `LIKE` on `search_text` is served by the trigram GIN index and results are
+    ranked by word similarity. Other databases (SQLite and MySQL in development) fall back to a
+    plain scan ranked by where the first term matched.
+
+    :param queryset: The `Transaction` queryset to search, already scoped to the department.
+    :param query: The raw `?search=` value.
+    :return: The filtered and ranked queryset.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    condition = Q()
+    for term in terms:
+        if len(term) < MIN_TRIGRAM_LENGTH:
+            condition &= Q(search_text__startswith=term) | Q(
+                search_text__contains=f" {term}"
+            )
+        else:
+            condition &= Q(search_text__contains=term)
+    queryset = queryset.filter(condition)
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        rank = TrigramWordSimilarity(" ".join(terms), "search_text")
+    else:
+        first = terms[0]
+        rank = Case(
+            When(txn_reference__iexact=first, then=Value(4)),
+            When(customer_email__iexact=first, then=Value(3)),
+            When(received_from__istartswith=first, then=Value(2)),
+            When(payment__payment_for__istartswith=first, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return queryset.annotate(search_rank=rank).order_by("-search_rank", "-created_at")
+
+
+def refresh_search_text(queryset, batch_size=1000):
+    """
+    Rebuilds `search_text` for every transaction in `queryset`, e.g. after a payment item is
+    renamed. Rows are rewritten in batches with `bulk_update`, which skips `auto_now`, so
+    `updated_at` is set here for anything validating on it.
+    """
+    fields = ["search_text", "updated_at"]
+    now = timezone.now()
+    batch = []
+    updated = 0
+    for transaction in queryset.select_related("payment").iterator(
+        chunk_size=batch_size
+    ):
+        transaction.search_text = build_search_text(transaction)
+        transaction.updated_at = now
+        batch.append(transaction)
+        if len(batch) >= batch_size:
+            updated += queryset.model.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        updated += queryset.model.objects.bulk_update(batch, fields)
+    return updated
@@ -1,12 +1,26 @@
 from rest_framework.serializers import ModelSerializer, CharField, EmailField
-from .models import Payment, Transaction
+from .models import Payment, ReceiptBundle, Transaction
 
 
 class PaymentSerializer(ModelSerializer):
     class Meta:
         model = Payment
-        fields = ["id", "payment_for", "amount_due", "created_at"]
-        read_only_fields = ["id", "created_at"]
+        fields = [
+            "id",
+            "payment_for",
+            "amount_due",
+            "created_at",
+            "total_collected",
+            "payer_count",
+            "last_payment_at",
+        ]
+        read_only_fields = [
+            "id",
+            "created_at",
+            "total_collected",
+            "payer_count",
+            "last_payment_at",
+        ]
 
     def create(self, validated_data):
         department = self.context["request"].user
@@ -43,3 +57,20 @@ class TransactionSerializer(ModelSerializer):
             "receipt_url",
             "payment_for",
         ]
+
+
+class ReceiptBundleSerializer(ModelSerializer):
+    class Meta:
+        model = ReceiptBundle
+        fields = [
+            "id",
+            "status",
+            "filters",
+            "total",
+            "rendered",
+            "url",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from utils.versioning import bump_version
+from .catalog import invalidate_catalog
+from .counters import SUCCESS, record_successful_transaction
+from .events import publish_transaction
+from .models import Payment, Transaction
+from .receipt_text import amount_in_words
+from .search import build_search_text, refresh_search_text
+
+
+@receiver(pre_save, sender=Transaction)
+def update_search_text(sender, instance, **kwargs):
+    instance.search_text = build_search_text(instance)
+
+
+@receiver(pre_save, sender=Payment)
+def update_amount_words(sender, instance, **kwargs):
+    instance.amount_words = amount_in_words(instance.amount_due)
+
+
+@receiver(post_save, sender=Payment)
+def refresh_payment_search_text(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    # a renamed payment item changes the search text of every transaction made against it
+    loaded = getattr(instance, "_loaded_payment_for", None)
+    instance._loaded_payment_for = instance.payment_for
+    if created or (update_fields is not None and "payment_for" not in update_fields):
+        return
+    if loaded == instance.payment_for:
+        return
+    refresh_search_text(Transaction.objects.filter(payment=instance))
+
+
+@receiver(post_save, sender=Transaction)
+def update_running_totals(sender, instance, created, **kwargs):
+    if (
+        instance.status != SUCCESS
+        or getattr(instance, "_loaded_status", None) == SUCCESS
+    ):
+        return
+    record_successful_transaction(instance)
+    publish_transaction(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def bump_department_version(sender, instance, **kwargs):
+    # retires the department's cached dashboard snapshots
+    # bumped after commit, so whoever sees the new version can also see the new rows
+    if instance.department_id:
+        department_id = instance.department_id
+        transaction.on_commit(lambda: bump_version("department", department_id))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_catalog_on_payment_change(sender, instance, **kwargs):
+    invalidate_catalog()
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from datetime import datetime
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.archive import closed_sessions, read_archive, session_for
+from pay.models import ArchivedReceipt, Transaction, TransactionArchive
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+from utils.stub_services import use_stub_services
+
+
+class TransactionArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+        # local storage is wiped on deploy; archives must never end up here
+        cls.storage_dir = tempfile.mkdtemp()
+        cls.enterClassContext(
+            override_settings(
+                STORAGES={
+                    "default": {
+                        "BACKEND": "django.core.files.storage.FileSystemStorage",
+                        "OPTIONS": {"location": cls.storage_dir},
+                    },
+                    "staticfiles": {
+                        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                    },
+                },
+                ACADEMIC_SESSION_START_MONTH=9,
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.storage_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.stub.state.reset()
+        self.department = DepartmentFactory.create()
+        payment = PaymentFactory.create(department=self.department, amount_due=1000)
+        self.old = TransactionFactory.create_batch(3, payment=payment)
+        self.current = TransactionFactory.create(payment=payment)
+        Transaction.objects.filter(pk__in=[t.pk for t in self.old]).update(
+            created_at=datetime(2023, 10, 1, tzinfo=timezone.get_current_timezone())
+        )
+        token = RefreshToken.for_user(self.department).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def test_sessions(self):
+        tz = timezone.get_current_timezone()
+        self.assertEqual(session_for(datetime(2024, 8, 31, tzinfo=tz)), "2023/2024")
+        self.assertEqual(session_for(datetime(2024, 9, 1, tzinfo=tz)), "2024/2025")
+        self.assertEqual(
+            closed_sessions(now=datetime(2025, 10, 1, tzinfo=tz)),
+            ["2023/2024"],
+        )
+
+    def test_archive_moves_closed_session_out_of_the_live_table(self):
+        call_command(
+            "archive_transactions", "--session", "2023/2024", stdout=StringIO()
+        )
+
+        self.assertEqual(list(Transaction.objects.all()), [self.current])
+        archive = TransactionArchive.objects.get()
+        self.assertIn(f"archives/{archive.file_path}", self.stub.state.objects)
+        self.assertEqual(os.listdir(self.storage_dir), [])
+        self.assertEqual(archive.row_count, 3)
+        self.assertEqual(archive.total_amount, 3000)
+        frame = read_archive(archive, columns=["receipt_hash", "payment_for"])
+        self.assertEqual(set(frame["receipt_hash"]), {t.receipt_hash for t in self.old})
+        self.assertEqual(ArchivedReceipt.objects.count(), 3)
+
+        # running totals are rebuilt from the archive index as well as the live table
+        call_command("repair_counters", stdout=StringIO())
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.total_collected, 4000)
+        self.assertEqual(self.department.payer_count, 4)
+
+        # archived receipts still verify and still count towards the stats
+        response = self.client.get(
+            reverse("verify-receipt"), {"hash": self.old[0].receipt_hash}
+        )
+        self.assertEqual(response.json()["transaction_id"], self.old[0].txn_id)
+        stats = self.client.get(reverse("transaction-transaction-stats")).json()
+        self.assertEqual(stats["total_transactions"], 4)
+
+        response = self.client.get(
+            reverse("export_transactions"), {"include_archived": "true"}
+        )
+        self.assertEqual(len(response.content.decode().strip().splitlines()), 5)
+
+    def test_archived_receipts_can_still_be_downloaded(self):
+        call_command(
+            "archive_transactions", "--session", "2023/2024", stdout=StringIO()
+        )
+        self.client.defaults.pop("HTTP_AUTHORIZATION")
+        with tempfile.TemporaryDirectory() as receipts:
+            with override_settings(RECEIPT_CACHE_DIR=receipts):
+                response = self.client.get(
+                    reverse("download_receipt", args=[self.old[0].receipt_hash])
+                )
+                pdf = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertIn(self.old[0].txn_reference, response["Content-Disposition"])
+
+    def test_late_rows_are_merged_into_the_existing_archive(self):
+        call_command(
+            "archive_transactions", "--session", "2023/2024", stdout=StringIO()
+        )
+        late = TransactionFactory.create(payment=self.current.payment)
+        Transaction.objects.filter(pk=late.pk).update(
+            created_at=datetime(2024, 1, 5, tzinfo=timezone.get_current_timezone())
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "archive_transactions", "--session", "2023/2024", stdout=StringIO()
+            )
+
+        archive = TransactionArchive.objects.get()
+        self.assertEqual(archive.row_count, 4)
+        self.assertEqual(len(read_archive(archive)), 4)
+        # the archive it replaced is removed from storage once the merge commits
+        self.assertEqual(
+            list(self.stub.state.objects), [f"archives/{archive.file_path}"]
+        )
+
+    def test_rows_stay_when_the_uploaded_archive_does_not_read_back(self):
+        with mock.patch("pay.archive.get_object", return_value=b"truncated"):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "archive_transactions", "--session", "2023/2024", stdout=StringIO()
+                )
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertFalse(TransactionArchive.objects.exists())
+        self.assertEqual(self.stub.state.objects, {})
+
+    def test_dry_run_and_open_sessions(self):
+        call_command("archive_transactions", "--dry-run", stdout=StringIO())
+        self.assertEqual(Transaction.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            call_command(
+                "archive_transactions",
+                "--session",
+                session_for(timezone.now()),
+                stdout=StringIO(),
+            )
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings, tag
+from pay.benchmark import compare_results, percentile, run_benchmark
+from utils.stub_services import use_stub_services
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_flags_latency_and_query_growth(self):
+        baseline = {
+            "endpoints": {"transaction.list": {"p95_ms": 10, "mean_queries": 3}}
+        }
+        current = {"endpoints": {"transaction.list": {"p95_ms": 13, "mean_queries": 4}}}
+        self.assertEqual(len(compare_results(current, baseline, tolerance=0.2)), 2)
+        self.assertEqual(compare_results(baseline, baseline), [])
+
+
+@tag("benchmark")
+@override_settings(
+    PAYMENT_GATEWAYS=["paystack"],
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class PaymentDayBenchmarkTests(TransactionTestCase):
+    def test_small_payment_day(self):
+        cache.clear()
+        with use_stub_services():
+            results = run_benchmark(
+                departments=2,
+                payments_per_department=2,
+                history_per_department=5,
+                students=4,
+            )
+        endpoints = results["endpoints"]
+        self.assertEqual(
+            set(endpoints),
+            {
+                "transaction.init",
+                "transaction.verify",
+                "receipt.verify",
+                "transaction.list",
+                "transaction.stats",
+            },
+        )
+        for endpoint in endpoints.values():
+            self.assertEqual(endpoint["requests"], 4)
+            self.assertEqual(endpoint["errors"], 0)
+            self.assertLessEqual(endpoint["p50_ms"], endpoint["p99_ms"])
@@ -0,0 +1,97 @@
+import base64
+import json
+import os
+from unittest import mock
+from django.core import mail
+from django.test import SimpleTestCase
+from pay.benchmark import measure_receipt_memory
+from pay.utils import send_receipt_email
+from receipt_utils.create_receipt import generate_receipt
+from receipt_utils.upload_receipt import upload_receipt
+from utils.buffers import (
+    ATTACHMENT,
+    BufferReader,
+    as_buffer,
+    as_bytes,
+    iter_base64,
+    json_with_attachment,
+)
+from utils.stub_services import use_stub_services
+
+
+class SharedBufferTests(SimpleTestCase):
+    def test_rendered_receipt_is_shared_not_copied(self):
+        stream = generate_receipt({"header": "PHYSICS", "receipt_hash": "abc"})
+        pdf = as_buffer(stream)
+        self.assertIs(pdf.obj, stream.getvalue())
+        self.assertTrue(pdf.readonly)
+        self.assertEqual(BufferReader(pdf).read(), stream.getvalue())
+        self.assertIs(as_bytes(pdf), stream.getvalue())
+
+    def test_base64_is_encoded_in_chunks(self):
+        data = os.urandom(1000)
+        self.assertEqual(
+            b"".join(iter_base64(memoryview(data), chunk_size=99)),
+            base64.b64encode(data),
+        )
+
+    def test_json_body_streams_the_attachment(self):
+        data = os.urandom(200_001)
+        body = json_with_attachment(
+            {"Messages": [{"Subject": "Receipt", "Base64Content": ATTACHMENT}]},
+            as_buffer(data),
+        )
+        content = body.read()
+        self.assertEqual(len(content), len(body))
+        message = json.loads(content)["Messages"][0]
+        self.assertEqual(message["Subject"], "Receipt")
+        self.assertEqual(base64.b64decode(message["Base64Content"]), data)
+
+
+class ReceiptDeliveryTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+
+    def setUp(self):
+        self.stub.state.reset()
+        self.pdf = as_buffer(generate_receipt({"header": "PHYSICS"}))
+
+    def test_upload_sends_the_buffer(self):
+        upload_receipt("shared.pdf", self.pdf)
+        stored, content_type = self.stub.state.objects["receipts/shared.pdf"]
+        self.assertEqual(stored, self.pdf.obj)
+        self.assertEqual(content_type, "application/pdf")
+
+    def test_email_attaches_the_buffer(self):
+        with self.settings(
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+        ):
+            send_receipt_email("student@example.com", {"payment_for": "Dues"}, self.pdf)
+        ((_, content, mimetype),) = mail.outbox[0].attachments
+        self.assertIs(content, self.pdf.obj)
+        self.assertEqual(mimetype, "application/pdf")
+
+    def test_mailjet_backend_streams_the_attachment(self):
+        # anymail would encode the whole attachment up front through this property
+        with mock.patch(
+            "anymail.utils.Attachment.b64content",
+            new_callable=mock.PropertyMock,
+            side_effect=AssertionError("attachment encoded in memory"),
+        ):
+            send_receipt_email("student@example.com", {"payment_for": "Dues"}, self.pdf)
+        (message,) = self.stub.state.emails
+        self.assertEqual(message["To"], [{"Email": "student@example.com"}])
+        (attachment,) = message["Attachments"]
+        self.assertEqual(attachment["Filename"], "receipt.pdf")
+        self.assertEqual(base64.b64decode(attachment["Base64Content"]), self.pdf.obj)
+
+    def test_memory_benchmark(self):
+        results = measure_receipt_memory(receipts=2)
+        self.assertEqual(results["receipts"], 2)
+        self.assertGreater(results["pdf_bytes"], 0)
+        self.assertEqual(
+            set(results["peak_bytes"]), {"render", "upload", "email", "total"}
+        )
+        self.assertEqual(len(self.stub.state.emails), 3)
@@ -0,0 +1,167 @@
+import io
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.bundles import build_bundle, receipt_data
+from pay.models import ReceiptBundle, Transaction
+from receipt_utils.create_receipt import (
+    SCHOOL_LOGO_PATH,
+    generate_receipt,
+    generate_receipts,
+)
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+from utils.stub_services import use_stub_services
+
+
+def receipt(n):
+    return {
+        "header": "PHYSICS",
+        "date": "2025-01-01",
+        "received_from": f"Student {n}",
+        "payment_for": "Dues",
+        "amount": 1000,
+        "department_logo": SCHOOL_LOGO_PATH,
+        "receipt_hash": f"hash{n}",
+    }
+
+
+class MultiPageReceiptTests(TestCase):
+    def test_one_page_per_receipt_sharing_fonts_and_logos(self):
+        pdf = generate_receipts(receipt(n) for n in range(3)).getvalue()
+        self.assertIn(b"/Count 3", pdf)
+        # the font and the two logos are embedded once; only the QR codes differ per page
+        self.assertEqual(pdf.count(b"/FontFile2"), 1)
+        self.assertEqual(pdf.count(b"/Subtype /Image"), 2 + 3)
+
+        single = generate_receipt(receipt(0)).getvalue()
+        self.assertLess(len(pdf), 3 * len(single) * 0.6)
+
+
+class ReceiptBundleTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+
+    def setUp(self):
+        cache.clear()
+        self.stub.state.reset()
+        self.department = DepartmentFactory.create()
+        self.payment = PaymentFactory.create(department=self.department)
+        self.paid = TransactionFactory.create_batch(3, payment=self.payment)
+        TransactionFactory.create(payment=self.payment, status="failed")
+        TransactionFactory.create(department=self.department)
+        TransactionFactory.create()
+        token = RefreshToken.for_user(self.department).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def test_renders_a_pdf_in_the_background(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("create_receipt_bundle"),
+                {"payment": self.payment.pk},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["total"], 3)
+        self.assertEqual(len(callbacks), 1)
+
+        bundle = build_bundle(response.json()["id"])
+        self.assertEqual(bundle.status, ReceiptBundle.Status.DONE)
+        self.assertEqual(bundle.rendered, 3)
+        pdf, content_type = self.stub.state.objects[f"receipts/bundles/{bundle.pk}.pdf"]
+        self.assertEqual(content_type, "application/pdf")
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+        response = self.client.get(reverse("receipt_bundle", args=[bundle.pk]))
+        self.assertEqual(response.json()["url"], bundle.url)
+        other = DepartmentFactory.create()
+        token = RefreshToken.for_user(other).access_token
+        response = self.client.get(
+            reverse("receipt_bundle", args=[bundle.pk]),
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_bundles_lost_with_their_process_are_resumed_or_failed(self):
+        with self.captureOnCommitCallbacks():
+            lost, abandoned = [
+                self.client.post(
+                    reverse("create_receipt_bundle"),
+                    {"payment": self.payment.pk},
+                    content_type="application/json",
+                ).json()["id"]
+                for _ in range(2)
+            ]
+        # neither background task ran: the process went away first
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        ReceiptBundle.objects.filter(pk=lost).update(updated_at=an_hour_ago)
+        ReceiptBundle.objects.filter(pk=abandoned).update(
+            created_at=an_hour_ago - timedelta(hours=1), updated_at=an_hour_ago
+        )
+
+        response = self.client.get(reverse("receipt_bundle", args=[abandoned]))
+        self.assertEqual(response.json()["status"], ReceiptBundle.Status.FAILED)
+
+        call_command("resume_background_jobs", stdout=StringIO())
+        bundle = ReceiptBundle.objects.get(pk=lost)
+        self.assertEqual(
+            (bundle.status, bundle.rendered), (ReceiptBundle.Status.DONE, 3)
+        )
+        self.assertIn(f"receipts/bundles/{lost}.pdf", self.stub.state.objects)
+        self.assertNotIn(f"receipts/bundles/{abandoned}.pdf", self.stub.state.objects)
+
+    def test_rejects_empty_and_oversized_bundles(self):
+        response = self.client.post(
+            reverse("create_receipt_bundle"),
+            {"received_from": "nobody"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        with override_settings(RECEIPT_BUNDLE_MAX_RECEIPTS=3):
+            response = self.client.post(reverse("create_receipt_bundle"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ReceiptBundle.objects.exists())
+
+    def test_streams_stored_receipts_as_a_zip(self):
+        stored = self.paid[0]
+        self.stub.state.objects["receipts/stored.pdf"] = (
+            b"%PDF stored",
+            "application/pdf",
+        )
+        stored.receipt_url = (
+            f"{self.stub.url}/supabase/storage/v1/object/public/receipts/stored.pdf"
+        )
+        stored.save()
+
+        response = self.client.get(
+            reverse("download_receipts_zip"), {"payment": self.payment.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertEqual(
+            archive.read(
+                f"{stored.received_from.replace(' ', '_')}_{stored.txn_reference}.pdf"
+            ),
+            b"%PDF stored",
+        )
+        # receipts that were never uploaded are rendered on the fly
+        self.assertTrue(all(archive.read(name).startswith(b"%PDF") for name in names))
+
+    def test_receipt_data_from_a_stored_transaction(self):
+        transaction = Transaction.objects.select_related("department", "payment").get(
+            pk=self.paid[0].pk
+        )
+        data = receipt_data(transaction)
+        self.assertEqual(data["header"], self.department.dept_name.upper())
+        self.assertEqual(data["receipt_hash"], transaction.receipt_hash)
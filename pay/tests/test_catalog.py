@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from pay.models import Payment
+from utils.factories import DepartmentFactory, PaymentFactory
+
+
+class PublicCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create(
+            is_verified=True, dept_name="Physics"
+        )
+        self.dues = PaymentFactory.create(
+            department=self.department, payment_for="Dues", amount_due=1500
+        )
+        unverified = DepartmentFactory.create(is_verified=False)
+        PaymentFactory.create(department=unverified)
+
+    def get(self, **headers):
+        return self.client.get(reverse("catalog"), headers=headers)
+
+    def test_catalog_lists_verified_departments_with_their_items(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        departments = response.json()["departments"]
+        self.assertEqual([d["dept_name"] for d in departments], ["Physics"])
+        self.assertEqual(
+            departments[0]["payments"],
+            [{"id": self.dues.id, "payment_for": "Dues", "amount_due": "1500.00"}],
+        )
+
+    def test_cached_and_revalidated_with_etag(self):
+        etag = self.get()["ETag"]
+        with self.assertNumQueries(0):
+            response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_rebuilt_when_a_payment_item_or_department_changes(self):
+        etag = self.get()["ETag"]
+        self.dues.amount_due = 2000
+        self.dues.save()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["departments"][0]["payments"][0]["amount_due"], "2000.00"
+        )
+
+        etag = response["ETag"]
+        DepartmentFactory.create(is_verified=True)
+        self.assertNotEqual(self.get()["ETag"], etag)
+
+    def test_logins_do_not_invalidate(self):
+        etag = self.get()["ETag"]
+        self.department.last_login = timezone.now()
+        self.department.save(update_fields=["last_login"])
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+    def test_payment_list_does_not_look_up_the_department(self):
+        Payment.objects.create(department=self.department, amount_due=100)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse("payments-list", kwargs={"department_pk": self.department.pk})
+            )
+        self.assertEqual(len(response.json()), 2)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "accounts_department" in q["sql"]]
+        )
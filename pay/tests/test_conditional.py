@@ -0,0 +1,86 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.models import Transaction
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create(is_verified=True)
+        self.payment = PaymentFactory.create(department=self.department)
+        self.txn = TransactionFactory.create(payment=self.payment)
+        token = RefreshToken.for_user(self.department).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        self.url = reverse("transaction-list")
+
+    def test_unchanged_list_is_a_bodiless_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # only the validator aggregate (the department comes from the principal cache); no rows
+        # are serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_changes_new_rows_and_other_pages_get_a_new_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertNotEqual(
+            self.client.get(self.url, {"status": "failed"})["ETag"], etag
+        )
+
+        txn = Transaction.objects.get(pk=self.txn.pk)
+        txn.receipt_url = "https://receipts.test/new.pdf"
+        txn.save()
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        TransactionFactory.create(payment=self.payment)
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.txn.updated_at
+        response = self.client.get(
+            self.url,
+            headers={"if-modified-since": http_date(last_modified.timestamp() + 1)},
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            self.url,
+            headers={
+                "if-modified-since": http_date(
+                    (last_modified - timedelta(minutes=1)).timestamp()
+                )
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_payment_list_changes_when_a_payment_is_collected(self):
+        url = reverse("payments-list", kwargs={"department_pk": self.department.pk})
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(
+            self.client.get(url, headers={"if-none-match": etag}).status_code, 304
+        )
+        TransactionFactory.create(payment=self.payment)
+        self.assertEqual(
+            self.client.get(url, headers={"if-none-match": etag}).status_code, 200
+        )
+
+    def test_department_retrieve(self):
+        self.client.defaults.pop("HTTP_AUTHORIZATION")
+        url = reverse("department-detail", kwargs={"pk": self.department.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,59 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from accounts.models import Department
+from pay.models import Payment, Transaction
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+class RunningTotalsTests(TestCase):
+    def setUp(self):
+        self.department = DepartmentFactory.create()
+        self.dues = PaymentFactory.create(department=self.department, amount_due=1500)
+        self.dinner = PaymentFactory.create(department=self.department, amount_due=4000)
+
+    def test_successful_transactions_update_payment_and_department(self):
+        TransactionFactory.create_batch(2, payment=self.dues)
+        latest = TransactionFactory.create(payment=self.dinner)
+        TransactionFactory.create(payment=self.dinner, status="failed")
+
+        self.dues.refresh_from_db()
+        self.assertEqual(self.dues.total_collected, 3000)
+        self.assertEqual(self.dues.payer_count, 2)
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.total_collected, 7000)
+        self.assertEqual(self.department.payer_count, 3)
+        self.assertEqual(self.department.last_payment_at, latest.created_at)
+
+    def test_saving_again_does_not_double_count(self):
+        txn = TransactionFactory.create(payment=self.dues)
+        txn.receipt_url = "https://receipts.test/1.pdf"
+        txn.save()
+        txn = Transaction.objects.get(pk=txn.pk)
+        txn.save()
+
+        self.dues.refresh_from_db()
+        self.assertEqual(self.dues.payer_count, 1)
+
+    def test_pending_transaction_counts_once_it_succeeds(self):
+        txn = TransactionFactory.create(payment=self.dues, status="pending")
+        txn = Transaction.objects.get(pk=txn.pk)
+        txn.status = "success"
+        txn.save()
+        self.assertEqual(Payment.objects.get(pk=self.dues.pk).payer_count, 1)
+
+    def test_repair_command_recomputes_drifted_totals(self):
+        TransactionFactory.create_batch(3, payment=self.dues)
+        TransactionFactory.create(payment=self.dues, status="failed")
+        Payment.objects.update(total_collected=0, payer_count=99, last_payment_at=None)
+        Department.objects.update(total_collected=1, payer_count=0)
+
+        call_command("repair_counters", stdout=StringIO())
+
+        self.dues.refresh_from_db()
+        self.assertEqual((self.dues.total_collected, self.dues.payer_count), (4500, 3))
+        self.assertIsNotNone(self.dues.last_payment_at)
+        self.dinner.refresh_from_db()
+        self.assertEqual((self.dinner.total_collected, self.dinner.payer_count), (0, 0))
+        self.department.refresh_from_db()
+        self.assertEqual(self.department.total_collected, 4500)
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.models import Payment
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create()
+        self.dues = PaymentFactory.create(department=self.department, amount_due=1500)
+        PaymentFactory.create(department=self.department, amount_due=3000)
+        TransactionFactory.create_batch(12, payment=self.dues)
+        TransactionFactory.create()  # another department
+        token = RefreshToken.for_user(self.department).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def test_dashboard_in_one_response(self):
+        # department lookup for the token, payments, department totals, recent transactions,
+        # daily series
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("dashboard"), {"days": 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["stats"]["payer_count"], 12)
+        self.assertEqual(float(data["stats"]["total_collected"]), 18000)
+        self.assertEqual(data["stats"]["total_payments"], 2)
+        self.assertEqual(len(data["recent_transactions"]), 10)
+        self.assertEqual(len(data["daily"]), 7)
+        self.assertEqual(data["daily"][-1]["count"], 12)
+        dues = next(p for p in data["payments"] if p["id"] == self.dues.id)
+        self.assertEqual(dues["payer_count"], 12)
+
+    def test_snapshot_is_cached_until_the_department_changes(self):
+        self.client.get(reverse("dashboard"))
+        with self.assertNumQueries(0):
+            self.client.get(reverse("dashboard"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory.create(payment=self.dues)
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.json()["stats"]["payer_count"], 13)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.filter(pk=self.dues.pk).get().delete()
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.json()["stats"]["total_payments"], 1)
+
+    def test_invalid_days(self):
+        response = self.client.get(reverse("dashboard"), {"days": "week"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,82 @@
+from unittest import mock
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.models import Payment
+from pay.views import PaymentViewSet, TransactionViewSet, verify_receipt
+from utils.db_router import STICKY_COOKIE, ReplicaMiddleware, ReplicaRouter
+from utils.factories import DepartmentFactory
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.department = DepartmentFactory.create()
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(self.department).access_token}"
+        }
+
+    def run_request(self, request, view, write=False):
+        """
+        Runs `request` through the middleware and reports which database the view's reads used,
+        before and after an optional write.
+        """
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen["read"] = self.router.db_for_read(Payment) or "default"
+            if write:
+                self.router.db_for_write(Payment)
+                seen["after_write"] = self.router.db_for_read(Payment) or "default"
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        with mock.patch("utils.db_router.replica_available", return_value=True):
+            response = middleware(request)
+        return seen, response
+
+    def test_safe_reads_of_marked_views_use_the_replica(self):
+        list_view = TransactionViewSet.as_view({"get": "list", "post": "create"})
+        seen, _ = self.run_request(
+            self.factory.get("/pay/pay/", **self.auth), list_view
+        )
+        self.assertEqual(seen["read"], "replica")
+
+        seen, _ = self.run_request(self.factory.get("/pay/verify/"), verify_receipt)
+        self.assertEqual(seen["read"], "replica")
+
+        # unmarked views and writes stay on the primary
+        verify = TransactionViewSet.as_view({"get": "transaction_verify"})
+        seen, _ = self.run_request(self.factory.get("/pay/pay/verify/"), verify)
+        self.assertEqual(seen["read"], "default")
+        seen, _ = self.run_request(self.factory.post("/pay/pay/"), list_view)
+        self.assertEqual(seen["read"], "default")
+
+    def test_read_your_writes(self):
+        view = PaymentViewSet.as_view({"get": "list"})
+        seen, response = self.run_request(
+            self.factory.get("/accounts/department/x/payment/", **self.auth),
+            view,
+            write=True,
+        )
+        self.assertEqual(seen, {"read": "replica", "after_write": "default"})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # the same department stays on the primary for its next reads, with or without cookies
+        seen, _ = self.run_request(
+            self.factory.get("/accounts/department/x/payment/", **self.auth), view
+        )
+        self.assertEqual(seen["read"], "default")
+        request = self.factory.get("/pay/verify/")
+        request.COOKIES[STICKY_COOKIE] = "1"
+        seen, _ = self.run_request(request, verify_receipt)
+        self.assertEqual(seen["read"], "default")
+
+    def test_no_replica_configured(self):
+        self.assertIsNone(self.router.db_for_read(Payment))
+        self.assertFalse(self.router.allow_migrate("replica", "pay"))
+        self.assertTrue(self.router.allow_migrate("default", "pay"))
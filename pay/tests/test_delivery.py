@@ -0,0 +1,203 @@
+import os
+import tempfile
+import time
+from unittest import mock
+from django.core import mail
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from pay.delivery import ReceiptCache, receipt_link, remember_receipt
+from pay.models import Transaction
+from utils.conditional import byte_range
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+from utils.stub_services import use_stub_services
+
+
+class ByteRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(byte_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(byte_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(byte_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(byte_range("bytes=990-2000", 1000), (990, 999))
+        self.assertEqual(byte_range("bytes=-5000", 1000), (0, 999))
+
+    def test_ignored_and_unsatisfiable_ranges(self):
+        for header in (None, "", "items=0-1", "bytes=0-1,5-6", "bytes=5-1", "bytes=a-"):
+            self.assertIsNone(byte_range(header, 1000))
+        with self.assertRaises(ValueError):
+            byte_range("bytes=1000-", 1000)
+        with self.assertRaises(ValueError):
+            byte_range("bytes=-0", 1000)
+
+
+class ReceiptCacheTests(SimpleTestCase):
+    def test_least_recently_served_receipts_are_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            receipts = ReceiptCache(directory, max_bytes=25)
+            for n, name in enumerate(("a", "b")):
+                receipts.store(name, [b"x" * 10]).close()
+                os.utime(receipts.path(name), (n, n))
+            receipts.open("a").close()
+            receipts.store("c", [b"x" * 10]).close()
+            self.assertIsNone(receipts.open("b"))
+            self.assertIsNotNone(receipts.open("a"))
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+
+class DownloadReceiptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(RECEIPT_CACHE_DIR=directory.name))
+        self.stub.state.reset()
+        self.stub.state.objects["receipts/stored.pdf"] = (
+            b"%PDF stored receipt",
+            "application/pdf",
+        )
+        self.transaction = TransactionFactory.create(
+            receipt_url=f"{self.stub.url}/supabase/storage/v1/object/public/receipts/stored.pdf"
+        )
+        self.url = reverse("download_receipt", args=[self.transaction.receipt_hash])
+
+    def test_streams_the_stored_receipt_and_keeps_it_on_disk(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF stored receipt")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=300, must-revalidate"
+        )
+        self.assertTrue(response["Content-Disposition"].startswith("inline"))
+
+        # served from the disk cache once storage no longer has it
+        self.stub.state.reset()
+        response = self.client.get(self.url)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF stored receipt")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"stored")
+        self.assertEqual(response["Content-Range"], "bytes 5-10/19")
+        self.assertEqual(response["Content-Length"], "6")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */19")
+
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=5-10", HTTP_IF_RANGE='"another-version"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_a_regenerated_receipt_gets_a_new_etag(self):
+        first = self.client.get(self.url)
+        b"".join(first.streaming_content)
+        remember_receipt(self.transaction.receipt_hash, b"%PDF re-sent receipt")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF re-sent receipt")
+
+        # resuming the old copy restarts with the whole new file
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=5-10", HTTP_IF_RANGE=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF re-sent receipt")
+
+    def test_receipts_never_uploaded_are_rendered(self):
+        self.transaction.receipt_url = None
+        self.transaction.save()
+        response = self.client.get(self.url)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(
+            self.client.get("/pay/receipts/unknown/download/").status_code, 404
+        )
+
+    @override_settings(RECEIPT_LINK_MAX_AGE=600)
+    def test_signed_links_expire(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        link = receipt_link(self.transaction.receipt_hash)
+        path = link.split("/pay/", 1)[1]
+        response = self.client.get(f"/pay/{path}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Cache-Control"].startswith("private, max-age="))
+        self.assertEqual(self.client.get(f"/pay/{path}x").status_code, 403)
+
+        with mock.patch(
+            "django.core.signing.time.time", return_value=time.time() + 601
+        ):
+            response = self.client.get(f"/pay/{path}")
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("expired", response.json()["detail"])
+
+
+@override_settings(PAYMENT_GATEWAYS=["paystack"], RECEIPT_DELIVERY="link")
+class LinkDeliveryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # keep the sent email readable rather than posting it to the stand-in
+        self.enterContext(
+            override_settings(
+                RECEIPT_CACHE_DIR=directory.name,
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            )
+        )
+        self.department = DepartmentFactory.create(sub_account_code="ACCT_link")
+        self.payment = PaymentFactory.create(department=self.department)
+        self.stub.state.reset()
+        mail.outbox = []
+
+    def test_receipt_email_links_to_the_cached_receipt(self):
+        response = self.client.post(
+            reverse("transaction-list"),
+            {
+                "department": self.department.id,
+                "payment": self.payment.id,
+                "first_name": "Ada",
+                "last_name": "Obi",
+                "customer_email": "ada@student.com",
+            },
+        )
+        reference = response.json()["authorization_url"].rsplit("/", 1)[-1]
+        response = self.client.get(
+            reverse("transaction-transaction-verify"), {"trxref": reference}
+        )
+        self.assertEqual(response.status_code, 200)
+        transaction = Transaction.objects.get(txn_reference=reference)
+        download_url = response.json()["download_url"]
+        self.assertTrue(
+            download_url.endswith(
+                reverse("download_receipt", args=[transaction.receipt_hash])
+            )
+        )
+
+        (email,) = mail.outbox
+        self.assertEqual(email.attachments, [])
+        self.assertIn(download_url, email.alternatives[0][0])
+
+        # the freshly rendered receipt is served without going back to storage
+        self.stub.state.reset()
+        response = self.client.get(
+            reverse("download_receipt", args=[transaction.receipt_hash])
+        )
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
@@ -0,0 +1,97 @@
+import json
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.events import prune_events
+from pay.models import DepartmentEvent
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+def parse_events(body):
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in block.splitlines()
+            if not line.startswith(":")
+        )
+        if "data" in fields:
+            events.append(
+                (fields.get("id"), fields.get("event"), json.loads(fields["data"]))
+            )
+    return events
+
+
+@override_settings(SSE_MAX_DURATION=0.05, SSE_POLL_INTERVAL=0.01)
+class DepartmentEventStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create()
+        self.payment = PaymentFactory.create(
+            department=self.department, amount_due=2000
+        )
+        self.token = str(RefreshToken.for_user(self.department).access_token)
+
+    def stream(self, **params):
+        response = self.client.get(
+            reverse("department_events"), {"token": self.token, **params}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return parse_events(b"".join(response.streaming_content).decode())
+
+    def test_successful_transactions_are_published(self):
+        TransactionFactory.create(payment=self.payment, status="failed")
+        txn = TransactionFactory.create(payment=self.payment)
+        self.assertEqual(DepartmentEvent.objects.count(), 1)
+
+        events = self.stream(last_event_id=0)
+        kinds = [kind for _, kind, _ in events]
+        self.assertEqual(kinds, ["totals", "transaction", "totals"])
+        _, _, payload = events[1]
+        self.assertEqual(payload["txn_id"], txn.txn_id)
+        self.assertEqual(float(payload["amount_paid"]), 2000)
+        self.assertEqual(events[2][2]["payer_count"], 1)
+
+    def test_fresh_connections_start_from_now_and_resume_from_last_event_id(self):
+        first = TransactionFactory.create(payment=self.payment)
+        self.assertEqual([kind for _, kind, _ in self.stream()], ["totals"])
+
+        TransactionFactory.create(payment=self.payment)
+        last_id = DepartmentEvent.objects.get(payload__txn_id=first.txn_id).id
+        events = self.stream(last_event_id=last_id)
+        self.assertEqual(len([e for e in events if e[1] == "transaction"]), 1)
+
+    def test_other_departments_and_bad_tokens(self):
+        TransactionFactory.create()
+        self.assertEqual(
+            [kind for _, kind, _ in self.stream(last_event_id=0)], ["totals"]
+        )
+        response = self.client.get(reverse("department_events"), {"token": "nope"})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(SSE_MAX_STREAMS=1)
+    def test_streams_beyond_the_cap_are_turned_away(self):
+        url = reverse("department_events")
+        held = self.client.get(url, {"token": self.token})
+        self.assertEqual(held.status_code, 200)
+
+        response = self.client.get(url, {"token": self.token})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+
+        held.close()
+        response = self.client.get(url, {"token": self.token})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    @override_settings(DEPARTMENT_EVENT_RETENTION_HOURS=1)
+    def test_prune(self):
+        TransactionFactory.create_batch(2, payment=self.payment)
+        DepartmentEvent.objects.filter(pk=DepartmentEvent.objects.first().pk).update(
+            created_at=timezone.now() - timedelta(hours=2)
+        )
+        self.assertEqual(prune_events(), 1)
+        self.assertEqual(DepartmentEvent.objects.count(), 1)
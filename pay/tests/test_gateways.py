@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from pay import monnify
+from pay.gateways import (
+    GatewayError,
+    MonnifyGateway,
+    PaystackGateway,
+    gateway_for_reference,
+    initialize_transaction,
+    select_gateways,
+)
+from pay.models import Payment
+from utils.factories import DepartmentFactory
+
+
+@override_settings(PAYMENT_GATEWAYS=["paystack", "monnify"])
+@mock.patch.object(MonnifyGateway, "is_configured", return_value=True)
+class GatewayRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create(
+            sub_account_code="ACCT_test", monnify_sub_account_code="MFY_SUB_test"
+        )
+        self.payment = Payment.objects.create(
+            department=self.department, payment_for="Dues", amount_due=5000
+        )
+        self.customer = {"email": "a@b.com", "first_name": "Ada", "last_name": "Obi"}
+
+    def test_fails_over_when_primary_errors(self, _):
+        with mock.patch.object(
+            PaystackGateway, "initialize_transaction", side_effect=GatewayError("down")
+        ), mock.patch.object(
+            MonnifyGateway,
+            "initialize_transaction",
+            return_value="https://monnify/checkout",
+        ):
+            gateway, url = initialize_transaction(
+                self.department, self.payment, self.customer
+            )
+        self.assertEqual(gateway, "monnify")
+        self.assertEqual(url, "https://monnify/checkout")
+
+    def test_unhealthy_gateway_is_tried_last(self, _):
+        health = PaystackGateway().health
+        for _ in range(10):
+            health.record(False, 0.1)
+        names = [gw.name for gw in select_gateways(self.department)]
+        self.assertEqual(names, ["monnify", "paystack"])
+
+    def test_concurrent_records_are_all_counted(self, _):
+        health = PaystackGateway().health
+        # all in one window
+        with mock.patch("pay.gateways.time.time", return_value=1_000_000.0):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda n: health.record(n % 4 != 0, 0.2), range(400)))
+            stats = health.snapshot()
+        self.assertEqual((stats["calls"], stats["errors"]), (400, 100))
+        self.assertAlmostEqual(stats["latency"], 0.2)
+
+    def test_monnify_needs_a_sub_account(self, _):
+        self.department.monnify_sub_account_code = None
+        names = [gw.name for gw in select_gateways(self.department)]
+        self.assertEqual(names, ["paystack"])
+
+    def test_reference_routes_to_issuing_gateway(self, _):
+        reference = MonnifyGateway().new_reference()
+        self.assertLessEqual(len(reference), 15)
+        self.assertEqual(gateway_for_reference(reference).name, "monnify")
+        self.assertEqual(gateway_for_reference("x7yz1abcd2").name, "paystack")
+
+
+class MonnifyTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch.object(monnify, "generateAccessToken", return_value=("tok", 3600))
+    def test_access_token_is_cached(self, login):
+        self.assertEqual(monnify.getAccessToken(), "tok")
+        self.assertEqual(monnify.getAccessToken(), "tok")
+        login.assert_called_once()
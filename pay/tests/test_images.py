@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+from django.test import SimpleTestCase
+from PIL import Image, ImageDraw
+from receipt_utils.create_receipt import generate_receipt
+from utils.images import bucket_path, normalize_image, upload_variants, variant_path
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def scanned_signature():
+    # a blue scribble on off-white paper with a wide margin
+    image = Image.new("RGB", (1600, 900), (246, 244, 240))
+    ImageDraw.Draw(image).line(
+        [(400, 600), (700, 300), (900, 550), (1200, 350)], fill=(20, 30, 140), width=14
+    )
+    return encode(image, "JPEG")
+
+
+class ImageNormalizationTests(SimpleTestCase):
+    def test_opaque_logo_becomes_a_small_trimmed_jpeg(self):
+        image = Image.new("RGB", (3000, 2000), "white")
+        ImageDraw.Draw(image).rectangle([1000, 500, 2000, 1500], fill="green")
+        variants = normalize_image(encode(image, "JPEG"), "logo")
+
+        content, extension, content_type = variants["receipt"]
+        self.assertEqual((extension, content_type), ("jpg", "image/jpeg"))
+        receipt = Image.open(io.BytesIO(content))
+        # the white margin is trimmed, leaving the square at the receipt's 300dpi box size
+        self.assertEqual(receipt.size, (167, 167))
+        self.assertEqual(
+            Image.open(io.BytesIO(variants["preview"][0])).size, (256, 256)
+        )
+        self.assertLess(len(content), 20_000)
+
+    def test_transparent_logo_stays_png(self):
+        image = Image.new("RGBA", (600, 300), (0, 0, 0, 0))
+        ImageDraw.Draw(image).ellipse([50, 50, 550, 250], fill=(200, 0, 0, 255))
+        content, extension, _ = normalize_image(encode(image, "PNG"), "logo")["receipt"]
+        self.assertEqual(extension, "png")
+        self.assertEqual(Image.open(io.BytesIO(content)).size, (167, 67))
+
+    def test_signature_loses_its_paper(self):
+        variants = normalize_image(scanned_signature(), "president_signature")
+        content, extension, _ = variants["receipt"]
+        self.assertEqual(extension, "png")
+        signature = Image.open(io.BytesIO(content))
+        self.assertEqual(signature.mode, "RGBA")
+        self.assertLessEqual(signature.width, 250)
+        self.assertLessEqual(signature.height, 104)
+        self.assertEqual(signature.getpixel((0, signature.height - 1))[3], 0)
+        self.assertGreater(signature.getchannel("A").getextrema()[1], 200)
+
+    def test_unreadable_upload_keeps_the_original(self):
+        with self.assertRaises(ValueError):
+            normalize_image(b"not an image", "logo")
+        self.assertEqual(upload_variants("logo", "x.png", b"nope", None), {})
+
+    def test_variants_are_stored_next_to_the_original(self):
+        stored = {}
+
+        def upload(path, content, content_type):
+            stored[path] = content_type
+            return f"https://cdn/{path}"
+
+        urls = upload_variants(
+            "secretary_signature", "temp_uploads/sign.jpg", scanned_signature(), upload
+        )
+        self.assertEqual(urls["receipt"], "https://cdn/temp_uploads/sign.receipt.png")
+        self.assertEqual(
+            stored[variant_path("temp_uploads/sign.jpg", "preview", "png")], "image/png"
+        )
+        self.assertEqual(
+            bucket_path(
+                "https://x.supabase.co/storage/v1/object/public/logo/temp_uploads/a.png",
+                "logo",
+            ),
+            "temp_uploads/a.png",
+        )
+
+    def test_receipt_draws_normalized_signatures(self):
+        content = normalize_image(scanned_signature(), "president_signature")[
+            "receipt"
+        ][0]
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+            f.write(content)
+        try:
+            pdf = generate_receipt(
+                {
+                    "header": "PHYSICS",
+                    "president_signature": f.name,
+                    "financial_signature": f.name,
+                    "amount": 1000,
+                    "receipt_hash": "abc",
+                }
+            )
+        finally:
+            os.remove(f.name)
+        self.assertTrue(pdf.getvalue().startswith(b"%PDF"))
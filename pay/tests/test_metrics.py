@@ -0,0 +1,99 @@
+import os
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from utils.db_connections import TimedConnectionMixin, track_connections
+from utils.metrics import metrics, render_prometheus, span
+
+
+@mock.patch.dict(os.environ, {"CRON_SECRET_TOKEN": "cron-secret"})
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_requires_cron_token(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_reports_request_latency_and_queries(self):
+        self.client.post(
+            reverse("login-list"), {"email": "x@y.com", "password": "nope"}
+        )
+        response = self.client.get(
+            reverse("metrics"), headers={"X-Cron-Token": "cron-secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'studentpay_request_duration_seconds_count{endpoint="login-list",method="POST",status="4xx"} 1',
+            body,
+        )
+        self.assertIn('studentpay_request_queries_count{endpoint="login-list"', body)
+
+
+class SpanTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_span_records_stage_histogram(self):
+        with span("receipt.render"):
+            pass
+        body = render_prometheus(metrics.snapshot())
+        self.assertIn(
+            'studentpay_stage_duration_seconds_bucket{stage="receipt.render",le="+Inf"} 1',
+            body,
+        )
+
+
+class DatabaseReportTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_logs_a_report_per_request(self):
+        with self.assertLogs("studentpay.db", "INFO") as logs:
+            self.client.post(
+                reverse("login-list"), {"email": "x@y.com", "password": "nope"}
+            )
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertRegex(
+            logs.output[0], r"POST login-list 4\d\d in .*ms: \d+ queries in .*ms"
+        )
+        body = render_prometheus(metrics.snapshot())
+        self.assertIn(
+            'studentpay_request_db_acquire_seconds_count{endpoint="login-list",method="POST"} 1',
+            body,
+        )
+
+    @override_settings(DB_QUERY_BUDGET=0)
+    def test_warns_over_the_query_budget(self):
+        with self.assertLogs("studentpay.db", "INFO") as logs:
+            self.client.post(
+                reverse("login-list"), {"email": "x@y.com", "password": "nope"}
+            )
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertIn("over the budget of 0 queries", logs.output[0])
+
+    def test_times_connecting_and_health_checks(self):
+        class TimedWrapper(TimedConnectionMixin, DatabaseWrapper):
+            pass
+
+        settings_dict = {**connection.settings_dict, "CONN_HEALTH_CHECKS": True}
+        timed = TimedWrapper(settings_dict, alias="timed")
+        try:
+            with track_connections() as stats:
+                with timed.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                # the next request reuses the connection after checking it
+                timed.close_if_unusable_or_obsolete()
+                with timed.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            self.assertEqual(stats.connects, 1)
+            self.assertEqual(stats.health_checks, 1)
+            self.assertGreater(stats.acquire_time, 0)
+        finally:
+            timed.close()
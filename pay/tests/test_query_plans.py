@@ -0,0 +1,115 @@
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import Department
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+@skipUnless(
+    connection.vendor in ("sqlite", "postgresql"),
+    "query plans are only checked on SQLite and PostgreSQL",
+)
+class TransactionQueryPlanTests(TestCase):
+    """
+    Runs the endpoints that read the transaction table, then EXPLAINs every filtered query they
+    issued against `pay_transaction` and fails if any of them scans the whole table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = DepartmentFactory.create_batch(3)
+        for department in cls.departments:
+            payments = PaymentFactory.create_batch(2, department=department)
+            for i in range(30):
+                TransactionFactory.create(
+                    payment=payments[i % 2], status="success" if i % 3 else "failed"
+                )
+        cls.admin = Department.objects.create_superuser(
+            email="admin@studentpay.test", password="Testpass123"
+        )
+
+    def setUp(self):
+        cache.clear()
+        department = self.departments[0]
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(department).access_token}"
+        }
+        self.department = department
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndexes(self, request, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = request(*args, **kwargs)
+        self.assertLess(response.status_code, 400)
+        queries = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT")
+            and '"pay_transaction"' in q["sql"]
+            and " WHERE " in q["sql"]
+        ]
+        self.assertTrue(queries, "the endpoint did not read the transaction table")
+        for sql in queries:
+            plan = self.explain(sql)
+            if connection.vendor == "postgresql":
+                self.assertNotRegex(
+                    plan, r"Seq Scan on pay_transaction\b", f"{sql}\n{plan}"
+                )
+            else:
+                self.assertNotRegex(plan, r"SCAN pay_transaction\b", f"{sql}\n{plan}")
+                if " ORDER BY " in sql:
+                    self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan, f"{sql}\n{plan}")
+
+    def test_department_listing(self):
+        self.assertUsesIndexes(
+            self.client.get, reverse("transaction-list"), **self.auth
+        )
+
+    def test_department_listing_by_status(self):
+        self.assertUsesIndexes(
+            self.client.get,
+            reverse("transaction-list"),
+            {"status": "success"},
+            **self.auth,
+        )
+
+    def test_stats(self):
+        self.assertUsesIndexes(
+            self.client.get, reverse("transaction-transaction-stats"), **self.auth
+        )
+
+    def test_csv_export(self):
+        self.assertUsesIndexes(
+            self.client.get, reverse("export_transactions"), **self.auth
+        )
+
+    # the admin renders templates; skip the collectstatic manifest
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+    )
+    def test_admin_status_and_department_filters(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:pay_transaction_changelist")
+        self.assertUsesIndexes(self.client.get, url, {"status__exact": "success"})
+        self.assertUsesIndexes(
+            self.client.get,
+            url,
+            {"status__exact": "success", "department__id__exact": self.department.id},
+        )
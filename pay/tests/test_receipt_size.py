@@ -0,0 +1,84 @@
+import io
+import os
+import re
+import tempfile
+from django.test import SimpleTestCase
+from PIL import Image, ImageDraw
+from pay.benchmark import measure_receipt_size
+from receipt_utils import create_receipt
+from receipt_utils.create_receipt import FONT_PATH, SCHOOL_LOGO_PATH, generate_receipt
+from utils.images import RECEIPT_IMAGE_SIZE, fit_for_receipt
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def photo_logo():
+    # a large opaque logo, as uploaded before variants existed
+    image = Image.new("RGB", (2400, 1600), "white")
+    ImageDraw.Draw(image).ellipse([200, 200, 2200, 1400], fill=(0, 90, 40))
+    return encode(image, "JPEG")
+
+
+class ReceiptOutputTests(SimpleTestCase):
+    def test_receipt_embeds_a_font_subset_and_compresses_its_streams(self):
+        pdf = generate_receipt(
+            {
+                "header": "PHYSICS",
+                "amount": 1000,
+                "department_logo": SCHOOL_LOGO_PATH,
+                "receipt_hash": "abc",
+            }
+        ).getvalue()
+        self.assertNotIn(b"ASCII85Decode", pdf)
+        for stream in re.findall(rb"<<[^>]*/Length \d+[^>]*>>", pdf):
+            self.assertRegex(stream, rb"/(FlateDecode|DCTDecode)")
+        # the naira sign is real text from an embedded subset, not the whole font
+        self.assertEqual(pdf.count(b"/FontFile2"), 1)
+        (font_length,) = re.findall(rb"/Length1 (\d+)", pdf)
+        self.assertLess(int(font_length), os.path.getsize(FONT_PATH) / 10)
+        self.assertLess(len(pdf), 48 * 1024)
+
+    def test_size_report(self):
+        size = measure_receipt_size(bundle_receipts=4)
+        self.assertEqual(size["embedded_fonts"], 1)
+        self.assertEqual(size["embedded_images"], 2 + 1)
+        self.assertLess(size["bundle_bytes_per_receipt"], size["receipt_bytes"])
+
+
+class ReceiptImageSizeTests(SimpleTestCase):
+    def setUp(self):
+        create_receipt._image_cache.clear()
+        self.addCleanup(create_receipt._image_cache.clear)
+
+    def test_large_images_are_downsampled_to_the_receipt(self):
+        content = fit_for_receipt(photo_logo())
+        image = Image.open(io.BytesIO(content))
+        self.assertEqual(image.format, "JPEG")
+        self.assertEqual(image.size, (250, 167))
+
+        transparent = Image.new("RGBA", (1000, 1000), (0, 0, 0, 0))
+        ImageDraw.Draw(transparent).rectangle([100, 100, 900, 900], fill="red")
+        image = Image.open(io.BytesIO(fit_for_receipt(encode(transparent, "PNG"))))
+        self.assertEqual((image.format, image.mode), ("PNG", "RGBA"))
+        self.assertEqual(image.size, (RECEIPT_IMAGE_SIZE[1], RECEIPT_IMAGE_SIZE[1]))
+
+    def test_small_or_unreadable_images_are_kept(self):
+        with open(SCHOOL_LOGO_PATH, "rb") as f:
+            school_logo = f.read()
+        self.assertIs(fit_for_receipt(school_logo), school_logo)
+        self.assertEqual(fit_for_receipt(b"not an image"), b"not an image")
+
+    def test_receipt_embeds_the_downsampled_logo(self):
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+            f.write(photo_logo())
+        self.addCleanup(os.remove, f.name)
+        pdf = generate_receipt(
+            {"header": "PHYSICS", "department_logo": f.name, "receipt_hash": "abc"}
+        ).getvalue()
+        self.assertIn(b"/Width 250", pdf)
+        self.assertNotIn(b"/Width 2400", pdf)
+        self.assertLess(len(create_receipt.image_bytes(f.name)), 20_000)
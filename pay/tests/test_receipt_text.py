@@ -0,0 +1,56 @@
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase
+from pay.bundles import receipt_data
+from pay.models import Payment, Transaction
+from pay.receipt_text import amount_in_words, receipt_amount_words, to_kobo
+from utils.factories import PaymentFactory, TransactionFactory
+
+
+class AmountInWordsTests(TestCase):
+    def test_amounts_are_spelled_in_naira_and_kobo(self):
+        self.assertEqual(to_kobo(Decimal("1500.50")), 150050)
+        self.assertEqual(to_kobo(19.99), 1999)
+        words = "one thousand, five hundred naira, fifty kobo"
+        self.assertEqual(amount_in_words(Decimal("1500.50")), words)
+        self.assertEqual(amount_in_words("1500.5"), words)
+        self.assertEqual(amount_in_words(2000), "two thousand naira, zero kobo")
+
+    def test_payment_stores_its_amount_in_words(self):
+        payment = PaymentFactory.create(amount_due=Decimal("2500.00"))
+        self.assertEqual(
+            Payment.objects.get(pk=payment.pk).amount_words,
+            "two thousand, five hundred naira, zero kobo",
+        )
+        payment.amount_due = Decimal("300.25")
+        payment.save()
+        self.assertEqual(
+            Payment.objects.get(pk=payment.pk).amount_words,
+            "three hundred naira, twenty-five kobo",
+        )
+
+    def test_receipts_look_the_words_up(self):
+        payment = PaymentFactory.create(amount_due=Decimal("2500.00"))
+        with mock.patch("pay.receipt_text.num2words") as num2words:
+            self.assertEqual(receipt_amount_words(payment, 2500), payment.amount_words)
+        num2words.assert_not_called()
+        # a partial payment is spelled out, then served from the cache
+        self.assertEqual(
+            receipt_amount_words(payment, 1234),
+            "one thousand, two hundred and thirty-four naira, zero kobo",
+        )
+        with mock.patch("pay.receipt_text.num2words") as num2words:
+            receipt_amount_words(payment, Decimal("1234.00"))
+        num2words.assert_not_called()
+
+    def test_stored_transactions_are_not_spelled_in_kobo(self):
+        transaction = TransactionFactory.create(
+            payment=PaymentFactory.create(amount_due=Decimal("1500.50"))
+        )
+        transaction = Transaction.objects.select_related("department", "payment").get(
+            pk=transaction.pk
+        )
+        self.assertEqual(
+            receipt_data(transaction)["amount_words"],
+            "one thousand, five hundred naira, fifty kobo",
+        )
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from receipt_utils import renderer
+from receipt_utils.create_receipt import image_bytes
+from receipt_utils.renderer import (
+    RendererService,
+    RendererUnavailable,
+    preload_assets,
+    render_receipt,
+    render_remotely,
+)
+from utils.factories import DepartmentFactory
+
+
+RECEIPT = {"header": "PHYSICS", "amount": 1000, "receipt_hash": "abc"}
+
+
+class BlockingExecutor:
+    """Renders only once `release` is set, so requests pile up in the service."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=2)
+
+    def submit(self, func, *args):
+        self.started.set()
+        return self.pool.submit(lambda: self.release.wait(5) and func(*args))
+
+    def shutdown(self, **kwargs):
+        self.release.set()
+        self.pool.shutdown()
+
+
+class RendererServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.address = os.path.join(self.directory, "renderer.sock")
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.addCleanup(renderer._drop_connection)
+
+    def start(self, queue_size=4, executor=None):
+        service = RendererService(
+            self.address,
+            workers=1,
+            queue_size=queue_size,
+            executor=executor or ThreadPoolExecutor(max_workers=1),
+        )
+        self.addCleanup(service.close)
+        return service.serve_in_background()
+
+    def test_renders_through_the_service(self):
+        self.start()
+        pdf = render_remotely(self.address, RECEIPT, timeout=10)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        # the connection is kept for the next receipt
+        connection = renderer._local.connection
+        render_remotely(self.address, RECEIPT, timeout=10)
+        self.assertIs(renderer._local.connection, connection)
+
+    def test_busy_service_pushes_back(self):
+        executor = BlockingExecutor()
+        self.start(queue_size=1, executor=executor)
+        results = []
+        waiting = threading.Thread(
+            target=lambda: results.append(render_remotely(self.address, RECEIPT, 10))
+        )
+        waiting.start()
+        # the first request holds the only slot
+        self.assertTrue(executor.started.wait(5))
+        with self.assertRaisesMessage(RendererUnavailable, "busy"):
+            render_remotely(self.address, RECEIPT, timeout=10)
+        executor.release.set()
+        waiting.join()
+        self.assertTrue(results[0].startswith(b"%PDF"))
+
+    def test_falls_back_to_rendering_in_process(self):
+        with override_settings(RECEIPT_RENDERER_ADDRESS=self.address):
+            # nothing listens on the socket
+            pdf = render_receipt(RECEIPT)
+            self.assertTrue(pdf.getvalue().startswith(b"%PDF"))
+
+            self.start(queue_size=0)
+            with mock.patch.object(
+                renderer, "generate_receipt", wraps=renderer.generate_receipt
+            ) as generate:
+                render_receipt(RECEIPT)
+            generate.assert_called_once()
+
+    def test_slow_service_times_out(self):
+        self.start(executor=BlockingExecutor())
+        with self.assertRaisesMessage(RendererUnavailable, "no answer"):
+            render_remotely(self.address, RECEIPT, timeout=0.2)
+        self.assertIsNone(renderer._local.connection)
+
+    def test_rendering_processes_start_warm(self):
+        service = RendererService(self.address, workers=1, queue_size=2)
+        self.addCleanup(service.close)
+        service.serve_in_background()
+        pdf = render_remotely(self.address, RECEIPT, timeout=60)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+
+class PreloadTests(TestCase):
+    def test_preloads_recently_paid_departments(self):
+        department = DepartmentFactory.create(
+            is_verified=True, logo_url="https://cdn.example/logo.png"
+        )
+        DepartmentFactory.create(
+            is_verified=False, logo_url="https://cdn.example/x.png"
+        )
+        with mock.patch(
+            "receipt_utils.create_receipt.fetch_image", return_value=b"png"
+        ) as fetch:
+            preload = preload_assets(limit=5)
+        self.assertEqual(preload, [(department.logo_url, b"png")])
+        fetch.assert_called_once_with(department.logo_url)
+        # now cached for in-process rendering too
+        self.assertEqual(image_bytes(department.logo_url), b"png")
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from pay.models import Payment, Transaction
+from utils.factories import DepartmentFactory, PaymentFactory, TransactionFactory
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        self.department = DepartmentFactory.create()
+        self.dues = PaymentFactory.create(
+            department=self.department, payment_for="Dues"
+        )
+        self.dinner = PaymentFactory.create(
+            department=self.department, payment_for="Dinner"
+        )
+        self.ada = TransactionFactory.create(
+            payment=self.dues,
+            first_name="Ada",
+            last_name="Okonkwo",
+            received_from="Ada Okonkwo",
+            customer_email="ada.o@uni.edu",
+            txn_reference="REFADA0001",
+        )
+        self.bola = TransactionFactory.create(
+            payment=self.dinner,
+            first_name="Bola",
+            last_name="Adeyemi",
+            received_from="Bola Adeyemi",
+            customer_email="bola@uni.edu",
+            txn_reference="REFBOLA001",
+        )
+        # another department's payer must never show up
+        TransactionFactory.create(received_from="Ada Other", first_name="Ada")
+        token = RefreshToken.for_user(self.department).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def search(self, query):
+        response = self.client.get(reverse("transaction-list"), {"search": query})
+        self.assertEqual(response.status_code, 200)
+        references = dict(Transaction.objects.values_list("txn_id", "txn_reference"))
+        return [references[row["txn_id"]] for row in response.json()["results"]]
+
+    def test_search_text_is_maintained_on_save(self):
+        self.assertEqual(
+            self.ada.search_text,
+            "ada okonkwo ada okonkwo ada.o@uni.edu refada0001 dues",
+        )
+
+    def test_partial_name_email_reference_and_item(self):
+        self.assertEqual(self.search("konk"), ["REFADA0001"])
+        self.assertEqual(self.search("bola@uni"), ["REFBOLA001"])
+        self.assertEqual(self.search("refbola001"), ["REFBOLA001"])
+        self.assertEqual(self.search("dinner"), ["REFBOLA001"])
+
+    def test_every_term_must_match_and_best_match_ranks_first(self):
+        self.assertEqual(self.search("ada dues"), ["REFADA0001"])
+        self.assertEqual(self.search("bola ade"), ["REFBOLA001"])
+        self.assertEqual(self.search("REFADA0001 ada"), ["REFADA0001"])
+
+    def test_renaming_a_payment_item_refreshes_search_text(self):
+        before = Transaction.objects.get(pk=self.ada.pk).updated_at
+        self.dues.payment_for = "Faculty Dues"
+        self.dues.save()
+        self.assertEqual(self.search("faculty"), ["REFADA0001"])
+        ada = Transaction.objects.get(pk=self.ada.pk)
+        self.assertIn("faculty dues", ada.search_text)
+        self.assertGreater(ada.updated_at, before)
+
+    def test_saving_an_unrenamed_payment_item_leaves_transactions_alone(self):
+        for payment in (self.dues, Payment.objects.get(pk=self.dues.pk)):
+            payment.amount_due += 100
+            with CaptureQueriesContext(connection) as queries:
+                payment.save()
+            self.assertFalse(
+                [q for q in queries if 'UPDATE "pay_transaction"' in q["sql"]]
+            )
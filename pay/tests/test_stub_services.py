@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from pay.models import Payment, Transaction
+from utils.factories import DepartmentFactory
+from utils.stub_services import use_stub_services
+
+
+class StubServicesFlowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = cls.enterClassContext(use_stub_services())
+        cls.enterClassContext(override_settings(PAYMENT_GATEWAYS=["paystack"]))
+
+    def setUp(self):
+        cache.clear()
+        self.department = DepartmentFactory.create(sub_account_code="ACCT_stub")
+        self.payment = Payment.objects.create(
+            department=self.department, payment_for="Dues", amount_due=2500
+        )
+        # forget the welcome email sent for the new department
+        self.stub.state.reset()
+
+    def test_checkout_and_verify_offline(self):
+        response = self.client.post(
+            reverse("transaction-list"),
+            {
+                "department": self.department.id,
+                "payment": self.payment.id,
+                "first_name": "Ada",
+                "last_name": "Obi",
+                "customer_email": "ada@student.com",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        reference = response.json()["authorization_url"].rsplit("/", 1)[-1]
+
+        response = self.client.get(
+            reverse("transaction-transaction-verify"), {"trxref": reference}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "/storage/v1/object/public/receipts/", response.json()["receipt_url"]
+        )
+
+        txn = Transaction.objects.get(txn_reference=reference)
+        self.assertEqual(txn.amount_paid, 2500)
+        self.assertEqual(len(self.stub.state.objects), 1)
+        self.assertEqual(len(self.stub.state.emails), 1)
+
+    def test_injected_errors_surface_as_gateway_errors(self):
+        self.stub.state.config["services"] = {"paystack": {"error_rate": 1.0}}
+        try:
+            response = self.client.get(
+                reverse("transaction-transaction-verify"), {"trxref": "missing"}
+            )
+        finally:
+            self.stub.state.config["services"] = {}
+        self.assertIn("error", response.json())
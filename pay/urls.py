@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, get_banks, generate_receipt_with_reference, export_transactions_to_csv, verify_receipt
+from .views import TransactionViewSet, get_banks, generate_receipt_with_reference, export_transactions_to_csv, verify_receipt, dashboard, public_catalog, department_events, create_receipt_bundle, receipt_bundle, download_receipts_zip, download_receipt
 
 
 router = DefaultRouter()
@@ -12,4 +12,11 @@ urlpatterns = [
     path("generate-receipt/", generate_receipt_with_reference, name="generate_receipt"),
     path('export-transactions/', export_transactions_to_csv, name='export_transactions'),
     path('verify/', verify_receipt, name='verify-receipt'), 
+    path("dashboard/", dashboard, name="dashboard"),
+    path("catalog/", public_catalog, name="catalog"),
+    path("events/", department_events, name="department_events"),
+    path("receipts/bundles/", create_receipt_bundle, name="create_receipt_bundle"),
+    path("receipts/bundles/<uuid:id>/", receipt_bundle, name="receipt_bundle"),
+    path("receipts/zip/", download_receipts_zip, name="download_receipts_zip"),
+    path("receipts/<str:receipt_hash>/download/", download_receipt, name="download_receipt"),
 ]
@@ -2,6 +2,8 @@ from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
+from utils.buffers import as_bytes
+from utils.metrics import outbound
 
 
 def send_receipt_email(to_email, context, pdf_file, filename="receipt.pdf"):
@@ -12,8 +14,8 @@ def send_receipt_email(to_email, context, pdf_file, filename="receipt.pdf"):
     email
     :param context: The `context` parameter in the `send_receipt_email` function is a dictionary that
     contains information related to the payment for which the receipt is being sent.
-    :param pdf_file: The `pdf_file` parameter in the `send_receipt_email` function is a file object that
-    contains the PDF content of the receipt that you want to attach to the email.
+    :param pdf_file: The receipt PDF, as a `BytesIO` or a buffer from `utils.buffers.as_buffer`; it is
+    attached without being copied.
     :param filename: The `filename` parameter in the `send_receipt_email` function is a string that
     represents the name of the PDF file that will be attached to the email.
     """
@@ -29,9 +31,10 @@ def send_receipt_email(to_email, context, pdf_file, filename="receipt.pdf"):
     msg.attach_alternative(html_content, "text/html")
 
     if pdf_file:
-        msg.attach(filename, pdf_file.getvalue(), "application/pdf")
+        msg.attach(filename, as_bytes(pdf_file), "application/pdf")
 
-    msg.send()
+    with outbound("mailjet.send"):
+        msg.send()
     
     
 def send_welcome_mail(to_email):
@@ -53,7 +56,8 @@ def send_welcome_mail(to_email):
     )
     msg.attach_alternative(html_content, "text/html")
 
-    msg.send()
+    with outbound("mailjet.send"):
+        msg.send()
     
 def send_approval_email(to_email, context):
     """
@@ -77,7 +81,8 @@ def send_approval_email(to_email, context):
     )
     msg.attach_alternative(html_content, "text/html")
 
-    msg.send()
+    with outbound("mailjet.send"):
+        msg.send()
     
 def send_rejection_email(to_email, context):
     """
@@ -96,11 +101,10 @@ def send_rejection_email(to_email, context):
     html_content = render_to_string("account_rejected.html", context)
     text_content = strip_tags(html_content)
     
-    print("Sending rejection email to:", to_email)
-
     msg = EmailMultiAlternatives(
         subject, text_content, from_email, [to_email]
     )
     msg.attach_alternative(html_content, "text/html")
 
-    msg.send()
+    with outbound("mailjet.send"):
+        msg.send()
@@ -1,4 +1,5 @@
 import csv
+from itertools import chain
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
@@ -6,34 +7,85 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
 from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.views.decorators.http import require_GET, require_safe
 from django.conf import settings
+from django.db.models import Count, Sum
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_headers
 from utils.fetchReceiptData import getReceiptData
 from .filters import TransactionFilter
 from utils.pagination import CustomResultsSetPagination
+from utils.conditional import ConditionalGetMixin, byte_range
+from utils.db_router import replica_read
+from accounts.authentication import CachedJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from pay.utils import send_receipt_email
-from .paystack import Paystack
-from .models import Payment, Transaction
+from .gateways import GatewayError, initialize_transaction
+from .archive import archived_export_rows, archived_transaction
+from .bundles import (
+    BundleError,
+    bundle_queryset,
+    expire_abandoned_bundles,
+    receipt_data,
+    receipt_filename,
+    start_bundle,
+    stream_zip,
+)
+from .delivery import (
+    CHUNK_SIZE,
+    ReceiptLinkError,
+    check_link,
+    open_receipt,
+    receipt_etag,
+    receipt_link,
+    remember_receipt,
+)
+from .catalog import get_catalog
+from .events import StreamLimitReached, open_stream
+from .dashboard import DEFAULT_DAYS, MAX_DAYS, get_dashboard
+from .models import (
+    ArchivedReceipt,
+    Payment,
+    ReceiptBundle,
+    Transaction,
+    TransactionArchive,
+)
 from accounts.models import Department
 from accounts.utils import get_bank_codes
-from .serializers import PaymentSerializer, TransactionSerializer
-from num2words import num2words
-from receipt_utils.create_receipt import generate_receipt
+from .serializers import (
+    PaymentSerializer,
+    ReceiptBundleSerializer,
+    TransactionSerializer,
+)
+from receipt_utils.renderer import render_receipt
 from receipt_utils.upload_receipt import upload_receipt
+from utils.buffers import as_buffer
+from utils.metrics import span
 import logging
 import hashlib
+import math
+import os
+import requests
 
 
 logger = logging.getLogger(__name__)
 
 
-class PaymentViewSet(ModelViewSet):
+class PaymentViewSet(ConditionalGetMixin, ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    # running totals change through `last_payment_at` without touching `updated_at`
+    conditional_fields = ("updated_at", "last_payment_at")
+    replica_actions = ("list", "retrieve")
 
     def get_permissions(self):
         if self.action in ["create", "update", "delete"]:
@@ -45,13 +97,11 @@ class PaymentViewSet(ModelViewSet):
     def get_queryset(self):
         department_id = self.kwargs.get("department_pk")
         if self.action == "list":
-            return self.queryset.filter(
-                department=Department.objects.get(pk=department_id)
-            )
+            return self.queryset.filter(department_id=department_id)
         return self.queryset
 
 
-class TransactionViewSet(ModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     http_method_names = ["post", "get"]
@@ -59,6 +109,7 @@ class TransactionViewSet(ModelViewSet):
     filterset_class = TransactionFilter
     ordering_fields = ["created_at"]
     pagination_class = CustomResultsSetPagination
+    replica_actions = ("list", "retrieve", "transaction_stats")
 
     def get_queryset(self):
         if self.action == "list" and self.request.user.is_authenticated:
@@ -82,40 +133,21 @@ class TransactionViewSet(ModelViewSet):
         first_name = serializer.validated_data["first_name"]
         last_name = serializer.validated_data["last_name"]
         email = serializer.validated_data["customer_email"]
-        department = str(Department.objects.get(id=request.data.get("department")).id)
-        payment = str(Payment.objects.get(id=request.data.get("payment")).id)
+        department = Department.objects.get(id=request.data.get("department"))
+        payment = Payment.objects.get(id=request.data.get("payment"))
+        customer_info = {
+            "email": email,
+            "first_name": first_name,
+            "last_name": last_name,
+        }
         try:
-            metadata = dict()
-            customer_info = {
-                "email": email,
-                "first_name": first_name,
-                "last_name": last_name,
-            }
-            paystack_obj = Paystack()
-            customer_code = paystack_obj.create_customer(customer_info)
-            customer_info["customer_code"] = customer_code
-            customer_info["payment_id"] = payment
-            customer_info["department_id"] = department
-            metadata.update(customer_info)
-            amount_due = str(Payment.objects.get(id=payment).amount_due * 100)
-            sub_account = Department.objects.get(id=department).sub_account_code
-            txn_data = {
-                "email": email,
-                "amount": amount_due,
-                "subaccount": sub_account,
-                "bearer": "subaccount",
-                "metadata": metadata,
-                "callback_url": (
-                    "http://localhost:8000/pay/pay/verify/"
-                    if settings.DEBUG
-                    else "https://student-pay.sevalla.app/payment/pay/success/"
-                ),
-            }
-            # Initialize Paystack Transaction
-            authorization_url = paystack_obj.initiate_transaction(txn_data)
-        except Exception as e:
+            # Initialize the transaction with the healthiest available gateway
+            gateway, authorization_url = initialize_transaction(
+                department, payment, customer_info
+            )
+        except GatewayError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        logger.info("Transaction Initiated")
+        logger.info(f"Transaction Initiated via {gateway}")
         return Response(
             {"authorization_url": authorization_url}, status=status.HTTP_200_OK
         )
@@ -138,10 +170,12 @@ class TransactionViewSet(ModelViewSet):
         :return: The `transaction_verify` method returns a Response object containing either a receipt URL
         or an error message based on the outcome of the transaction verification process.
         """
-        reference = request.query_params.get("trxref")
+        # Paystack redirects with `trxref`, Monnify with `paymentReference`
+        reference = request.query_params.get("trxref") or request.query_params.get(
+            "paymentReference"
+        )
         txn = Transaction.objects.filter(txn_reference=reference)
         receipt_data = getReceiptData(reference)
-        filename = f"{receipt_data['receipt_data']['payment_for'].replace(' ', '_')}_{receipt_data['receipt_data']['received_from']}.pdf"
         if "error" in receipt_data:
             logger.error(f"Error verifying Transaction")
             return Response(
@@ -150,20 +184,30 @@ class TransactionViewSet(ModelViewSet):
                     "detail": receipt_data["error"],
                 }
             )
+        filename = f"{receipt_data['receipt_data']['payment_for'].replace(' ', '_')}_{receipt_data['receipt_data']['received_from']}.pdf"
         if txn.exists():
+            existing = txn.first()
             return Response(
-                {"receipt_url": self.get_serializer(txn.first()).data["receipt_url"]},
+                {
+                    "receipt_url": self.get_serializer(existing).data["receipt_url"],
+                    "download_url": receipt_link(existing.receipt_hash),
+                },
                 status=status.HTTP_200_OK,
             )
         else:
             # Verify transaction and get data for saving to db and for creating receipt
-            transaction = Transaction.objects.create(**receipt_data["save_data"])
+            with span("verify.save"):
+                transaction = Transaction.objects.create(**receipt_data["save_data"])
             try:
                 # Receipt generation logic and error handling
-                pdf_stream = generate_receipt(data=receipt_data["receipt_data"])
-                pdf_stream.seek(0)
+                with span("receipt.render"):
+                    # one read-only view of the PDF is shared by the upload and the email
+                    pdf = as_buffer(render_receipt(receipt_data["receipt_data"]))
 
-                receipt_url = upload_receipt(filename, pdf_stream)
+                with span("receipt.upload"):
+                    receipt_url = upload_receipt(filename, pdf)
+                remember_receipt(transaction.receipt_hash, pdf)
+                download_url = receipt_link(transaction.receipt_hash)
                 email_context = {
                     "header": receipt_data["receipt_data"]["header"],
                     "date": receipt_data["receipt_data"]["date"],
@@ -171,14 +215,19 @@ class TransactionViewSet(ModelViewSet):
                     "payment_for": receipt_data["receipt_data"]["payment_for"],
                     "amount": receipt_data["receipt_data"]["amount"],
                 }
+                # in link mode the email carries the download link instead of the PDF
+                by_link = settings.RECEIPT_DELIVERY == "link"
+                if by_link:
+                    email_context["receipt_link"] = download_url
                 try:
                     # sending receipt to customer email
-                    send_receipt_email(
-                        to_email=receipt_data["save_data"]["customer_email"],
-                        context=email_context,
-                        pdf_file=pdf_stream,
-                        filename=filename,
-                    )
+                    with span("receipt.email"):
+                        send_receipt_email(
+                            to_email=receipt_data["save_data"]["customer_email"],
+                            context=email_context,
+                            pdf_file=None if by_link else pdf,
+                            filename=filename,
+                        )
                 except Exception as e:
                     logger.error(f"Failed to trigger email thread: {str(e)}")
                 if isinstance(receipt_url, dict) and "error" in receipt_url:
@@ -193,9 +242,12 @@ class TransactionViewSet(ModelViewSet):
                 logger.info(f"Receipt generated and uploaded: {receipt_url}")
                 transaction.receipt_url = receipt_url
                 transaction.save()
-                return Response({"receipt_url": receipt_url}, status=status.HTTP_200_OK)
+                return Response(
+                    {"receipt_url": receipt_url, "download_url": download_url},
+                    status=status.HTTP_200_OK,
+                )
             except Exception as e:
-                logger.error("Exception in receipt generation/upload:", str(e))
+                logger.error(f"Exception in receipt generation/upload: {str(e)}")
                 return Response(
                     {
                         "error": "Problem encountered creating receipt",
@@ -213,13 +265,18 @@ class TransactionViewSet(ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def transaction_stats(self, request):
-        transactions = self.queryset.filter(department=request.user).order_by(
-            "-created_at"
+        totals = self.queryset.filter(department=request.user).aggregate(
+            total_amount=Sum("amount_paid"), total_transactions=Count("txn_id")
+        )
+        # closed sessions moved out by `archive_transactions` still count towards the totals
+        archived = TransactionArchive.objects.filter(department=request.user).aggregate(
+            total_amount=Sum("total_amount"), total_transactions=Sum("row_count")
+        )
+        total_payments = Payment.objects.filter(department=request.user).count()
+        total_amount = (totals["total_amount"] or 0) + (archived["total_amount"] or 0)
+        total_transactions = totals["total_transactions"] + (
+            archived["total_transactions"] or 0
         )
-        payments = Payment.objects.filter(department=request.user)
-        total_payments = payments.count()
-        total_amount = sum(txn.amount_paid for txn in transactions)
-        total_transactions = transactions.count()
 
         stats = {
             "total_amount": total_amount,
@@ -263,24 +320,11 @@ def generate_receipt_with_reference(request):
     reference = request.query_params.get("reference")
     transaction = Transaction.objects.filter(txn_reference=reference).first()
     if transaction:
-        receipt_data = {
-            "header": transaction.department.dept_name.upper(),
-            "date": transaction.created_at.strftime("%Y-%m-%d"),
-            "received_from": transaction.received_from,
-            "payment_for": transaction.payment.payment_for,
-            "amount_words": num2words(
-                transaction.amount_paid * 100, to="currency", lang="en_NG"
-            ),
-            "amount": transaction.amount_paid,
-            "department_logo": transaction.department.logo_url,
-            "president_signature": transaction.department.president_signature_url,
-            "financial_signature": transaction.department.secretary_signature_url,
-        }
         try:
-            pdf_stream = generate_receipt(data=receipt_data)
-            pdf_stream.seek(0)
+            pdf_stream = render_receipt(receipt_data(transaction))
             filename = f"{transaction.received_from.replace(' ', '_')}_{transaction.created_at.strftime('%Y-%m-%d')}.pdf"
             receipt_url = upload_receipt(filename, pdf_stream)
+            remember_receipt(transaction.receipt_hash, pdf_stream)
             transaction.receipt_url = receipt_url
             transaction.save()
             logger.info(f"Receipt generated and uploaded: {receipt_url}")
@@ -293,9 +337,15 @@ def generate_receipt_with_reference(request):
                     },
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-            return JsonResponse({"receipt_url": receipt_url}, status=200)
+            return JsonResponse(
+                {
+                    "receipt_url": receipt_url,
+                    "download_url": receipt_link(transaction.receipt_hash),
+                },
+                status=200,
+            )
         except Exception as e:
-            logger.error("Error generating receipt:", str(e))
+            logger.error(f"Error generating receipt: {str(e)}")
             return Response(
                 {"error": "Error generating receipt", "detail": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -305,6 +355,7 @@ def generate_receipt_with_reference(request):
     )
 
 
+@replica_read
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def export_transactions_to_csv(request):
@@ -333,7 +384,13 @@ def export_transactions_to_csv(request):
         "created_at",
     )
 
-    if not transactions:
+    include_archived = request.query_params.get("include_archived") == "true"
+    if include_archived:
+        rows = chain(archived_export_rows(request.user), transactions)
+    else:
+        rows = iter(transactions)
+    first = next(rows, None)
+    if first is None:
         return Response(
             {"message": "No transactions found"}, status=status.HTTP_404_NOT_FOUND
         )
@@ -342,12 +399,158 @@ def export_transactions_to_csv(request):
     response["Content-Disposition"] = 'attachment; filename="transactions.csv"'
 
     writer = csv.writer(response)
-    writer.writerow(transactions[0].keys())
-    for transaction in transactions:
+    writer.writerow(first.keys())
+    for transaction in chain([first], rows):
         writer.writerow(transaction.values())
 
     return response
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def create_receipt_bundle(request):
+    """
+    The function `create_receipt_bundle` starts rendering the authenticated department's receipts
+    into one printable PDF, one receipt per page.
+
+    :param request: A POST whose JSON body holds the transaction list filters, e.g.
+    `{"payment": 3}`; only successful transactions have receipts.
+    :return: The new bundle with status 202; poll `receipt_bundle` until its `url` is set.
+    """
+    try:
+        bundle = start_bundle(request.user, dict(request.data))
+    except BundleError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(
+        ReceiptBundleSerializer(bundle).data, status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def receipt_bundle(request, id):
+    bundles = ReceiptBundle.objects.filter(pk=id, department=request.user)
+    # polling ends with "failed" even when nothing is left to resume the bundle
+    expire_abandoned_bundles(bundles)
+    bundle = bundles.first()
+    if bundle is None:
+        return Response(
+            {"detail": "Receipt bundle not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(ReceiptBundleSerializer(bundle).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def download_receipts_zip(request):
+    """
+    The function `download_receipts_zip` streams a ZIP of the authenticated department's stored
+    receipts matching the transaction list filters in the query string.
+
+    :return: An `application/zip` response built while it is sent, or 400 when the filters match
+    nothing or too much.
+    """
+    try:
+        transactions = bundle_queryset(request.user, request.query_params.dict())
+    except BundleError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(
+        stream_zip(transactions), content_type="application/zip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="receipts.zip"'
+    return response
+
+
+# Seconds a served receipt may be reused before revalidating. A receipt can be rendered again
+# under the same link, so caches check back with the ETag rather than keep a copy for good.
+RECEIPT_MAX_AGE = 300
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+@require_safe
+def download_receipt(request, receipt_hash):
+    """
+    The function `download_receipt` serves a receipt PDF by its hash, from the local disk cache or
+    streamed from storage, so clients and emails never need the storage URL. Receipts of archived
+    sessions are looked up in their archive.
+
+    :param request: A GET or HEAD; `?token=` carries the signature when links expire, and a
+    single-range `Range` header gets a 206 with that part of the file.
+    :return: The PDF, inline, with a strong `ETag` taken from the file's content and a short
+    `Cache-Control` lifetime; 403 for an invalid or expired link and 404 for an unknown hash.
+    """
+    try:
+        remaining = check_link(receipt_hash, request.GET.get("token"))
+    except ReceiptLinkError as e:
+        return JsonResponse({"detail": str(e)}, status=403)
+    transaction = Transaction.objects.filter(receipt_hash=receipt_hash).first()
+    if transaction is None:
+        # receipts from archived sessions are rebuilt from their archive
+        transaction = archived_transaction(receipt_hash)
+    if transaction is None:
+        return JsonResponse({"detail": "Receipt not found"}, status=404)
+
+    try:
+        file = open_receipt(transaction)
+    except (requests.RequestException, OSError) as e:
+        logger.error(f"Could not load receipt {receipt_hash}: {e}")
+        return JsonResponse({"detail": "Receipt temporarily unavailable"}, status=502)
+    etag = receipt_etag(file)
+    if remaining is None:
+        cache_control = f"public, max-age={RECEIPT_MAX_AGE}, must-revalidate"
+    else:
+        cache_control = f"private, max-age={min(remaining, RECEIPT_MAX_AGE)}, must-revalidate"
+    if etag in request.headers.get("If-None-Match", ""):
+        file.close()
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+    size = os.fstat(file.fileno()).st_size
+    filename = receipt_filename(transaction)
+
+    requested = request.headers.get("Range")
+    if request.headers.get("If-Range", etag) != etag:
+        # the client's partial copy is of another version; send the whole file
+        requested = None
+    try:
+        part = byte_range(requested, size)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if part is None:
+        response = FileResponse(file, content_type="application/pdf", filename=filename)
+    else:
+        start, end = part
+        response = StreamingHttpResponse(
+            _read_range(file, start, end - start + 1),
+            status=206,
+            content_type="application/pdf",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return response
+
+
+@replica_read
 @api_view(['GET'])
 def verify_receipt(request):
     receipt_hash = request.query_params.get('hash')
@@ -363,4 +566,121 @@ def verify_receipt(request):
             "department": txn.department.dept_name
         })
     except Transaction.DoesNotExist:
+        pass
+    # receipts from archived sessions are verified against the archive index
+    archived = (
+        ArchivedReceipt.objects.filter(receipt_hash=receipt_hash)
+        .select_related("archive__department")
+        .first()
+    )
+    if archived is None:
         return Response({"status": "Invalid"}, status=status.HTTP_404_NOT_FOUND)
+    department = archived.archive.department
+    return Response({
+        "status": "valid",
+        "transaction_id": archived.txn_id,
+        "amount": archived.amount_paid,
+        "date": archived.created_at,
+        "department": department.dept_name if department else None
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """
+    The function `dashboard` returns the department dashboard (headline stats, payment items with
+    collected totals, recent transactions and a daily series) in a single response, replacing the
+    separate stats, transaction list and payment list calls.
+
+    :param request: An authenticated request; `?days=` sets the length of the daily series
+    (default 30, at most 90).
+    :return: A Response with `stats`, `payments`, `recent_transactions` and `daily`.
+    """
+    try:
+        days = min(max(int(request.query_params.get("days", DEFAULT_DAYS)), 1), MAX_DAYS)
+    except ValueError:
+        return Response(
+            {"detail": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(get_dashboard(request.user, days), status=status.HTTP_200_OK)
+
+
+CATALOG_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+
+
+@require_GET
+def public_catalog(request):
+    """
+    The function `public_catalog` serves the verified departments and their payment items to the
+    student checkout page as one precomputed JSON document.
+
+    :param request: An anonymous GET; a matching `If-None-Match` gets a 304 with no body.
+    :return: The catalog with a strong `ETag` and a short shared `Cache-Control` lifetime, so
+    browsers and CDNs revalidate cheaply instead of downloading it again.
+    """
+    body, etag = get_catalog()
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = CATALOG_CACHE_CONTROL
+    return response
+
+
+def authenticate_stream(request):
+    """
+    Resolves the department for an event stream request. Browsers' `EventSource` cannot send an
+    `Authorization` header, so the access token may also be passed as `?token=`.
+    """
+    authentication = CachedJWTAuthentication()
+    raw_token = request.GET.get("token")
+    try:
+        if raw_token:
+            return authentication.get_user(
+                authentication.get_validated_token(raw_token)
+            )
+        result = authentication.authenticate(request)
+    except (InvalidToken, TokenError):
+        return None
+    return result[0] if result else None
+
+
+@require_GET
+def department_events(request):
+    """
+    The function `department_events` streams the authenticated department's new transactions and
+    updated totals as server-sent events, replacing dashboard polling of the list and stats.
+
+    :param request: A GET authenticated with a bearer token or `?token=`; a reconnecting
+    `EventSource` sends `Last-Event-ID` to resume where it left off.
+    :return: A `text/event-stream` response, closed after `SSE_MAX_DURATION` seconds, or 503 with
+    `Retry-After` when this process already serves `SSE_MAX_STREAMS` streams; the dashboard
+    polls the list and stats until a retry succeeds.
+    """
+    department = authenticate_stream(request)
+    if department is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+        "last_event_id"
+    )
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    try:
+        events = open_stream(department.pk, last_event_id)
+    except StreamLimitReached:
+        response = JsonResponse(
+            {"detail": "Too many open event streams; retry shortly."}, status=503
+        )
+        response["Retry-After"] = math.ceil(settings.SSE_RETRY_MS / 1000)
+        return response
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # stop nginx-style proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,46 +1,118 @@
 from django.conf import settings
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from utils.lazy import lazy, get
+from utils.metrics import outbound
+import logging
+from typing import TYPE_CHECKING
 import os
 from pathlib import Path
+from collections import OrderedDict
 import io
+import threading
+import time
 import requests
-import qrcode
 
+if TYPE_CHECKING:
+    from reportlab.lib.utils import ImageReader
+
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
 FONT_PATH = os.path.join(BASE_DIR, "DejaVuSans.ttf")
 SCHOOL_LOGO_PATH = os.path.join(BASE_DIR, "school_logo.png")
 
-if not os.path.exists(FONT_PATH):
-    raise FileNotFoundError(f"Font file not found at: {FONT_PATH}")
-if not os.path.exists(SCHOOL_LOGO_PATH):
-    raise FileNotFoundError(f"School logo file not found at: {SCHOOL_LOGO_PATH}")
-
-pdfmetrics.registerFont(TTFont("DejaVuSans", FONT_PATH))
-
-# Receipt size
-RECEIPT_WIDTH = 6.75 * inch
-RECEIPT_HEIGHT = 3.375 * inch
+# Receipt size (reportlab units are points, 72 to the inch)
+INCH = 72.0
+RECEIPT_WIDTH = 6.75 * INCH
+RECEIPT_HEIGHT = 3.375 * INCH
 RECEIPT_SIZE = (RECEIPT_WIDTH, RECEIPT_HEIGHT)
-
-
-def load_image(source) -> ImageReader | None:
-    """Load image from URL or local file into ImageReader."""
+# Boxes the department logo and the signatures are drawn into, (width, height) in points
+LOGO_BOX = (40, 40)
+SIGNATURE_BOX = (60, 25)
+# Logos and signatures kept between receipts, by URL or path. Re-uploads keep their URL, so
+# entries expire.
+IMAGE_CACHE_SIZE = 128
+IMAGE_CACHE_SECONDS = 300
+
+_image_cache = OrderedDict()
+_image_cache_lock = threading.Lock()
+
+
+@lazy("receipt_fonts", fork_safe=True)
+def _register_fonts():
+    """
+    Checks the bundled receipt assets and registers the DejaVuSans font with reportlab. Runs once
+    per process, the first time a receipt is rendered.
+    """
+    if not os.path.exists(FONT_PATH):
+        raise FileNotFoundError(f"Font file not found at: {FONT_PATH}")
+    if not os.path.exists(SCHOOL_LOGO_PATH):
+        raise FileNotFoundError(f"School logo file not found at: {SCHOOL_LOGO_PATH}")
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont("DejaVuSans", FONT_PATH))
+    return True
+
+
+def fetch_image(source) -> "bytes | None":
+    """Read an image from a URL or a local file."""
     if not isinstance(source, str) or not source.strip():
         return None
     try:
         if source.startswith(("http://", "https://")):
-            response = requests.get(source, timeout=5)
+            with outbound("receipt.load_image"):
+                response = requests.get(source, timeout=5)
             if response.status_code == 200:
-                return ImageReader(io.BytesIO(response.content))
+                return response.content
         elif os.path.exists(source):
-            return ImageReader(source)
+            with open(source, "rb") as f:
+                return f.read()
+    except Exception as e:
+        logger.warning(f"Error loading image: {e}")
+    return None
+
+
+def remember_image(source, content):
+    with _image_cache_lock:
+        _image_cache[source] = (content, time.monotonic() + IMAGE_CACHE_SECONDS)
+        _image_cache.move_to_end(source)
+        while len(_image_cache) > IMAGE_CACHE_SIZE:
+            _image_cache.popitem(last=False)
+
+
+def image_bytes(source) -> "bytes | None":
+    """
+    Returns the content of an image, fetching it at most once every `IMAGE_CACHE_SECONDS`. Images
+    larger than the receipt draws them are downsampled before being cached. Failed fetches are not
+    cached.
+    """
+    with _image_cache_lock:
+        cached = _image_cache.get(source)
+        if cached and cached[1] > time.monotonic():
+            _image_cache.move_to_end(source)
+            return cached[0]
+    from utils.images import fit_for_receipt
+
+    content = fetch_image(source)
+    if content is not None:
+        content = fit_for_receipt(content)
+        remember_image(source, content)
+    return content
+
+
+def load_image(source) -> "ImageReader | None":
+    """Load image from URL or local file into ImageReader."""
+    from reportlab.lib.utils import ImageReader
+
+    content = image_bytes(source)
+    if content is None:
+        return None
+    try:
+        return ImageReader(io.BytesIO(content))
     except Exception as e:
-        print(f"Error loading image: {e}")
+        logger.warning(f"Error loading image: {e}")
     return None
 
 
@@ -85,19 +157,41 @@ def _get_verify_url(receipt_hash: str) -> str:
     return f"{base.rstrip('/')}/payment/pay/verify-receipt/?hash={receipt_hash}"
 
 
-def generate_receipt(data: dict) -> io.BytesIO:
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=RECEIPT_SIZE)
+def _cached_image(images, source):
+    """
+    Decodes each logo or signature once per document. reportlab embeds an image once however many
+    pages draw it.
+    """
+    if images is None:
+        return load_image(source)
+    if source not in images:
+        images[source] = load_image(source)
+    return images[source]
+
+
+def draw_receipt(c, data: dict, images=None):
+    """
+    The function `draw_receipt` draws one receipt on the current page of the canvas `c` and ends
+    the page.
+
+    :param c: A reportlab canvas of `RECEIPT_SIZE` pages.
+    :param data: The receipt fields, as built by `getReceiptData`.
+    :param images: A dictionary shared by all the receipts of one document, caching the loaded
+    images by URL or path.
+    """
+    from reportlab.lib.utils import ImageReader
+    import qrcode
+
     width, height = RECEIPT_SIZE
 
     left_margin = 30
     right_margin = width - 30
 
     # === LOGOS ===
-    logo_width, logo_height = 40, 40
+    logo_width, logo_height = LOGO_BOX
     logo_y = height - logo_height - 5
 
-    school_logo = load_image(SCHOOL_LOGO_PATH)
+    school_logo = _cached_image(images, SCHOOL_LOGO_PATH)
     if school_logo:
         c.drawImage(
             school_logo,
@@ -108,7 +202,7 @@ def generate_receipt(data: dict) -> io.BytesIO:
             preserveAspectRatio=True,
         )
 
-    dept_logo = load_image(data.get("department_logo"))
+    dept_logo = _cached_image(images, data.get("department_logo"))
     if dept_logo:
         c.drawImage(
             dept_logo,
@@ -117,6 +211,7 @@ def generate_receipt(data: dict) -> io.BytesIO:
             width=logo_width,
             height=logo_height,
             preserveAspectRatio=True,
+            mask="auto",
         )
 
     # === HEADER (bounded between logos, dynamically scaled) ===
@@ -173,8 +268,9 @@ def generate_receipt(data: dict) -> io.BytesIO:
     line_y -= spacing * 1.5
 
     # === SIGNATURES ===
-    signature_y, signature_height, signature_width = 40, 25, 60
-    pres_sig = load_image(data.get("president_signature"))
+    signature_y = 40
+    signature_width, signature_height = SIGNATURE_BOX
+    pres_sig = _cached_image(images, data.get("president_signature"))
     if pres_sig:
         c.drawImage(
             pres_sig,
@@ -183,11 +279,12 @@ def generate_receipt(data: dict) -> io.BytesIO:
             width=signature_width,
             height=signature_height,
             preserveAspectRatio=True,
+            mask="auto",
         )
     c.line(left_margin, signature_y, left_margin + 80, signature_y)
     c.drawString(left_margin, signature_y - 12, "President")
 
-    fin_sig = load_image(data.get("financial_signature"))
+    fin_sig = _cached_image(images, data.get("financial_signature"))
     if fin_sig:
         c.drawImage(
             fin_sig,
@@ -196,6 +293,7 @@ def generate_receipt(data: dict) -> io.BytesIO:
             width=signature_width,
             height=signature_height,
             preserveAspectRatio=True,
+            mask="auto",
         )
     c.line(right_margin - 80, signature_y, right_margin, signature_y)
     c.drawRightString(right_margin, signature_y - 12, "Financial Secretary")
@@ -252,6 +350,39 @@ def generate_receipt(data: dict) -> io.BytesIO:
         c.restoreState()
 
     c.showPage()
+
+
+def generate_receipts(receipts, buffer=None) -> io.BytesIO:
+    """
+    The function `generate_receipts` renders any number of receipts into one PDF, one per page, in
+    a single canvas pass. The font and every repeated logo or signature are embedded once for the
+    whole document rather than once per receipt, the font only with the glyphs the document uses,
+    and page content is always Flate-compressed.
+
+    :param receipts: An iterable of receipt data dictionaries, see `draw_receipt`.
+    :param buffer: A writable binary file to render into. When not given, the PDF is returned in a
+    `BytesIO` that shares reportlab's output rather than copying it, see `utils.buffers.as_buffer`.
+    :return: `buffer`, rewound when it is seekable.
+    """
+    from reportlab import rl_config
+    from reportlab.pdfgen import canvas
+
+    get("receipt_fonts")
+    # Write streams as raw binary rather than ASCII85 text, which is a quarter larger. reportlab
+    # only has this as a process-wide setting and receipts are the only PDFs this app renders, so
+    # it is set here, next to the canvas it is meant for, rather than as a side effect of loading.
+    rl_config.useA85 = 0
+    c = canvas.Canvas(buffer, pagesize=RECEIPT_SIZE, pageCompression=1)
+    images = {}
+    for data in receipts:
+        draw_receipt(c, data, images)
+    if buffer is None:
+        return io.BytesIO(c.getpdfdata())
     c.save()
-    buffer.seek(0)
+    if buffer.seekable():
+        buffer.seek(0)
     return buffer
+
+
+def generate_receipt(data: dict) -> io.BytesIO:
+    return generate_receipts([data])
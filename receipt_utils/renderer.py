@@ -0,0 +1,247 @@
+"""
+A receipt rendering service shared by the web workers.
+
+`python manage.py run_receipt_renderer` listens on the local socket `RECEIPT_RENDERER_ADDRESS` and
+renders receipts in `RECEIPT_RENDERER_WORKERS` long-lived processes. Each process registers the
+font and loads the school logo, plus the logos and signatures of the most recently paid-to
+departments, once when it starts. Web workers send receipt data with `render_receipt` and get the
+PDF back, so rendering no longer competes with request handling for their CPU.
+
+The service holds at most `RECEIPT_RENDERER_QUEUE` receipts in flight and answers "busy" beyond
+that. The caller then renders in-process, as it also does when no service is configured, when it
+is not running, or when it takes longer than `RECEIPT_RENDERER_TIMEOUT` seconds.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import AuthenticationError, get_context
+from multiprocessing.connection import Client, Listener
+from django.conf import settings
+from django.db.models import F
+from utils.lazy import get
+from .create_receipt import (
+    SCHOOL_LOGO_PATH,
+    generate_receipt,
+    image_bytes,
+    remember_image,
+)
+
+logger = logging.getLogger(__name__)
+
+# Uploaded images a department's receipts draw
+DEPARTMENT_ASSETS = ("logo", "president_signature", "secretary_signature")
+
+
+class RendererUnavailable(Exception):
+    pass
+
+
+def authkey():
+    return hashlib.sha256(f"receipt-renderer:{settings.SECRET_KEY}".encode()).digest()
+
+
+# === Service side ===
+
+
+def warm_worker(preload):
+    """
+    Runs once in each rendering process: sets Django up (processes are spawned, not forked),
+    registers the font and fills the image cache.
+
+    :param preload: `(source, content)` pairs of department images fetched by the service.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    import qrcode  # noqa: F401
+    from reportlab.pdfgen import canvas  # noqa: F401
+
+    get("receipt_fonts")
+    image_bytes(SCHOOL_LOGO_PATH)
+    for source, content in preload:
+        remember_image(source, content)
+
+
+def render(data):
+    return generate_receipt(data).getvalue()
+
+
+def preload_assets(limit):
+    """
+    The function `preload_assets` fetches the receipt images of the `limit` departments paid most
+    recently, for the rendering processes to start with.
+
+    :return: A list of `(source, content)` pairs.
+    """
+    from accounts.models import Department
+
+    if limit <= 0:
+        return []
+    departments = Department.objects.filter(is_verified=True).order_by(
+        F("last_payment_at").desc(nulls_last=True)
+    )[:limit]
+    preload = []
+    for department in departments:
+        for field in DEPARTMENT_ASSETS:
+            source = department.asset_url(field)
+            content = image_bytes(source) if source else None
+            if content is not None:
+                preload.append((source, content))
+    return preload
+
+
+class RendererService:
+    """
+    Accepts connections on a Unix socket and renders each request in the process pool. A request
+    is `("render", data)` and is answered with `("ok", pdf)`, `("busy", None)` or
+    `("error", message)`.
+    """
+
+    def __init__(self, address, workers, queue_size, preload=(), executor=None):
+        self.address = address
+        self.workers = workers
+        self.preload = list(preload)
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.lock = threading.Lock()
+        self.executor = executor or self.create_pool()
+        if os.path.exists(address):
+            # left behind by a service that did not shut down cleanly
+            os.unlink(address)
+        self.listener = Listener(address, family="AF_UNIX", authkey=authkey())
+        self.closed = threading.Event()
+
+    def create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context("spawn"),
+            initializer=warm_worker,
+            initargs=(self.preload,),
+        )
+
+    def render(self, data):
+        executor = self.executor
+        try:
+            return executor.submit(render, data).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.executor is executor:
+                    logger.error("Receipt rendering process died; restarting the pool")
+                    self.executor = self.create_pool()
+            raise
+
+    def serve_forever(self):
+        while not self.closed.is_set():
+            try:
+                connection = self.listener.accept()
+            except AuthenticationError as e:
+                logger.warning(f"Rejected receipt renderer client: {e}")
+                continue
+            except OSError:
+                if self.closed.is_set():
+                    return
+                raise
+            threading.Thread(
+                target=self.handle, args=(connection,), daemon=True
+            ).start()
+
+    def serve_in_background(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    _, data = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if not self.slots.acquire(blocking=False):
+                    connection.send(("busy", None))
+                    continue
+                try:
+                    connection.send(("ok", self.render(data)))
+                except Exception as e:
+                    logger.error(f"Rendering a receipt failed: {e}")
+                    connection.send(("error", str(e)))
+                finally:
+                    self.slots.release()
+
+    def close(self):
+        self.closed.set()
+        self.listener.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# === Client side ===
+
+_local = threading.local()
+
+
+def _connection(address):
+    # one connection per thread, never carried over into a forked child
+    connection = getattr(_local, "connection", None)
+    if connection is not None and _local.pid == os.getpid() and not connection.closed:
+        return connection
+    connection = Client(address, family="AF_UNIX", authkey=authkey())
+    _local.connection, _local.pid = connection, os.getpid()
+    return connection
+
+
+def _drop_connection():
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except OSError:
+            pass
+
+
+def render_remotely(address, data, timeout):
+    """
+    Renders a receipt in the service at `address`.
+
+    :raises RendererUnavailable: When the service is unreachable, busy, too slow or failed.
+    """
+    try:
+        connection = _connection(address)
+        connection.send(("render", data))
+        if not connection.poll(timeout):
+            # the late answer would be read as the reply to the next request
+            _drop_connection()
+            raise RendererUnavailable(f"no answer within {timeout}s")
+        outcome, result = connection.recv()
+    except (OSError, EOFError, AuthenticationError) as e:
+        _drop_connection()
+        raise RendererUnavailable(str(e)) from e
+    if outcome != "ok":
+        raise RendererUnavailable(outcome if result is None else f"{outcome}: {result}")
+    return result
+
+
+def render_receipt(data):
+    """
+    The function `render_receipt` renders a receipt in the rendering service when one is
+    configured and able to take it, and in this process otherwise.
+
+    :param data: The receipt fields, see `draw_receipt`.
+    :return: The PDF in a `BytesIO`, as `generate_receipt` returns it.
+    """
+    address = settings.RECEIPT_RENDERER_ADDRESS
+    if address:
+        try:
+            return io.BytesIO(
+                render_remotely(address, data, settings.RECEIPT_RENDERER_TIMEOUT)
+            )
+        except RendererUnavailable as e:
+            logger.warning(
+                f"Rendering the receipt in-process, renderer unavailable: {e}"
+            )
+    return generate_receipt(data)
@@ -1,5 +1,7 @@
-from utils.supabase_util import supabase
-from decouple import config
+from utils.buffers import BufferReader
+from utils.supabase_util import get_supabase
+from utils.metrics import outbound
+from django.conf import settings
 import logging
 import requests
 
@@ -15,24 +17,23 @@ def upload_receipt(filename, pdf_stream):
     :param filename: The `filename` parameter in the `upload_receipt` function is a string that
     represents the name of the file being uploaded. It is used to specify the name under which the file
     will be stored in the Supabase storage
-    :param pdf_stream: The `pdf_stream` parameter in the `upload_receipt` function is expected to be a
-    file stream object containing the PDF data that you want to upload. This stream object should allow
-    reading the binary data of the PDF file. You can pass an open file stream object in binary read mode
-    as the `
+    :param pdf_stream: The PDF, as the `BytesIO` returned by `generate_receipt` or a buffer from
+    `utils.buffers.as_buffer`. It is sent straight from that memory rather than read into a copy.
     :return: The `upload_receipt` function returns either the URL of the uploaded receipt if successful,
     or a dictionary with error details if the receipt URL is not found.
     """
     try:
         headers = {
-            "apikey": config("SUPABASE_KEY"),
-            "Authorization": f"Bearer {config('SUPABASE_KEY')}",
+            "apikey": settings.SUPABASE_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_KEY}",
             "Content-Type": "application/pdf",
             "x-upsert": "true",
         }
-        url = f"{config('SUPABASE_URL')}/storage/v1/object/receipts/{filename}"
+        url = f"{settings.SUPABASE_URL}/storage/v1/object/receipts/{filename}"
 
-        response = requests.post(url, headers=headers, data=pdf_stream.read())
-        response.raise_for_status()
+        with outbound("supabase.upload_receipt"):
+            response = requests.post(url, headers=headers, data=BufferReader(pdf_stream))
+            response.raise_for_status()
 
         logging.info(f"Successfully uploaded {filename} to Supabase.")
 
@@ -42,7 +43,7 @@ def upload_receipt(filename, pdf_stream):
             logger.error(f"Response text: {e.response.text}")
         raise
 
-    receipt_url = supabase.storage.from_("receipts").get_public_url(filename)
+    receipt_url = get_supabase().storage.from_("receipts").get_public_url(filename)
     if receipt_url:
         return receipt_url
     else:
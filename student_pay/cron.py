@@ -11,3 +11,30 @@ def keep_alive():
         logger.info(f"Keep-alive ping status: {resp.status_code}")
     except Exception as e:
         logger.error(f"Keep-alive failed: {e}")
+
+
+def prune_expired_tokens():
+    from accounts.tokens import prune_expired_tokens
+
+    try:
+        prune_expired_tokens()
+    except Exception as e:
+        logger.error(f"Pruning expired tokens failed: {e}")
+
+
+def prune_department_events():
+    from pay.events import prune_events
+
+    try:
+        prune_events()
+    except Exception as e:
+        logger.error(f"Pruning department events failed: {e}")
+
+
+def resume_background_jobs():
+    from django.core.management import call_command
+
+    try:
+        call_command("resume_background_jobs")
+    except Exception as e:
+        logger.error(f"Resuming background jobs failed: {e}")
@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from datetime import timedelta
 from pathlib import Path
-from decouple import config
+import tempfile
+from decouple import config, Csv
 from urllib.parse import urlparse, parse_qsl
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -62,8 +63,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utils.metrics.MetricsMiddleware",
+    "utils.db_router.ReplicaMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # turns matching validators on cached (cache_page) responses into 304s
+    "django.middleware.http.ConditionalGetMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -99,7 +104,7 @@ tmpPostgres = urlparse(config("DATABASE_URL"))
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'utils.postgresql',
         'NAME': tmpPostgres.path.replace('/', ''),
         'USER': tmpPostgres.username,
         'PASSWORD': tmpPostgres.password,
@@ -109,6 +114,63 @@ DATABASES = {
     }
 }
 
+# Optional streaming replica for read-heavy endpoints (see utils/db_router.py)
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+if DATABASE_REPLICA_URL:
+    tmpReplica = urlparse(DATABASE_REPLICA_URL)
+    DATABASES["replica"] = {
+        'ENGINE': 'utils.postgresql',
+        'NAME': tmpReplica.path.replace('/', ''),
+        'USER': tmpReplica.username,
+        'PASSWORD': tmpReplica.password,
+        'HOST': tmpReplica.hostname,
+        'PORT': tmpReplica.port or 5432,
+        'OPTIONS': dict(parse_qsl(tmpReplica.query)),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Connections are kept between requests (one per worker thread) and health-checked before reuse,
+# instead of opening a new one for every request. Setting DB_POOL_MAX_SIZE switches to a shared
+# psycopg connection pool per worker instead (requires psycopg[pool]); the pool is then sized for
+# the gunicorn threads and DB_POOL_TIMEOUT bounds the wait for a free connection.
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=300, cast=int)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", default=0, cast=int)
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=2, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=10, cast=int)
+for database in DATABASES.values():
+    database['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL_MAX_SIZE:
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
+# Requests running more queries than this are logged as warnings in the per-request database
+# report (the `studentpay.db` logger)
+DB_QUERY_BUDGET = config("DB_QUERY_BUDGET", default=30, cast=int)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "studentpay.db": {
+            "handlers": ["console"],
+            "level": config("DB_REPORT_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+DATABASE_ROUTERS = ["utils.db_router.ReplicaRouter"]
+# Seconds a department (or browser) keeps reading from the primary after it writes, covering
+# replication lag so it always sees its own changes
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=15, cast=int)
+
 if DEBUG:
     DATABASES = {
         "default": {
@@ -178,7 +240,7 @@ AUTH_USER_MODEL = "accounts.Department"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
@@ -189,8 +251,13 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=1000),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "UPDATE_LAST_LOGIN": True,
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.DepartmentTokenRefreshSerializer",
 }
 
+# Seconds an authenticated department is served from the cache before being reloaded; saving the
+# department drops it straight away
+PRINCIPAL_CACHE_TIMEOUT = config("PRINCIPAL_CACHE_TIMEOUT", default=300, cast=int)
+
 STORAGES = {
     'default': {
         'BACKEND': 'django.core.files.storage.FileSystemStorage',
@@ -200,18 +267,110 @@ STORAGES = {
     },
 }
 
-EMAIL_BACKEND = "anymail.backends.mailjet.EmailBackend"
+# Third-party API endpoints. Setting STUB_SERVICES_URL points all of them at the offline
+# stand-in started with `python manage.py run_stub_services`.
+STUB_SERVICES_URL = config("STUB_SERVICES_URL", default="").rstrip("/")
+
+PAYSTACK_BASE_URL = "https://api.paystack.co"
+PAYSTACK_SECRET_KEY = config("PAYSTACK_SECRET_KEY", default="")
+MONNIFY_BASE_URL = config("MONNIFY_BASE_URL", default="https://sandbox.monnify.com")
+SUPABASE_URL = config("SUPABASE_URL", default="")
+SUPABASE_KEY = config("SUPABASE_KEY", default="")
+MAILJET_API_URL = "https://api.mailjet.com/v3.1/"
+
+if STUB_SERVICES_URL:
+    PAYSTACK_BASE_URL = f"{STUB_SERVICES_URL}/paystack"
+    MONNIFY_BASE_URL = f"{STUB_SERVICES_URL}/monnify"
+    SUPABASE_URL = f"{STUB_SERVICES_URL}/supabase"
+    # the Supabase client insists on a JWT-shaped key
+    SUPABASE_KEY = "stub.supabase.key"
+    MAILJET_API_URL = f"{STUB_SERVICES_URL}/mailjet/v3.1/"
+
+# anymail's Mailjet backend, sending the receipt attachment without encoding it in memory
+EMAIL_BACKEND = "utils.email.EmailBackend"
 
 ANYMAIL = {
     "MAILJET_API_KEY": config('MAILJET_API_KEY'),
     "MAILJET_SECRET_KEY": config('MAILJET_SECRET_KEY'),
+    "MAILJET_API_URL": MAILJET_API_URL,
 }
 
 MAILJET_SENDER_EMAIL = config("MAILJET_SENDER_EMAIL")
 DEFAULT_FROM_EMAIL = MAILJET_SENDER_EMAIL
 
+# Payment gateways in order of preference; later ones take over when earlier ones are unhealthy
+PAYMENT_GATEWAYS = config("PAYMENT_GATEWAYS", default="paystack,monnify", cast=Csv())
+GATEWAY_HEALTH_WINDOW = config("GATEWAY_HEALTH_WINDOW", default=60, cast=int)
+GATEWAY_MIN_CALLS = config("GATEWAY_MIN_CALLS", default=5, cast=int)
+GATEWAY_MAX_ERROR_RATE = config("GATEWAY_MAX_ERROR_RATE", default=0.5, cast=float)
+GATEWAY_MAX_LATENCY = config("GATEWAY_MAX_LATENCY", default=5.0, cast=float)
+
+# Threads per process running background jobs (see utils/background.py), and departments an
+# approval job provisions at once
+BACKGROUND_WORKERS = config("BACKGROUND_WORKERS", default=2, cast=int)
+APPROVAL_WORKERS = config("APPROVAL_WORKERS", default=8, cast=int)
+# Seconds a pending or running background job may go without saving progress before
+# `resume_background_jobs` treats its process as gone and picks it up
+BACKGROUND_JOB_STALE_AFTER = config("BACKGROUND_JOB_STALE_AFTER", default=900, cast=int)
+# Local socket of the receipt rendering service (`manage.py run_receipt_renderer`, see
+# receipt_utils/renderer.py). Receipts are rendered in-process when it is empty or the service
+# cannot take them.
+RECEIPT_RENDERER_ADDRESS = config("RECEIPT_RENDERER_ADDRESS", default="")
+RECEIPT_RENDERER_WORKERS = config("RECEIPT_RENDERER_WORKERS", default=2, cast=int)
+# Receipts the service holds at once before answering "busy"
+RECEIPT_RENDERER_QUEUE = config("RECEIPT_RENDERER_QUEUE", default=8, cast=int)
+RECEIPT_RENDERER_TIMEOUT = config("RECEIPT_RENDERER_TIMEOUT", default=10, cast=float)
+# Departments whose logos and signatures the rendering processes load when they start
+RECEIPT_RENDERER_PRELOAD = config("RECEIPT_RENDERER_PRELOAD", default=50, cast=int)
+# Most receipts one ZIP download or printable PDF bundle may hold (see pay/bundles.py)
+RECEIPT_BUNDLE_MAX_RECEIPTS = config("RECEIPT_BUNDLE_MAX_RECEIPTS", default=2000, cast=int)
+# Seconds after which a bundle that is still not rendered is marked failed; longer than
+# BACKGROUND_JOB_STALE_AFTER plus the cron interval, so a lost bundle gets one resume first
+RECEIPT_BUNDLE_MAX_AGE = config("RECEIPT_BUNDLE_MAX_AGE", default=3600, cast=int)
+# "attachment" emails receipts as PDFs, "link" emails a link to the download endpoint instead
+# (see pay/delivery.py)
+RECEIPT_DELIVERY = config("RECEIPT_DELIVERY", default="attachment")
+# Seconds a receipt download link stays valid; 0 gives unsigned links that never expire
+RECEIPT_LINK_MAX_AGE = config("RECEIPT_LINK_MAX_AGE", default=0, cast=int)
+# Local disk cache of downloaded receipts, least recently served evicted first; 0 disables it
+RECEIPT_CACHE_DIR = config(
+    "RECEIPT_CACHE_DIR", default=str(Path(tempfile.gettempdir()) / "student-pay-receipts")
+)
+RECEIPT_CACHE_MAX_BYTES = config(
+    "RECEIPT_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int
+)
+
+# Seconds between each worker publishing its request metrics to the shared cache
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=10, cast=int)
+
+# Academic sessions run from this month to the month before it the following year; closed
+# sessions can be moved out of the transaction table with `manage.py archive_transactions`
+ACADEMIC_SESSION_START_MONTH = config("ACADEMIC_SESSION_START_MONTH", default=9, cast=int)
+TRANSACTION_ARCHIVE_PREFIX = config(
+    "TRANSACTION_ARCHIVE_PREFIX", default="archive/transactions"
+)
+# Archives hold payer names and emails, so this Supabase bucket must be private. They are never
+# written to MEDIA_ROOT, which does not survive a deploy.
+TRANSACTION_ARCHIVE_BUCKET = config("TRANSACTION_ARCHIVE_BUCKET", default="archives")
+
+# Department event stream (/pay/events/): connections are recycled after SSE_MAX_DURATION
+# seconds and the browser reconnects after SSE_RETRY_MS with its Last-Event-ID
+SSE_MAX_DURATION = config("SSE_MAX_DURATION", default=55, cast=int)
+SSE_POLL_INTERVAL = config("SSE_POLL_INTERVAL", default=1.0, cast=float)
+SSE_RETRY_MS = config("SSE_RETRY_MS", default=3000, cast=int)
+# Streams one process serves at once; each holds a gunicorn thread for up to SSE_MAX_DURATION, so
+# keep this well below `--threads` (8 in nixpacks.toml) and add worker processes for more
+# dashboards. Beyond it /pay/events/ answers 503 with Retry-After.
+SSE_MAX_STREAMS = config("SSE_MAX_STREAMS", default=2, cast=int)
+DEPARTMENT_EVENT_RETENTION_HOURS = config(
+    "DEPARTMENT_EVENT_RETENTION_HOURS", default=24, cast=int
+)
+
 CRONJOBS = [
-    ('*/14 * * * *', 'student_pay.cron.keep_alive')
+    ('*/14 * * * *', 'student_pay.cron.keep_alive'),
+    ('0 * * * *', 'student_pay.cron.prune_department_events'),
+    ('30 3 * * *', 'student_pay.cron.prune_expired_tokens'),
+    ('*/10 * * * *', 'student_pay.cron.resume_background_jobs'),
 ]
 
 JAZZMIN_SETTINGS = {
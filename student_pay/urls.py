@@ -19,6 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.http import HttpResponse, HttpResponseForbidden
+from utils.metrics import metrics, render_prometheus
 import logging
 import os
 
@@ -26,18 +27,34 @@ import os
 logger = logging.getLogger(__name__)
 
 
+def has_cron_token(request):
+    token = os.getenv("CRON_SECRET_TOKEN")
+    return bool(token) and request.headers.get("X-Cron-Token") == token
+
+
 def ping_site(request):
-    if request.headers.get("X-Cron-Token") != os.getenv("CRON_SECRET_TOKEN"):
+    if not has_cron_token(request):
         logger.warning(f"Unauthorized ping attempt from {request.META.get('REMOTE_ADDR')}")
         return HttpResponseForbidden("Forbidden")
     logger.info("Ping successful")
     return HttpResponse("Hello World")
 
 
+def metrics_view(request):
+    if not has_cron_token(request):
+        logger.warning(f"Unauthorized metrics scrape from {request.META.get('REMOTE_ADDR')}")
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(
+        render_prometheus(metrics.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("accounts.urls")),
     path("pay/", include("pay.urls")),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("ping/", ping_site, name="ping_site"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,38 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from utils.lazy import get, lazy
+
+
+logger = logging.getLogger(__name__)
+
+
+@lazy("background_executor")
+def _create_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="background"
+    )
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    The function `run_in_background` runs `func(*args, **kwargs)` on this process's background
+    thread pool once the current database transaction commits, so the work sees the rows the
+    request created and is skipped if the request rolls back.
+
+    There is no broker: work still queued when the process exits is lost, so tasks must record
+    their own progress and be safe to run again, and are picked up again by the
+    `resume_background_jobs` command.
+    """
+
+    def task():
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception(f"Background task {func.__name__} failed")
+        finally:
+            # connections are per thread; don't leave this one open until the pool exits
+            connections.close_all()
+
+    transaction.on_commit(lambda: get("background_executor").submit(task))
@@ -0,0 +1,134 @@
+"""
+Passing one rendered file (a receipt PDF) to storage and email without copying it.
+
+`as_buffer` gives a read-only `memoryview` over the file, and every consumer works from that
+view. `BufferReader` lets `requests` send the view in blocks. `StreamedBody` sends a JSON document
+whose attachment is base64-encoded one chunk at a time while it is being sent. Neither ever holds a
+second full copy of the file, or of its base64 text.
+"""
+
+import base64
+import io
+import json
+import uuid
+
+
+# Input bytes per base64 chunk; a multiple of 3, so the encoded chunks concatenate cleanly
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+# Stands for the attachment in a document passed to `json_with_attachment`
+ATTACHMENT = object()
+_MARKER = f"attachment-{uuid.uuid4().hex}"
+
+
+def as_buffer(data):
+    """
+    The function `as_buffer` returns a read-only `memoryview` over `data` without copying it.
+
+    :param data: `bytes`, a `memoryview`, or a `BytesIO` such as the one `generate_receipt` returns.
+    A `BytesIO` created from a `bytes` object shares it, so reading it back is free; one that was
+    written to piecemeal is copied once here.
+    """
+    if isinstance(data, io.BytesIO):
+        data = data.getvalue()
+    return memoryview(data).toreadonly()
+
+
+def as_bytes(data):
+    """
+    The function `as_bytes` returns the `bytes` object behind `data`, copying only when `data` is
+    not backed by one. Use it where the content must be picklable, e.g. email attachments.
+    """
+    view = as_buffer(data)
+    if isinstance(view.obj, bytes) and len(view.obj) == view.nbytes:
+        return view.obj
+    return view.tobytes()
+
+
+def base64_length(size):
+    return 4 * ((size + 2) // 3)
+
+
+def iter_base64(buffer, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    Yields the base64 encoding of `buffer` in pieces, encoding `chunk_size` bytes at a time.
+    """
+    for start in range(0, len(buffer), chunk_size):
+        yield base64.b64encode(buffer[start : start + chunk_size])
+
+
+class StreamedBody(io.RawIOBase):
+    """
+    A read-only file over `parts`, each a bytes-like object or an iterable of bytes with its total
+    length, i.e. `(chunks, length)`. The length is known up front, so `requests` sends a
+    `Content-Length` rather than a chunked body.
+    """
+
+    def __init__(self, parts):
+        self.length = 0
+        self.position = 0
+        self.chunks = self._chunks(parts)
+        self.pending = memoryview(b"")
+        for part in parts:
+            self.length += part[1] if isinstance(part, tuple) else len(part)
+
+    @staticmethod
+    def _chunks(parts):
+        for part in parts:
+            if isinstance(part, tuple):
+                yield from part[0]
+            else:
+                yield part
+
+    def __len__(self):
+        return self.length
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, target):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        size = min(len(target), len(self.pending))
+        target[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        self.position += size
+        return size
+
+
+class BufferReader(StreamedBody):
+    def __init__(self, buffer):
+        super().__init__([as_buffer(buffer)])
+
+
+def json_with_attachment(document, buffer, default=None):
+    """
+    The function `json_with_attachment` serializes `document` as JSON with `buffer`, base64
+    encoded, in place of the `ATTACHMENT` marker, streaming the encoding.
+
+    :param document: A JSON-serializable value in which exactly one value is `ATTACHMENT`.
+    :param default: Optional `json.dumps` hook for other values that are not JSON types.
+    :return: A `StreamedBody` to pass as a request body.
+    """
+
+    def encode(o):
+        if o is ATTACHMENT:
+            return _MARKER
+        if default is not None:
+            return default(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    body = json.dumps(document, default=encode)
+    prefix, suffix = body.split(_MARKER, 1)
+    return StreamedBody(
+        [
+            prefix.encode(),
+            (iter_base64(buffer), base64_length(len(buffer))),
+            suffix.encode(),
+        ]
+    )
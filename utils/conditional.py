@@ -0,0 +1,130 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Adds `ETag` and `Last-Modified` validators to a viewset's `list` and `retrieve` and answers
+    `If-None-Match` / `If-Modified-Since` with a bodiless 304.
+
+    The validators come from one aggregate query over the same queryset the action would serialize
+    (the newest of `conditional_fields` and the row count), so an unchanged response is confirmed
+    without loading or serializing any rows. The ETag also covers the full path (page, filters,
+    search) and the requesting user, since those change the body for the same rows.
+
+    Bump `conditional_version` when the serializer output changes shape.
+    """
+
+    conditional_fields = ("updated_at",)
+    conditional_actions = ("list", "retrieve")
+    conditional_version = 1
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return queryset
+
+    def get_validators(self, request):
+        aggregates = {
+            f"latest_{field}": Max(field) for field in self.conditional_fields
+        }
+        values = self.get_conditional_queryset().aggregate(
+            rows=Count("pk"), **aggregates
+        )
+        if self.action == "retrieve" and not values["rows"]:
+            return None, None
+        timestamps = [
+            values[f"latest_{field}"]
+            for field in self.conditional_fields
+            if values[f"latest_{field}"] is not None
+        ]
+        last_modified = max(timestamps) if timestamps else None
+        user = request.user.pk if request.user.is_authenticated else "anonymous"
+        fingerprint = "|".join(
+            str(part)
+            for part in (
+                self.conditional_version,
+                request.get_full_path(),
+                user,
+                values["rows"],
+                *(values[f"latest_{field}"] for field in self.conditional_fields),
+            )
+        )
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        return etag, last_modified
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in [
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+            ]
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return (
+            last_modified is not None
+            and if_modified_since is not None
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if "list" not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if "retrieve" not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+def byte_range(header, size):
+    """
+    The function `byte_range` reads a single-range `Range` header such as `bytes=0-1023`,
+    `bytes=512-` or `bytes=-256` against a body of `size` bytes.
+
+    :return: The first and last byte offsets, both inclusive, or `None` when there is no header or
+    it is malformed or asks for several ranges; the whole body is sent then.
+    :raises ValueError: When the range lies entirely past the end of the body (answer with 416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, separator, last = header.removeprefix("bytes=").strip().partition("-")
+    if not separator or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # a suffix: the last `last` bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, (min(int(last), size - 1) if last else size - 1)
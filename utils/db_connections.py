@@ -0,0 +1,90 @@
+"""
+Connection acquisition timing for the per-request database report.
+
+Django opens (or, with pooling, checks out) a connection lazily on the first query of a request,
+after a health check of the connection kept from the previous request. `TimedConnectionMixin`
+times both steps so `MetricsMiddleware` can report how long each request waited for a usable
+connection next to the time spent running its queries.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+
+
+_current = ContextVar("db_connection_stats", default=None)
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.acquire_time = 0.0
+        self.connects = 0
+        self.health_checks = 0
+
+
+@contextmanager
+def track_connections():
+    """
+    Collects the connection statistics of the enclosed block.
+
+        with track_connections() as stats:
+            response = get_response(request)
+    """
+    stats = ConnectionStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class TimedConnectionMixin:
+    """
+    Database wrapper mixin recording the time spent connecting (or waiting for a pooled
+    connection) and health-checking the kept connection.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.acquire_time += time.perf_counter() - start
+                stats.connects += 1
+
+    def close_if_health_check_failed(self):
+        pending = self.connection is not None and not self.health_check_done
+        start = time.perf_counter()
+        try:
+            return super().close_if_health_check_failed()
+        finally:
+            stats = _current.get()
+            if stats is not None and pending:
+                stats.acquire_time += time.perf_counter() - start
+                stats.health_checks += 1
+
+
+def pool_stats():
+    """
+    The function `pool_stats` reports the state of each configured connection pool in this process.
+
+    :return: A dictionary keyed by database alias with the pool `size`, the connections `in_use`,
+    the requests `waiting` for one and the total `wait_ms` so far. Aliases without pooling are
+    left out.
+    """
+    report = {}
+    for connection in connections.all(initialized_only=True):
+        pool = getattr(connection, "pool", None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        report[connection.alias] = {
+            "size": stats.get("pool_size", 0),
+            "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+            "wait_ms": stats.get("requests_wait_ms", 0),
+        }
+    return report
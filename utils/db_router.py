@@ -0,0 +1,140 @@
+"""
+Routes the reads of replica-safe endpoints to the optional `replica` database.
+
+Only requests to views marked with `replica_read` (function views) or listed in a viewset's
+`replica_actions` are eligible; everything else, and every write, uses the primary. A request
+stays on the primary once it has written anything, and a client keeps reading from the primary for
+`REPLICA_STICKY_SECONDS` after any request that wrote, so a department (or a student's browser)
+always sees its own changes despite replication lag. Without a `replica` database configured the
+router is a no-op.
+"""
+
+import logging
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+STICKY_COOKIE = "db_sticky"
+
+_use_replica = ContextVar("use_replica", default=False)
+_wrote = ContextVar("wrote", default=False)
+
+
+def replica_available():
+    return REPLICA in settings.DATABASES
+
+
+def replica_read(view):
+    """
+    Marks a function view as safe to serve from the replica. Apply it outermost, above
+    `api_view`.
+    """
+    view.replica_read = True
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_available():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # read-your-writes within the request: once it writes, it reads from the primary too
+        _use_replica.set(False)
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica receives schema changes through replication
+        return db != REPLICA
+
+
+def sticky_key(department_id):
+    return f"db:sticky:{department_id}"
+
+
+def department_from_token(request):
+    """
+    Reads the department id from the request's bearer token without touching the database. The
+    token is fully validated later by the view's authentication.
+    """
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        return AccessToken(header.split(" ", 1)[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def is_replica_view(request, view_func):
+    if getattr(view_func, "replica_read", False):
+        return True
+    viewset = getattr(view_func, "cls", None)
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(request.method.lower())
+    return action in getattr(viewset, "replica_actions", ())
+
+
+class ReplicaMiddleware:
+    """
+    Enables replica reads for eligible safe requests from clients that have not written recently,
+    and marks clients sticky to the primary after a request that wrote.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_token = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        request.department_id_hint = department_from_token(request)
+        try:
+            response = self.get_response(request)
+            if _wrote.get():
+                self.make_sticky(request, response)
+            return response
+        finally:
+            _use_replica.reset(use_token)
+            _wrote.reset(wrote_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            replica_available()
+            and request.method in ("GET", "HEAD")
+            and is_replica_view(request, view_func)
+            and not self.is_sticky(request)
+        ):
+            _use_replica.set(True)
+
+    def is_sticky(self, request):
+        if request.COOKIES.get(STICKY_COOKIE):
+            return True
+        department_id = request.department_id_hint
+        return bool(department_id and cache.get(sticky_key(department_id)))
+
+    def make_sticky(self, request, response):
+        if not replica_available():
+            return
+        seconds = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax"
+        )
+        user = getattr(request, "user", None)
+        department_id = request.department_id_hint or (
+            user.pk if user is not None and user.is_authenticated else None
+        )
+        if department_id:
+            cache.set(sticky_key(department_id), True, timeout=seconds)
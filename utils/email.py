@@ -1,36 +1,47 @@
-import base64
-from mailjet_rest import Client
-from decouple import config
-from django.conf import settings
+"""
+The Mailjet email backend, streaming attachments.
 
+Anymail's Mailjet backend base64-encodes every attachment into the JSON request body before
+sending it, so a receipt email holds the PDF, its base64 text and the whole body in memory at
+once. `EmailBackend` sends the first regular attachment of a message, the receipt, base64-encoded
+one chunk at a time while the request is sent (see `utils.buffers.json_with_attachment`). Any
+further attachments are encoded by anymail as before.
+"""
 
-api_key = config("MAILJET_API_KEY")
-secret_key = config("MAILJET_SECRET_KEY")
+from anymail.backends.mailjet import EmailBackend as AnymailMailjetBackend
+from anymail.backends.mailjet import MailjetPayload
+from utils.buffers import ATTACHMENT, as_buffer, json_with_attachment
 
-mailjet = Client(auth=(api_key, secret_key), version="v3.1")
 
+class StreamingMailjetPayload(MailjetPayload):
+    def init_payload(self):
+        super().init_payload()
+        self.streamed_attachment = None
 
-def send_receipt_email(to_email, pdf_file, variables, filename="receipt.pdf"):
-    pdf_file_b64 = base64.b64encode(pdf_file.getvalue()).decode('utf-8')
-    data = {
-        "Messages": [
+    def add_attachment(self, attachment):
+        if (
+            self.streamed_attachment is not None
+            or attachment.inline
+            or isinstance(attachment.content, str)
+        ):
+            return super().add_attachment(attachment)
+        self.streamed_attachment = attachment.content
+        self.data["Globals"].setdefault("Attachments", []).append(
             {
-                "From": {"Email": settings.MAILJET_SENDER_EMAIL, "Name": "Student Pay"},
-                "To": [{"Email": to_email}],
-                "TemplateID": 7288203,
-                "TemplateLanguage": True,
-                "Subject": "Your email flight plan!",
-                'Variables': variables,
-                "Attachments": [
-                    {
-                        "ContentType": "application/pdf",
-                        "Filename": filename,
-                        "Base64Content": pdf_file_b64,
-                    }
-                ],
+                "ContentType": attachment.mimetype,
+                "Filename": attachment.name or "attachment",
+                "Base64Content": ATTACHMENT,
             }
-        ]
-    }
-    response = mailjet.send.create(data=data)
-    print(response.status_code)
-    print(response.json())
+        )
+
+    def serialize_data(self):
+        if self.streamed_attachment is None:
+            return super().serialize_data()
+        return json_with_attachment(
+            self.data, as_buffer(self.streamed_attachment), default=self._json_default
+        )
+
+
+class EmailBackend(AnymailMailjetBackend):
+    def build_message_payload(self, message, defaults):
+        return StreamingMailjetPayload(message, defaults, self)
@@ -1,5 +1,7 @@
 import factory
+from factory import fuzzy
 from accounts.models import Department
+from pay.models import Payment, Transaction
 
 class DepartmentFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -8,3 +10,26 @@ class DepartmentFactory(factory.django.DjangoModelFactory):
     dept_name = factory.Faker('company')
     password = factory.PostGenerationMethodCall('set_password', 'Testpass123')
     
+
+class PaymentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Payment
+    department = factory.SubFactory(DepartmentFactory)
+    payment_for = factory.Faker('random_element', elements=["Dues", "Levy", "Handbook", "Dinner", "T-Shirt"])
+    amount_due = fuzzy.FuzzyDecimal(500, 9999, precision=2)
+
+
+class TransactionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Transaction
+    payment = factory.SubFactory(PaymentFactory)
+    department = factory.SelfAttribute('payment.department')
+    amount_paid = factory.SelfAttribute('payment.amount_due')
+    status = "success"
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    received_from = factory.LazyAttribute(lambda o: f"{o.first_name} {o.last_name}")
+    customer_email = factory.Faker('email')
+    customer_code = factory.Sequence(lambda n: f"CUS_{n:012d}")
+    txn_reference = factory.Sequence(lambda n: f"REF{n:010d}")
+    receipt_hash = factory.Faker('sha256')
@@ -1,7 +1,8 @@
 from pay.models import Transaction, Payment
-from pay.paystack import Paystack
+from pay.gateways import gateway_for_reference
 from accounts.models import Department
-from num2words import num2words
+from pay.receipt_text import receipt_amount_words
+from utils.metrics import span
 import hashlib
 
 
@@ -16,28 +17,31 @@ def getReceiptData(tx_ref: str):
     :return: The `getReceiptData` function returns a dictionary containing two main keys: "receipt_data"
     and "save_data".
     """
-    paystack_obj = Paystack()
-    transaction_data = paystack_obj.verify_transaction(tx_ref)
-    print("transaction data", transaction_data)
-    payment = Payment.objects.get(id=transaction_data["payment_id"])
-    department = Department.objects.get(id=transaction_data["department_id"])
-    raw_string = f"{transaction_data['customer_email']}{transaction_data['date_paid']}{transaction_data['txn_id']}"
-    receipt_hash = hashlib.sha256(raw_string.encode()).hexdigest()
+    if not tx_ref:
+        return {"error": "Missing transaction reference"}
+    with span("verify.gateway"):
+        transaction_data = gateway_for_reference(tx_ref).verify_transaction(tx_ref)
     if "error" in transaction_data:
         return {"error": transaction_data["error"]}
+    with span("verify.lookup"):
+        payment = Payment.objects.get(id=transaction_data["payment_id"])
+        department = Department.objects.get(id=transaction_data["department_id"])
+    # Monnify transactions have no numeric id, so their hash uses our payment reference
+    raw_string = f"{transaction_data['customer_email']}{transaction_data['date_paid']}{transaction_data['txn_id'] or transaction_data['txn_reference']}"
+    receipt_hash = hashlib.sha256(raw_string.encode()).hexdigest()
     response = {
         "receipt_data": {
             "header": department.dept_name.upper(),
             "date": transaction_data["date_paid"],
             "received_from": transaction_data["received_from"],
             "payment_for": payment.payment_for,
-            "amount_words": num2words(
-                transaction_data["amount_paid"] * 100, to="currency", lang="en_NG"
+            "amount_words": receipt_amount_words(
+                payment, transaction_data["amount_paid"]
             ),
             "amount": transaction_data["amount_paid"],
-            "department_logo": department.logo_url,
-            "president_signature": department.president_signature_url,
-            "financial_signature": department.secretary_signature_url,
+            "department_logo": department.asset_url("logo"),
+            "president_signature": department.asset_url("president_signature"),
+            "financial_signature": department.asset_url("secretary_signature"),
             "receipt_hash": receipt_hash,
         },
         "save_data": {
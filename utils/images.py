@@ -0,0 +1,222 @@
+"""
+Normalization of department logos and signatures.
+
+Uploads are decoded once, trimmed to their content and downsampled to the exact pixel size the
+receipt draws them at (`RECEIPT_DPI` over the receipt's boxes), plus a small preview for the
+dashboard. Signatures lose their paper background and become PNGs with alpha; logos stay PNG when
+they are transparent and become JPEG otherwise. The variants are stored next to the original, whose
+URL is kept unchanged.
+"""
+
+import io
+import logging
+from functools import partial
+from pathlib import PurePosixPath
+from receipt_utils.create_receipt import LOGO_BOX, SIGNATURE_BOX
+from utils.lazy import lazy_module
+
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_DPI = 300
+PREVIEW_SIZE = (256, 256)
+# Pixels whose every channel is at least this bright count as paper
+PAPER_THRESHOLD = 230
+JPEG_QUALITY = 85
+
+
+def _pixels(box):
+    return tuple(round(points / 72 * RECEIPT_DPI) for points in box)
+
+
+# Uploaded file field -> (kind, {variant: maximum size in pixels})
+ASSET_VARIANTS = {
+    "logo": ("logo", {"receipt": _pixels(LOGO_BOX), "preview": PREVIEW_SIZE}),
+    "president_signature": (
+        "signature",
+        {"receipt": _pixels(SIGNATURE_BOX), "preview": PREVIEW_SIZE},
+    ),
+    "secretary_signature": (
+        "signature",
+        {"receipt": _pixels(SIGNATURE_BOX), "preview": PREVIEW_SIZE},
+    ),
+}
+# The largest image a receipt draws, so any logo or signature fetched for one fits
+RECEIPT_IMAGE_SIZE = tuple(
+    max(sizes) for sizes in zip(_pixels(LOGO_BOX), _pixels(SIGNATURE_BOX))
+)
+
+
+def _remove_paper(image):
+    """
+    Makes near-white pixels transparent, fading the ones just below the threshold so ink edges
+    stay smooth.
+    """
+    ImageChops = lazy_module("PIL.ImageChops")
+
+    # darkest channel per pixel: paper is bright in every channel, ink in at least one
+    r, g, b, alpha = image.split()
+    darkest = ImageChops.darker(ImageChops.darker(r, g), b)
+    ink = darkest.point(
+        lambda v: 0 if v >= PAPER_THRESHOLD else min(255, (PAPER_THRESHOLD - v) * 8)
+    )
+    image.putalpha(ImageChops.multiply(alpha, ink))
+    return image
+
+
+def _trim(image):
+    """
+    Crops transparent or uniform borders, judging uniformity by the top-left pixel.
+    """
+    Image = lazy_module("PIL.Image")
+    ImageChops = lazy_module("PIL.ImageChops")
+
+    bbox = image.getchannel("A").getbbox()
+    if bbox and bbox != (0, 0, *image.size):
+        return image.crop(bbox)
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).convert("L")
+    bbox = diff.point(lambda v: 255 if v > 16 else 0).getbbox()
+    return image.crop(bbox) if bbox else image
+
+
+def _encode(image, kind):
+    buffer = io.BytesIO()
+    opaque = image.getchannel("A").getextrema()[0] == 255
+    if kind == "logo" and opaque:
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+        )
+        return buffer.getvalue(), "jpg", "image/jpeg"
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue(), "png", "image/png"
+
+
+def normalize_image(data, field):
+    """
+    The function `normalize_image` produces the normalized variants of an uploaded logo or
+    signature.
+
+    :param data: The uploaded file's bytes, in any format Pillow reads.
+    :param field: The `Department` file field the upload belongs to, a key of `ASSET_VARIANTS`.
+    :return: A dictionary mapping each variant name to `(bytes, extension, content type)`.
+    :raises ValueError: When `data` is not a readable image.
+    """
+    Image = lazy_module("PIL.Image")
+    ImageOps = lazy_module("PIL.ImageOps")
+
+    kind, variants = ASSET_VARIANTS[field]
+    largest = max(variants.values())
+    try:
+        image = Image.open(io.BytesIO(data))
+        # JPEGs can be decoded straight at a fraction of their size
+        image.draft("RGB", (largest[0] * 2, largest[1] * 2))
+        image = ImageOps.exif_transpose(image).convert("RGBA")
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+
+    if kind == "signature":
+        image = _remove_paper(image)
+    image = _trim(image)
+
+    results = {}
+    for name, size in variants.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.LANCZOS)
+        results[name] = _encode(variant, kind)
+    return results
+
+
+def fit_for_receipt(data, size=RECEIPT_IMAGE_SIZE):
+    """
+    The function `fit_for_receipt` downsamples an image fetched for a receipt that is larger than
+    `size`, e.g. the original of a logo uploaded before variants existed. Transparent images stay
+    PNG and opaque ones become JPEG, as in `normalize_image`.
+
+    :return: The downsampled image's bytes, or `data` itself when it already fits or cannot be
+    read (reportlab then reports the problem).
+    """
+    Image = lazy_module("PIL.Image")
+    ImageOps = lazy_module("PIL.ImageOps")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width <= size[0] and image.height <= size[1]:
+            return data
+        image.draft("RGB", (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image).convert("RGBA")
+    except (OSError, SyntaxError):
+        return data
+    image.thumbnail(size, Image.LANCZOS)
+    return _encode(image, "logo")[0]
+
+
+def variant_path(original_path, name, extension):
+    path = PurePosixPath(original_path)
+    return str(path.with_name(f"{path.stem}.{name}.{extension}"))
+
+
+def upload_variants(field, original_path, data, upload):
+    """
+    The function `upload_variants` normalizes an upload and stores every variant with `upload`
+    next to the original.
+
+    :param upload: A callable `(path, bytes, content type) -> URL`, e.g. a partial of
+    `upload_to_supabase` with the bucket filled in.
+    :return: A dictionary mapping each variant name to its URL, empty when the upload is not a
+    readable image (receipts then use the original).
+    """
+    try:
+        variants = normalize_image(data, field)
+    except ValueError as e:
+        logger.warning(f"Could not normalize {original_path}: {e}")
+        return {}
+    return {
+        name: upload(
+            variant_path(original_path, name, extension), content, content_type
+        )
+        for name, (content, extension, content_type) in variants.items()
+    }
+
+
+def bucket_path(url, bucket):
+    """
+    Extracts the object path from a Supabase public URL, e.g.
+    `.../storage/v1/object/public/logo/temp_uploads/x.png` -> `temp_uploads/x.png`.
+    """
+    marker = f"/object/public/{bucket}/"
+    return url.split(marker, 1)[1] if marker in url else None
+
+
+def normalize_department_assets(department, buckets, upload, force=False):
+    """
+    The function `normalize_department_assets` creates the missing variants of a department's
+    already uploaded logo and signatures, downloading each original once.
+
+    :param buckets: The bucket of each file field.
+    :param upload: A callable `(bucket, path, bytes, content type) -> URL`.
+    :param force: Recreate variants that already exist.
+    :return: The names of the fields that gained variants.
+    """
+    import requests
+
+    variants = dict(department.asset_variants or {})
+    normalized = []
+    for field, bucket in buckets.items():
+        url = getattr(department, f"{field}_url")
+        if not url or (variants.get(field) and not force):
+            continue
+        path = bucket_path(url, bucket)
+        if path is None:
+            logger.warning(f"{url} is not in the {bucket} bucket")
+            continue
+        response = requests.get(url, timeout=15)
+        response.raise_for_status()
+        urls = upload_variants(field, path, response.content, partial(upload, bucket))
+        if urls:
+            variants[field] = urls
+            normalized.append(field)
+    if normalized:
+        department.asset_variants = variants
+        department.save(update_fields=["asset_variants"])
+    return normalized
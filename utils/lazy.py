@@ -0,0 +1,99 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class LazyRegistry:
+    """
+    A process-local registry of expensive objects (API clients, heavy modules, registered fonts)
+    that are only built the first time they are asked for.
+
+    Objects registered with `fork_safe=False` (anything holding sockets or connection pools, such
+    as the Supabase or Mailjet clients) are discarded in a forked child, so a gunicorn `--preload`
+    master never hands its connections to the workers. Fork-safe objects (imported modules, font
+    registrations) survive the fork and are shared copy-on-write.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._fork_safe = set()
+        self._instances = {}
+        self._lock = threading.RLock()
+        self.load_times = {}
+
+    def register(self, name, factory, fork_safe=False):
+        self._factories[name] = factory
+        if fork_safe:
+            self._fork_safe.add(name)
+        return factory
+
+    def get(self, name):
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No lazy factory registered for '{name}'")
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.load_times[name] = time.perf_counter() - start
+                logger.debug(f"Loaded {name} in {self.load_times[name] * 1000:.1f}ms")
+            return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def names(self):
+        return sorted(self._factories)
+
+    def reset(self, fork_safe_too=False):
+        """
+        Drops built instances so they are rebuilt on next use. Called automatically in a forked
+        child; fork-safe instances are kept unless `fork_safe_too` is set.
+        """
+        self._lock = threading.RLock()
+        for name in list(self._instances):
+            if fork_safe_too or name not in self._fork_safe:
+                del self._instances[name]
+                self.load_times.pop(name, None)
+
+
+registry = LazyRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+def lazy(name, fork_safe=False):
+    """
+    Decorator registering the decorated zero-argument function as the factory for `name`.
+    """
+
+    def decorator(factory):
+        return registry.register(name, factory, fork_safe=fork_safe)
+
+    return decorator
+
+
+def get(name):
+    return registry.get(name)
+
+
+def lazy_module(module_name):
+    """
+    Imports `module_name` on first use and returns the module object. Imported modules are
+    always fork-safe.
+    """
+    key = f"module:{module_name}"
+    if key not in registry._factories:
+        registry.register(
+            key, lambda: importlib.import_module(module_name), fork_safe=True
+        )
+    return registry.get(key)
@@ -0,0 +1,330 @@
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from utils.db_connections import pool_stats, track_connections
+
+
+logger = logging.getLogger(__name__)
+db_logger = logging.getLogger("studentpay.db")
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CONNECTION_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+METRICS = {
+    "studentpay_request_duration_seconds": (
+        "histogram",
+        "Time spent handling a request, by endpoint.",
+        BUCKETS,
+    ),
+    "studentpay_request_queries": (
+        "histogram",
+        "Database queries run while handling a request, by endpoint.",
+        QUERY_BUCKETS,
+    ),
+    "studentpay_request_db_seconds": (
+        "histogram",
+        "Time spent in database queries while handling a request, by endpoint.",
+        BUCKETS,
+    ),
+    "studentpay_request_db_acquire_seconds": (
+        "histogram",
+        "Time spent getting a usable database connection while handling a request, by endpoint.",
+        BUCKETS,
+    ),
+    "studentpay_db_pool_in_use": (
+        "histogram",
+        "Pooled connections in use when a request finished, by database.",
+        CONNECTION_BUCKETS,
+    ),
+    "studentpay_stage_duration_seconds": (
+        "histogram",
+        "Time spent in a named stage of request handling.",
+        BUCKETS,
+    ),
+    "studentpay_outbound_duration_seconds": (
+        "histogram",
+        "Time spent in calls to third-party services, by target and outcome.",
+        BUCKETS,
+    ),
+}
+
+PROCESS_INDEX_KEY = "metrics:processes"
+PROCESS_TTL = 60 * 60
+
+
+class MetricsRegistry:
+    """
+    Collects histograms for the current process and periodically publishes them to the shared cache,
+    so `/metrics` can report across all gunicorn workers (and hosts) sharing the cache.
+
+    Series are keyed by `(metric name, sorted label pairs)`. Each series keeps per-bucket counts,
+    the sum and the count of observations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+        self.process_key = f"metrics:process:{socket.gethostname()}:{os.getpid()}"
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "buckets": [0] * len(buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    "buckets": list(series["buckets"]),
+                    "sum": series["sum"],
+                    "count": series["count"],
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+        self.process_key = f"metrics:process:{socket.gethostname()}:{os.getpid()}"
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Publishes this process's series to the shared cache and registers the process in the index.
+        """
+        self._last_flush = time.monotonic()
+        try:
+            cache.set(self.process_key, self.snapshot(), timeout=PROCESS_TTL)
+            now = time.time()
+            index = cache.get(PROCESS_INDEX_KEY) or {}
+            index = {k: seen for k, seen in index.items() if now - seen < PROCESS_TTL}
+            index[self.process_key] = now
+            cache.set(PROCESS_INDEX_KEY, index, timeout=PROCESS_TTL)
+        except Exception as e:
+            logger.warning(f"Could not publish metrics: {e}")
+
+    def collect(self):
+        """
+        Merges the series published by every live process into a single snapshot.
+        """
+        self.flush()
+        index = cache.get(PROCESS_INDEX_KEY) or {}
+        merged = {}
+        for snapshot in cache.get_many(list(index)).values():
+            for key, series in snapshot.items():
+                total = merged.setdefault(
+                    key,
+                    {"buckets": [0] * len(series["buckets"]), "sum": 0.0, "count": 0},
+                )
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], series["buckets"])]
+                total["sum"] += series["sum"]
+                total["count"] += series["count"]
+        return merged
+
+
+metrics = MetricsRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=metrics.reset)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(snapshot):
+    """
+    The function `render_prometheus` formats a merged snapshot in the Prometheus text exposition
+    format.
+
+    :param snapshot: A dictionary as returned by `MetricsRegistry.collect`.
+    :return: The exposition text, one `# HELP`/`# TYPE` block per metric.
+    """
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (series_name, labels), series in sorted(snapshot.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, series["buckets"]):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}"
+                )
+            lines.append(
+                f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series['count']}"
+            )
+            lines.append(f"{name}_sum{_format_labels(labels)} {series['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Times the enclosed block as a named stage.
+
+        with span("receipt.render"):
+            pdf_stream = generate_receipt(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("studentpay_stage_duration_seconds", elapsed, stage=stage, **labels)
+        logger.debug(f"{stage} took {elapsed * 1000:.1f}ms")
+
+
+@contextmanager
+def outbound(target):
+    """
+    Times a call to a third-party service, labelled with the outcome ("ok" or "error").
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe(
+            "studentpay_outbound_duration_seconds", elapsed, target=target, outcome=outcome
+        )
+        logger.debug(f"{target} call ({outcome}) took {elapsed * 1000:.1f}ms")
+
+
+def traced(target):
+    """
+    Decorator form of `outbound`.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with outbound(target):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries and the time spent running them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count, query time and connection acquisition time for every request,
+    labelled by the resolved URL name so the number of series stays bounded, and logs a one-line
+    database report per request. Requests running more than `DB_QUERY_BUDGET` queries are logged
+    as warnings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            stats = stack.enter_context(track_connections())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        labels = {
+            "endpoint": match.view_name if match else "unmatched",
+            "method": request.method,
+        }
+        metrics.observe(
+            "studentpay_request_duration_seconds",
+            elapsed,
+            status=f"{response.status_code // 100}xx",
+            **labels,
+        )
+        metrics.observe("studentpay_request_queries", counter.count, **labels)
+        metrics.observe("studentpay_request_db_seconds", counter.duration, **labels)
+        metrics.observe(
+            "studentpay_request_db_acquire_seconds", stats.acquire_time, **labels
+        )
+        pools = pool_stats()
+        for alias, pool in pools.items():
+            metrics.observe("studentpay_db_pool_in_use", pool["in_use"], database=alias)
+        metrics.maybe_flush()
+        self.report(labels, response, elapsed, counter, stats, pools)
+        return response
+
+    def report(self, labels, response, elapsed, counter, stats, pools):
+        over_budget = counter.count > settings.DB_QUERY_BUDGET
+        level = logging.WARNING if over_budget else logging.INFO
+        if not db_logger.isEnabledFor(level):
+            return
+        message = (
+            f"{labels['method']} {labels['endpoint']} {response.status_code} "
+            f"in {elapsed * 1000:.1f}ms: {counter.count} queries in "
+            f"{counter.duration * 1000:.1f}ms, connection acquired in "
+            f"{stats.acquire_time * 1000:.1f}ms ({stats.connects} new, "
+            f"{stats.health_checks} checked)"
+        )
+        for alias, pool in pools.items():
+            message += (
+                f", {alias} pool {pool['in_use']}/{pool['size']} in use"
+                f" ({pool['waiting']} waiting)"
+            )
+        if over_budget:
+            message += f" - over the budget of {settings.DB_QUERY_BUDGET} queries"
+        db_logger.log(level, message)
@@ -0,0 +1,6 @@
+from django.db.backends.postgresql import base
+from utils.db_connections import TimedConnectionMixin
+
+
+class DatabaseWrapper(TimedConnectionMixin, base.DatabaseWrapper):
+    pass
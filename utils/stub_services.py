@@ -0,0 +1,507 @@
+"""
+An offline stand-in for the Paystack, Monnify, Supabase storage and Mailjet APIs.
+
+Point the app at it with `STUB_SERVICES_URL` (see settings) and run it with
+`python manage.py run_stub_services`, or start it inside the current process with
+`start_stub_server()` for tests and benchmarks. Latency and error injection can be set when
+starting it or changed while it runs with `POST /__stub__/config`.
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+logger = logging.getLogger(__name__)
+
+BANKS = [
+    {"name": "Access Bank", "code": "044"},
+    {"name": "First Bank of Nigeria", "code": "011"},
+    {"name": "Guaranty Trust Bank", "code": "058"},
+    {"name": "Opay", "code": "999992"},
+    {"name": "United Bank For Africa", "code": "033"},
+    {"name": "Zenith Bank", "code": "057"},
+]
+
+SERVICES = ("paystack", "monnify", "supabase", "mailjet")
+
+
+class StubState:
+    """
+    In-memory records of everything the stand-in has been asked to do, plus the latency and error
+    injection settings. Per-service settings override the defaults, e.g.
+    `{"paystack": {"error_rate": 0.5}}`.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, services=None):
+        self.lock = threading.Lock()
+        self.config = {
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "services": services or {},
+        }
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.customers = {}
+            self.transactions = {}
+            self.objects = {}
+            self.emails = []
+            self.requests = {name: 0 for name in SERVICES}
+            self.next_txn_id = 4_000_000_000
+
+    def behaviour(self, service):
+        merged = dict(self.config)
+        merged.update(self.config["services"].get(service, {}))
+        return merged
+
+
+class Response:
+    def __init__(
+        self, body=None, status=200, content_type="application/json", raw=None
+    ):
+        self.status = status
+        self.content_type = content_type
+        self.raw = raw if raw is not None else json.dumps(body).encode()
+
+
+class StubServices:
+    """
+    WSGI application implementing the subset of each API that Student Pay calls.
+    """
+
+    def __init__(self, state=None):
+        self.state = state or StubState()
+        self.routes = [
+            ("GET", r"^/__stub__/state$", "__stub__", self.show_state),
+            ("POST", r"^/__stub__/config$", "__stub__", self.update_config),
+            ("POST", r"^/__stub__/reset$", "__stub__", self.reset_state),
+            ("POST", r"^/paystack/customer$", "paystack", self.paystack_customer),
+            (
+                "POST",
+                r"^/paystack/transaction/initialize$",
+                "paystack",
+                self.paystack_initialize,
+            ),
+            (
+                "GET",
+                r"^/paystack/transaction/verify/(?P<ref>[^/]+)$",
+                "paystack",
+                self.paystack_verify,
+            ),
+            ("GET", r"^/paystack/bank$", "paystack", self.paystack_banks),
+            ("GET", r"^/paystack/bank/resolve$", "paystack", self.paystack_resolve),
+            ("POST", r"^/paystack/subaccount$", "paystack", self.paystack_subaccount),
+            ("POST", r"^/monnify/api/v1/auth/login$", "monnify", self.monnify_login),
+            (
+                "POST",
+                r"^/monnify/api/v1/merchant/transactions/init-transaction$",
+                "monnify",
+                self.monnify_initialize,
+            ),
+            (
+                "GET",
+                r"^/monnify/api/v2/merchant/transactions/query$",
+                "monnify",
+                self.monnify_verify,
+            ),
+            (
+                "POST",
+                r"^/supabase/storage/v1/object/(?P<path>(?!public/).+)$",
+                "supabase",
+                self.storage_put,
+            ),
+            (
+                "PUT",
+                r"^/supabase/storage/v1/object/(?P<path>(?!public/).+)$",
+                "supabase",
+                self.storage_put,
+            ),
+            (
+                "GET",
+                r"^/supabase/storage/v1/object/public/(?P<path>.+)$",
+                "supabase",
+                self.storage_get,
+            ),
+            (
+                "GET",
+                r"^/supabase/storage/v1/object/(?P<path>(?!public/).+)$",
+                "supabase",
+                self.storage_get,
+            ),
+            (
+                "DELETE",
+                r"^/supabase/storage/v1/object/(?P<path>(?!public/).+)$",
+                "supabase",
+                self.storage_delete,
+            ),
+            ("POST", r"^/mailjet/v3\.1/send$", "mailjet", self.mailjet_send),
+        ]
+        self.routes = [
+            (method, re.compile(pattern), service, handler)
+            for method, pattern, service, handler in self.routes
+        ]
+
+    def __call__(self, environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        path = environ.get("PATH_INFO", "")
+        response = None
+        for route_method, pattern, service, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                response = self.dispatch(environ, service, handler, match.groupdict())
+                break
+        if response is None:
+            response = Response(
+                {"status": False, "message": f"No stub for {method} {path}"}, 404
+            )
+        start_response(
+            f"{response.status} {'OK' if response.status < 400 else 'Error'}",
+            [
+                ("Content-Type", response.content_type),
+                ("Content-Length", str(len(response.raw))),
+            ],
+        )
+        return [response.raw]
+
+    def dispatch(self, environ, service, handler, kwargs):
+        request = {
+            "query": dict(parse_qsl(environ.get("QUERY_STRING", ""))),
+            "body": self._read_body(environ),
+            "headers": environ,
+        }
+        if service != "__stub__":
+            behaviour = self.state.behaviour(service)
+            with self.state.lock:
+                self.state.requests[service] += 1
+            delay = behaviour["latency_ms"] + random.uniform(0, behaviour["jitter_ms"])
+            if delay:
+                time.sleep(delay / 1000)
+            if random.random() < behaviour["error_rate"]:
+                return Response(
+                    {"status": False, "message": "Injected stub error"}, 500
+                )
+        return handler(request, **kwargs)
+
+    def _read_body(self, environ):
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        return environ["wsgi.input"].read(length) if length else b""
+
+    def _json(self, request):
+        try:
+            return json.loads(request["body"] or b"{}")
+        except ValueError:
+            return {}
+
+    # === Stub control ===
+    def show_state(self, request):
+        with self.state.lock:
+            return Response(
+                {
+                    "config": self.state.config,
+                    "requests": self.state.requests,
+                    "transactions": len(self.state.transactions),
+                    "objects": len(self.state.objects),
+                    "emails": len(self.state.emails),
+                }
+            )
+
+    def update_config(self, request):
+        with self.state.lock:
+            self.state.config.update(self._json(request))
+            return Response(self.state.config)
+
+    def reset_state(self, request):
+        self.state.reset()
+        return Response({"status": True})
+
+    # === Paystack ===
+    def paystack_customer(self, request):
+        data = self._json(request)
+        customer_code = f"CUS_{uuid.uuid4().hex[:15]}"
+        with self.state.lock:
+            self.state.customers[customer_code] = data
+        return Response(
+            {"status": True, "data": {**data, "customer_code": customer_code}}
+        )
+
+    def paystack_initialize(self, request):
+        data = self._json(request)
+        reference = data.get("reference") or uuid.uuid4().hex[:10]
+        with self.state.lock:
+            self.state.next_txn_id += 1
+            # a stub checkout is paid the moment it is initialized
+            self.state.transactions[reference] = {
+                "id": self.state.next_txn_id,
+                "reference": reference,
+                "amount": int(float(data.get("amount", 0))),
+                "email": data.get("email"),
+                "metadata": data.get("metadata", {}),
+                "paid_at": datetime.now(timezone.utc).isoformat(),
+            }
+        return Response(
+            {
+                "status": True,
+                "data": {
+                    "authorization_url": f"https://checkout.paystack.stub/{reference}",
+                    "access_code": uuid.uuid4().hex[:12],
+                    "reference": reference,
+                },
+            }
+        )
+
+    def paystack_verify(self, request, ref):
+        with self.state.lock:
+            txn = self.state.transactions.get(ref)
+        if txn is None:
+            return Response(
+                {
+                    "status": False,
+                    "code": "transaction_not_found",
+                    "message": "Transaction reference not found",
+                },
+                404,
+            )
+        return Response(
+            {
+                "status": True,
+                "data": {
+                    "id": txn["id"],
+                    "status": "success",
+                    "reference": txn["reference"],
+                    "amount": txn["amount"],
+                    "ip_address": "127.0.0.1",
+                    "paid_at": txn["paid_at"],
+                    "metadata": txn["metadata"],
+                },
+            }
+        )
+
+    def paystack_banks(self, request):
+        return Response({"status": True, "data": BANKS})
+
+    def paystack_resolve(self, request):
+        return Response(
+            {
+                "status": True,
+                "data": {
+                    "account_number": request["query"].get("account_number"),
+                    "account_name": "STUB ACCOUNT NAME",
+                },
+            }
+        )
+
+    def paystack_subaccount(self, request):
+        return Response(
+            {
+                "status": True,
+                "data": {
+                    "subaccount_code": f"ACCT_{uuid.uuid4().hex[:12]}",
+                    "account_name": "STUB ACCOUNT NAME",
+                },
+            }
+        )
+
+    # === Monnify ===
+    def _monnify(self, body):
+        return Response(
+            {
+                "requestSuccessful": True,
+                "responseMessage": "success",
+                "responseCode": "0",
+                "responseBody": body,
+            }
+        )
+
+    def monnify_login(self, request):
+        return self._monnify({"accessToken": uuid.uuid4().hex, "expiresIn": 3600})
+
+    def monnify_initialize(self, request):
+        data = self._json(request)
+        reference = data["paymentReference"]
+        with self.state.lock:
+            self.state.transactions[reference] = {
+                "paymentReference": reference,
+                "amountPaid": data.get("amount", 0),
+                "paidOn": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.0"),
+                "paymentStatus": "PAID",
+                "customer": {"email": data.get("customerEmail")},
+                "metaData": data.get("metaData", {}),
+            }
+        return self._monnify(
+            {
+                "transactionReference": f"MNFY|{reference}",
+                "paymentReference": reference,
+                "checkoutUrl": f"https://checkout.monnify.stub/{reference}",
+            }
+        )
+
+    def monnify_verify(self, request):
+        with self.state.lock:
+            txn = self.state.transactions.get(request["query"].get("paymentReference"))
+        if txn is None:
+            return Response(
+                {
+                    "requestSuccessful": False,
+                    "responseMessage": "Transaction not found",
+                    "responseCode": "99",
+                },
+                404,
+            )
+        return self._monnify(txn)
+
+    # === Supabase storage ===
+    def storage_put(self, request, path):
+        with self.state.lock:
+            self.state.objects[path] = (
+                request["body"],
+                request["headers"].get("CONTENT_TYPE") or "application/octet-stream",
+            )
+        return Response({"Key": path, "Id": uuid.uuid4().hex})
+
+    def storage_get(self, request, path):
+        with self.state.lock:
+            stored = self.state.objects.get(path)
+        if stored is None:
+            return Response({"statusCode": "404", "error": "not_found"}, 404)
+        body, content_type = stored
+        return Response(raw=body, content_type=content_type)
+
+    def storage_delete(self, request, path):
+        with self.state.lock:
+            stored = self.state.objects.pop(path, None)
+        if stored is None:
+            return Response({"statusCode": "404", "error": "not_found"}, 404)
+        return Response({"message": "Successfully deleted"})
+
+    # === Mailjet ===
+    def mailjet_send(self, request):
+        data = self._json(request)
+        messages = data.get("Messages", [])
+        with self.state.lock:
+            # anymail puts everything shared by the messages, attachments included, in Globals
+            self.state.emails.extend(
+                {**data.get("Globals", {}), **message} for message in messages
+            )
+        return Response(
+            {
+                "Messages": [
+                    {
+                        "Status": "success",
+                        "To": [
+                            {
+                                "Email": recipient.get("Email"),
+                                "MessageUUID": str(uuid.uuid4()),
+                                "MessageID": random.randint(10**15, 10**16),
+                                "MessageHref": "",
+                            }
+                            for recipient in message.get("To", [])
+                        ],
+                    }
+                    for message in messages
+                ]
+            }
+        )
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StubServer:
+    """
+    Handle on a running stand-in: `url` is the value to use for `STUB_SERVICES_URL`.
+    """
+
+    def __init__(self, httpd, app):
+        self.httpd = httpd
+        self.app = app
+        self.state = app.state
+        self.url = f"http://{httpd.server_address[0]}:{httpd.server_address[1]}"
+        self.thread = None
+
+    def serve_in_background(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_stub_server(host="127.0.0.1", port=0, **behaviour):
+    app = StubServices(StubState(**behaviour))
+    httpd = make_server(
+        host, port, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler
+    )
+    return StubServer(httpd, app)
+
+
+def start_stub_server(host="127.0.0.1", port=0, **behaviour):
+    """
+    The function `start_stub_server` starts the stand-in on a background thread of the current
+    process.
+
+    :param port: The port to listen on; 0 picks a free one.
+    :param behaviour: `latency_ms`, `jitter_ms`, `error_rate` and per-service `services` overrides.
+    :return: A `StubServer`; call `stop()` when done.
+    """
+    return make_stub_server(host, port, **behaviour).serve_in_background()
+
+
+@contextmanager
+def use_stub_services(**behaviour):
+    """
+    Starts an in-process stand-in and points the settings used by the API clients at it for the
+    duration of the block.
+
+        with use_stub_services(latency_ms=50) as stub:
+            ...
+    """
+    from django.test import override_settings
+    from utils.lazy import registry
+
+    stub = start_stub_server(**behaviour)
+    overrides = override_settings(
+        STUB_SERVICES_URL=stub.url,
+        PAYSTACK_BASE_URL=f"{stub.url}/paystack",
+        MONNIFY_BASE_URL=f"{stub.url}/monnify",
+        SUPABASE_URL=f"{stub.url}/supabase",
+        SUPABASE_KEY="stub.supabase.key",
+        MAILJET_API_URL=f"{stub.url}/mailjet/v3.1/",
+        EMAIL_BACKEND="utils.email.EmailBackend",
+        ANYMAIL={
+            "MAILJET_API_KEY": "stub",
+            "MAILJET_SECRET_KEY": "stub",
+            "MAILJET_API_URL": f"{stub.url}/mailjet/v3.1/",
+        },
+    )
+    overrides.enable()
+    # clients built against the real endpoints must be rebuilt against the stub
+    registry.reset()
+    try:
+        yield stub
+    finally:
+        overrides.disable()
+        registry.reset()
+        stub.stop()
@@ -1,29 +1,105 @@
-from supabase import create_client, Client
-from decouple import config
+import requests
+from django.conf import settings
+from utils.lazy import lazy, get
+from utils.metrics import outbound
 
 
-url = config("SUPABASE_URL")
-key = config("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+@lazy("supabase")
+def _create_supabase_client():
+    from supabase import create_client
 
-def upload_to_supabase(bucket_name, file_path, file_data):
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+
+def get_supabase():
+    """
+    The function `get_supabase` returns the Supabase client for the current process, creating it
+    on first use.
+    """
+    return get("supabase")
+
+
+def upload_to_supabase(bucket_name, file_path, file_data, content_type=None):
     """
     The function `upload_to_supabase` uploads a file to a Supabase storage bucket and returns the public
     URL of the uploaded file.
-    
+
     :param bucket_name: Bucket name is the name of the storage bucket in Supabase where you want to
     upload the file.
     :param file_path: The `file_path` parameter in the `upload_to_supabase` function represents the path
-    where the file will be stored in the Supabase storage bucket. 
+    where the file will be stored in the Supabase storage bucket.
     :param file_data: The `file_data` parameter in the `upload_to_supabase` function should be the
     actual data of the file that you want to upload to Supabase.
+    :param content_type: The MIME type stored with the file, left to Supabase when not given.
     :return: The function `upload_to_supabase` is returning the public URL of the uploaded file in the
     Supabase storage.
     """
-    supabase.storage.from_(bucket_name).upload(
-        path=file_path,
-        file=file_data,
-        file_options={"upsert": "true"},
-    )
+    supabase = get_supabase()
+    with outbound("supabase.upload"):
+        supabase.storage.from_(bucket_name).upload(
+            path=file_path,
+            file=file_data,
+            file_options={
+                "upsert": "true",
+                **({"content-type": content_type} if content_type else {}),
+            },
+        )
     public_url = supabase.storage.from_(bucket_name).get_public_url(file_path)
     return public_url
+
+
+def _object_url(bucket_name, file_path):
+    return f"{settings.SUPABASE_URL}/storage/v1/object/{bucket_name}/{file_path}"
+
+
+def _storage_headers(**extra):
+    return {
+        "apikey": settings.SUPABASE_KEY,
+        "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+        **extra,
+    }
+
+
+def put_object(bucket_name, file_path, file_data, content_type):
+    """
+    The function `put_object` stores raw bytes in a Supabase storage bucket, replacing any object
+    at `file_path`. Unlike `upload_to_supabase` it works for private buckets and returns nothing.
+
+    :raises requests.RequestException: When storage does not accept the object.
+    """
+    with outbound("supabase.put_object"):
+        response = requests.post(
+            _object_url(bucket_name, file_path),
+            headers=_storage_headers(**{"Content-Type": content_type, "x-upsert": "true"}),
+            data=file_data,
+            timeout=60,
+        )
+        response.raise_for_status()
+
+
+def get_object(bucket_name, file_path):
+    """
+    The function `get_object` downloads an object from a Supabase storage bucket, public or not.
+
+    :return: The object's bytes.
+    :raises requests.RequestException: When the object cannot be read.
+    """
+    with outbound("supabase.get_object"):
+        response = requests.get(
+            _object_url(bucket_name, file_path), headers=_storage_headers(), timeout=60
+        )
+        response.raise_for_status()
+    return response.content
+
+
+def delete_object(bucket_name, file_path):
+    """
+    The function `delete_object` removes an object from a Supabase storage bucket.
+
+    :raises requests.RequestException: When storage refuses the request.
+    """
+    with outbound("supabase.delete_object"):
+        response = requests.delete(
+            _object_url(bucket_name, file_path), headers=_storage_headers(), timeout=15
+        )
+        response.raise_for_status()
@@ -0,0 +1,43 @@
+import logging
+import time
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def version_key(scope, object_id):
+    return f"version:{scope}:{object_id}"
+
+
+def get_version(scope, object_id):
+    """
+    The function `get_version` returns the current data version of an object, e.g. a department's
+    transactions. Cached snapshots embed it in their key, so bumping the version retires every
+    snapshot at once without having to find and delete them.
+
+    A missing version starts from the current time in milliseconds rather than 1, so a version lost
+    to cache eviction can never collide with a snapshot cached under an earlier one.
+    """
+    key = version_key(scope, object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope, object_id):
+    key = version_key(scope, object_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # not set yet (or evicted); starting a fresh version retires the old snapshots as well
+        version = int(time.time() * 1000)
+        cache.set(key, version, timeout=VERSION_TIMEOUT)
+        return version
+    except Exception as e:
+        logger.warning(f"Could not bump {key}: {e}")
+        return None